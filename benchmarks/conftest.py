@@ -0,0 +1,119 @@
+# AppLimiter/benchmarks/conftest.py
+
+"""
+Shared fixtures for the micro-benchmark suite.
+
+The benchmarks run against synthetic process tables and configs so the numbers
+are reproducible on any machine and never touch the real /proc or /etc.
+"""
+
+import random
+
+import pytest
+
+from applimiter.constants import INITIAL_USAGE_DATA_STRUCTURE
+
+PROCESS_TABLE_SIZES = [1_000, 10_000, 50_000]
+APP_COUNTS = [1, 100, 5_000]
+
+# Generic process names that make up the bulk of a real process table.
+_BACKGROUND_NAMES = [
+    "systemd",
+    "bash",
+    "kworker/0:1",
+    "python3",
+    "firefox",
+    "Xorg",
+    "pipewire",
+    "sshd",
+    "dbus-daemon",
+    "gnome-shell",
+]
+
+
+class FakeProcess:
+    """
+    A minimal stand-in for psutil.Process as returned by psutil.process_iter.
+    """
+
+    def __init__(self, pid, name, cmdline, username="user1000", environ=None):
+        self.pid = pid
+        self.info = {
+            "pid": pid,
+            "name": name,
+            "cmdline": cmdline,
+            "username": username,
+            "environ": environ or {},
+        }
+
+
+def make_process_table(size, app_count=0, seed=1234):
+    """
+    Build a synthetic process table.
+    One process per configured app is mixed in so every app has a match.
+    :param size: the total number of processes in the table
+    :param app_count: the number of configured apps that should have a running process
+    :param seed: the random seed, fixed so that runs are comparable
+    :return: a list of FakeProcess
+    """
+    rng = random.Random(seed)
+    table = []
+    for pid in range(1, size + 1):
+        name = rng.choice(_BACKGROUND_NAMES)
+        cmdline = [f"/usr/bin/{name}", f"--opt-{rng.randint(0, 999)}"]
+        table.append(FakeProcess(pid, name, cmdline))
+    for idx in range(min(app_count, size)):
+        pid = rng.randint(1, size)
+        table[pid - 1] = FakeProcess(pid, f"app{idx}", [f"/opt/app{idx}/app{idx}.bin"])
+    return table
+
+
+def make_config(app_count):
+    """
+    Build a config dict with app_count applications.
+    :param app_count: the number of applications
+    :return: the config dict
+    """
+    return {
+        "applications": [
+            {
+                "name": f"App{idx}",
+                "process_keywords": [f"app{idx}.bin"],
+                "daily_limits_by_day": {"weekdays": 60, "weekends": 120},
+                "weekly_limit_minutes": 500,
+            }
+            for idx in range(app_count)
+        ],
+        "enable_config_modification_delay": False,
+        "config_modification_delay_seconds": 0,
+        "pending_modifications": [],
+    }
+
+
+def make_usage_data(app_count):
+    """
+    Build a usage data dict with app_count entries.
+    :param app_count: the number of applications
+    :return: the usage data dict
+    """
+    return {
+        f"App{idx}": {
+            **INITIAL_USAGE_DATA_STRUCTURE,
+            "daily_seconds_today": idx % 3600,
+            "weekly_seconds_this_week": idx % 18000,
+        }
+        for idx in range(app_count)
+    }
+
+
+@pytest.fixture
+def patch_process_table(mocker):
+    """
+    Return a function that installs a synthetic process table into psutil.process_iter.
+    """
+
+    def _install(table):
+        mocker.patch("psutil.process_iter", side_effect=lambda *a, **kw: iter(table))
+        return table
+
+    return _install
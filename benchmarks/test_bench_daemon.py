@@ -0,0 +1,44 @@
+# AppLimiter/benchmarks/test_bench_daemon.py
+
+"""
+Benchmarks for one full daemon cycle: load, scan, account, notify and save.
+"""
+
+import pytest
+
+from applimiter import daemon
+from applimiter.utils import save_json
+
+from conftest import make_config, make_process_table, make_usage_data
+
+# (process table size, configured app count)
+# The largest configs are only paired with the smallest table, a cycle
+# over 5,000 apps and 50,000 processes takes minutes per round.
+CYCLE_SCENARIOS = [
+    (1_000, 1),
+    (1_000, 100),
+    (1_000, 5_000),
+    (10_000, 1),
+    (10_000, 100),
+    (50_000, 1),
+    (50_000, 100),
+]
+
+
+@pytest.mark.parametrize("table_size,app_count", CYCLE_SCENARIOS)
+def test_daemon_cycle(benchmark, mocker, tmp_path, patch_process_table, table_size, app_count):
+    config_path = str(tmp_path / "config.json")
+    usage_path = str(tmp_path / "usage_data.json")
+    save_json(config_path, make_config(app_count))
+    save_json(usage_path, make_usage_data(app_count))
+    mocker.patch("applimiter.daemon.CONFIG_FILE_PATH", config_path)
+    mocker.patch("applimiter.daemon.USAGE_DATA_PATH", usage_path)
+    mocker.patch(
+        "applimiter.daemon.get_desktop_users_with_display_info",
+        return_value=[{"username": "user1000", "uid": 1000, "display": ":0"}],
+    )
+    mocker.patch("applimiter.daemon.send_desktop_notification_zenity")
+    mocker.patch("applimiter.daemon.terminate_processes")
+    patch_process_table(make_process_table(table_size, app_count=app_count))
+
+    benchmark.pedantic(daemon.run_daemon_cycle, args=(60,), rounds=3, iterations=1)
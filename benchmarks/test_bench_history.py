@@ -0,0 +1,51 @@
+# AppLimiter/benchmarks/test_bench_history.py
+
+"""
+Benchmarks for reporting on a year of per-minute usage history.
+"""
+
+import datetime
+import os
+import random
+from urllib.parse import quote
+
+import pytest
+
+from applimiter.history import build_report, _days_in_month
+
+APP_COUNT = 100
+
+
+def _write_year(directory, app_count, seed=1234):
+    """
+    Write the 2023 history files of app_count apps, each used for a random evening hour most days.
+    """
+    rng = random.Random(seed)
+    for idx in range(app_count):
+        app_directory = os.path.join(directory, quote(f"App {idx}", safe=""))
+        os.makedirs(app_directory)
+        for month_number in range(1, 13):
+            month = f"2023-{month_number:02d}"
+            data = bytearray(_days_in_month(month) * 1440)
+            for day in range(_days_in_month(month)):
+                if rng.random() < 0.7:
+                    start = day * 1440 + rng.randrange(17 * 60, 22 * 60)
+                    minutes = rng.randrange(10, 120)
+                    data[start : start + minutes] = b"\x3c" * minutes
+            with open(os.path.join(app_directory, f"{month}.minutes"), "wb") as f:
+                f.write(data)
+
+
+@pytest.mark.parametrize("period", ["day", "hour"])
+def test_report_year_of_history(benchmark, tmp_path, period):
+    _write_year(str(tmp_path), APP_COUNT)
+    app_names = [f"App {idx}" for idx in range(APP_COUNT)]
+
+    rows = benchmark.pedantic(
+        build_report,
+        args=(app_names, datetime.date(2023, 1, 1), datetime.date(2023, 12, 31), period, str(tmp_path)),
+        rounds=3,
+        iterations=1,
+    )
+
+    assert len(rows) == APP_COUNT * (365 if period == "day" else 7 * 24)
@@ -0,0 +1,137 @@
+# AppLimiter/benchmarks/test_bench_notification_manager.py
+
+"""
+Benchmarks for desktop-user discovery and the notification send path.
+Subprocesses are replaced by stand-ins, so only AppLimiter's own overhead is measured,
+except for the spawn latency benchmarks, which start a real no-op zenity.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+from applimiter.notification_manager import (
+    get_desktop_users_with_display_info,
+    send_desktop_notification_zenity,
+)
+
+from conftest import PROCESS_TABLE_SIZES, FakeProcess, make_process_table
+
+
+@pytest.fixture
+def fake_desktop(mocker, patch_process_table):
+    """
+    Install fake 'users' output, password database and session processes.
+    """
+
+    def _install(table_size, user_count):
+        usernames = [f"user{1000 + idx}" for idx in range(user_count)]
+        mocker.patch(
+            "applimiter.notification_manager.subprocess.run",
+            return_value=SimpleNamespace(stdout=" ".join(usernames), returncode=0),
+        )
+        mocker.patch(
+            "applimiter.notification_manager.pwd.getpwnam",
+            side_effect=lambda name: SimpleNamespace(
+                pw_uid=int(name[4:]), pw_dir=f"/home/{name}"
+            ),
+        )
+        table = make_process_table(table_size)
+        # put each user's session process at the end of the table, the worst case
+        for idx, username in enumerate(usernames):
+            table.append(
+                FakeProcess(
+                    table_size + idx + 1,
+                    "gnome-shell",
+                    ["/usr/bin/gnome-shell"],
+                    username=username,
+                    environ={"DISPLAY": f":{idx}", "XAUTHORITY": f"/run/user/{idx}/xauth"},
+                )
+            )
+        patch_process_table(table)
+        return usernames
+
+    return _install
+
+
+@pytest.mark.parametrize("table_size", PROCESS_TABLE_SIZES)
+@pytest.mark.parametrize("user_count", [1, 10])
+def test_get_desktop_users(benchmark, fake_desktop, table_size, user_count):
+    fake_desktop(table_size, user_count)
+
+    users = benchmark(get_desktop_users_with_display_info)
+
+    assert len(users) == user_count
+
+
+def test_send_notification_overhead(benchmark, mocker):
+    mock_run = mocker.patch(
+        "applimiter.notification_manager.subprocess.run",
+        return_value=SimpleNamespace(returncode=0, stdout="", stderr=""),
+    )
+    mocker.patch(
+        "applimiter.notification_manager.pwd.getpwnam",
+        return_value=SimpleNamespace(pw_uid=1000, pw_gid=1000, pw_dir="/home/user1000"),
+    )
+    mocker.patch("applimiter.notification_manager.os.getgrouplist", return_value=[1000])
+    user_info = {
+        "username": "user1000",
+        "uid": 1000,
+        "display": ":0",
+        "xauthority": None,
+        "home": "/home/user1000",
+    }
+
+    benchmark(send_desktop_notification_zenity, "Title", "Message", user_info)
+
+    assert mock_run.called
+
+
+@pytest.fixture
+def fake_zenity(mocker):
+    """
+    Put a no-op zenity script on the session PATH, in a directory any user may run it from.
+    """
+    directory = tempfile.mkdtemp()
+    os.chmod(directory, 0o755)
+    zenity_path = os.path.join(directory, "zenity")
+    with open(zenity_path, "w") as f:
+        f.write("#!/bin/sh\nexit 0\n")
+    os.chmod(zenity_path, 0o755)
+    mocker.patch("applimiter.notification_manager.SESSION_PATH", directory)
+    mocker.patch.dict("applimiter.notification_manager._environment_cache", clear=True)
+    yield zenity_path
+    shutil.rmtree(directory)
+
+
+def _spawn_user_info():
+    # as root the dialog is spawned as nobody, otherwise as the current user
+    username = "nobody" if os.geteuid() == 0 else os.environ.get("USER", "root")
+    return {"username": username, "uid": os.geteuid(), "display": ":0", "xauthority": None, "home": "/"}
+
+
+def test_spawn_latency_dropping_privileges(benchmark, fake_zenity):
+    benchmark(send_desktop_notification_zenity, "Title", "Message", _spawn_user_info())
+
+
+@pytest.mark.skipif(
+    os.geteuid() != 0 or shutil.which("sudo") is None, reason="needs root and sudo"
+)
+def test_spawn_latency_with_sudo(benchmark, fake_zenity):
+    # how dialogs were spawned before: sudo -u with a copy of the daemon's environment
+    def spawn():
+        env = os.environ.copy()
+        env["DISPLAY"] = ":0"
+        subprocess.run(
+            ["sudo", "-u", "nobody", fake_zenity, "--info", "--title", "Title", "--text", "Message"],
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=15,
+        )
+
+    benchmark(spawn)
@@ -0,0 +1,31 @@
+# AppLimiter/benchmarks/test_bench_process_handler.py
+
+"""
+Benchmarks for process matching on synthetic process tables.
+"""
+
+import pytest
+
+from applimiter.process_handler import get_process_pids
+
+from conftest import PROCESS_TABLE_SIZES, make_process_table
+
+
+@pytest.mark.parametrize("table_size", PROCESS_TABLE_SIZES)
+@pytest.mark.parametrize("keyword_count", [1, 10])
+def test_get_process_pids(benchmark, patch_process_table, table_size, keyword_count):
+    patch_process_table(make_process_table(table_size, app_count=keyword_count))
+    keywords = [f"app{idx}.bin" for idx in range(keyword_count)]
+
+    pids = benchmark(get_process_pids, keywords)
+
+    assert len(pids) >= 1
+
+
+@pytest.mark.parametrize("table_size", PROCESS_TABLE_SIZES)
+def test_get_process_pids_no_match(benchmark, patch_process_table, table_size):
+    patch_process_table(make_process_table(table_size))
+
+    pids = benchmark(get_process_pids, ["not-running-anywhere"])
+
+    assert pids == []
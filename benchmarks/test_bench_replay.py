@@ -0,0 +1,44 @@
+# AppLimiter/benchmarks/test_bench_replay.py
+
+"""
+Benchmarks for replaying a whole day of recorded daemon cycles.
+"""
+
+import datetime
+
+import pytest
+
+from applimiter.process_handler import ProcessInfo
+from applimiter.replay import TraceRecorder, replay_trace
+
+from conftest import make_config
+
+CYCLES_PER_DAY = 24 * 60
+
+
+def _record_day(pathname, table_size, app_count):
+    recorder = TraceRecorder(pathname, 60)
+    start = datetime.datetime(2024, 6, 26, 0, 0, 0)
+    config = make_config(app_count)
+    table = [ProcessInfo(pid, "bash", f"/usr/bin/bash --opt-{pid}") for pid in range(table_size)]
+    for cycle in range(CYCLES_PER_DAY):
+        # a few processes come and go every cycle, apps are running in the evening
+        table[cycle % table_size] = ProcessInfo(table_size + cycle, "python3", "python3 job.py")
+        running = [
+            ProcessInfo(10_000_000 + idx, f"app{idx}", f"/opt/app{idx}.bin")
+            for idx in range(app_count)
+        ] if cycle >= 18 * 60 else []
+        recorder.record(
+            start + datetime.timedelta(minutes=cycle), table + running, [], config, {}
+        )
+    recorder.close()
+
+
+@pytest.mark.parametrize("table_size,app_count", [(1_000, 10), (10_000, 10)])
+def test_replay_whole_day(benchmark, tmp_path, table_size, app_count):
+    trace_path = str(tmp_path / "day.jsonl.gz")
+    _record_day(trace_path, table_size, app_count)
+
+    result = benchmark.pedantic(replay_trace, args=(trace_path,), rounds=3, iterations=1)
+
+    assert result["cycles"] == CYCLES_PER_DAY
@@ -0,0 +1,32 @@
+# AppLimiter/benchmarks/test_bench_utils.py
+
+"""
+Benchmarks for JSON persistence of large usage files.
+"""
+
+import pytest
+
+from applimiter.utils import load_json, save_json
+
+from conftest import APP_COUNTS, make_usage_data
+
+
+@pytest.mark.parametrize("app_count", APP_COUNTS)
+def test_save_json_usage(benchmark, tmp_path, app_count):
+    pathname = str(tmp_path / "usage_data.json")
+    usage_data = make_usage_data(app_count)
+
+    benchmark(save_json, pathname, usage_data)
+
+    assert load_json(pathname, read_only=True) == usage_data
+
+
+@pytest.mark.parametrize("app_count", APP_COUNTS)
+def test_load_json_usage(benchmark, tmp_path, app_count):
+    pathname = str(tmp_path / "usage_data.json")
+    usage_data = make_usage_data(app_count)
+    save_json(pathname, usage_data)
+
+    loaded = benchmark(load_json, pathname, {}, True)
+
+    assert loaded == usage_data
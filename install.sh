@@ -77,9 +77,18 @@ Description=AppLimiter Daemon
 After=network.target
 
 [Service]
-Type=simple
+# the daemon sends READY=1 after its first cycle and pets the watchdog after every cycle
+Type=notify
+NotifyAccess=main
+WatchdogSec=120
+# the daemon manages the cgroups of throttled apps below its own
+Delegate=yes
 
 ExecStart=/usr/bin/env python3 -m applimiter.main daemon --interval 30
+ExecReload=/bin/kill -HUP \$MAINPID
+# keep the cache snapshot in /run/applimiter across restarts
+RuntimeDirectory=applimiter
+RuntimeDirectoryPreserve=yes
 
 WorkingDirectory=/opt/AppLimiter
 User=root
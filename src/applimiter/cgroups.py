@@ -0,0 +1,244 @@
+# AppLimiter/src/applimiter/cgroups.py
+
+"""
+Throttle and freeze the processes of an app with cgroup v2.
+
+Each escalated app gets a cgroup "apps/<app>" below the daemon's own cgroup, which
+systemd delegates to it with Delegate=yes, and its processes are moved there. A cgroup
+with processes cannot hand controllers to its children, so the daemon first moves
+itself into the leaf "daemon" next to "apps". Limits are set through the cgroup's control
+files: cpu.max for CPU time, io.max for disk bandwidth and cgroup.freeze to stop
+the processes entirely. When the app is released, the limits are lifted and the
+processes go back to the cgroups they came from.
+"""
+
+import os
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+# the children of the daemon's cgroup: the daemon itself, and the parent of the app cgroups
+CGROUP_DAEMON_NAME = "daemon"
+CGROUP_PARENT_NAME = "apps"
+# cpu.max quotas are per period of this many microseconds
+CPU_PERIOD_USEC = 100_000
+
+
+class CgroupManager:
+    """
+    Manages one cgroup per escalated app.
+    """
+
+    def __init__(self, root=CGROUP_ROOT, block_devices=None, service_cgroup=None):
+        """
+        :param root: the mount point of the cgroup v2 hierarchy
+        :param block_devices: the "major:minor" of the disks io.max applies to, read from /sys/block if None
+        :param service_cgroup: the cgroup delegated to the daemon, e.g. "/system.slice/applimiter.service",
+            the daemon's own cgroup if None
+        """
+        self.root = root
+        if service_cgroup is None:
+            service_cgroup = _read_process_cgroup("self") or "/"
+        self.service_path = os.path.join(root, service_cgroup.lstrip("/"))
+        self.parent_path = os.path.join(self.service_path, CGROUP_PARENT_NAME)
+        self.block_devices = block_devices
+        # app name -> {pid: the cgroup path the process was moved from}
+        self._moved_pids = {}
+
+    @staticmethod
+    def is_available(root=CGROUP_ROOT):
+        """
+        :param root: the mount point of the cgroup v2 hierarchy
+        :return: True if a cgroup v2 hierarchy is mounted there
+        """
+        return os.path.exists(os.path.join(root, "cgroup.controllers"))
+
+    def app_path(self, app_name):
+        """
+        :param app_name: the app name
+        :return: the path of the app's cgroup
+        """
+        # keep the name a single, readable path component
+        slug = re.sub(r"[^A-Za-z0-9_.-]", "_", app_name).lstrip(".") or "app"
+        return os.path.join(self.parent_path, slug)
+
+    def move(self, app_name, pids):
+        """
+        Move processes into the app's cgroup, creating it if needed.
+        Processes already moved are skipped, their children follow them by themselves.
+        :param app_name: the app name
+        :param pids: the pids of the app's processes
+        :return: the number of processes moved
+        """
+        moved_pids = self._moved_pids.setdefault(app_name, {})
+        new_pids = [pid for pid in pids if pid not in moved_pids]
+        if not new_pids or not self._ensure_cgroup(app_name):
+            return 0
+        moved = 0
+        for pid in new_pids:
+            original_cgroup = _read_process_cgroup(pid)
+            if self._write(app_name, "cgroup.procs", str(pid)):
+                moved_pids[pid] = original_cgroup
+                moved += 1
+        return moved
+
+    def set_cpu_percent(self, app_name, percent):
+        """
+        Limit the app to a share of one CPU.
+        :param app_name: the app name
+        :param percent: the percentage of one CPU, None for no limit
+        :return: True on success, False otherwise
+        """
+        if percent is None:
+            return self._write(app_name, "cpu.max", f"max {CPU_PERIOD_USEC}")
+        quota = max(int(CPU_PERIOD_USEC * percent / 100), 1000)
+        return self._write(app_name, "cpu.max", f"{quota} {CPU_PERIOD_USEC}")
+
+    def set_io_bytes_per_second(self, app_name, bytes_per_second):
+        """
+        Limit the app's read and write bandwidth on every disk.
+        :param app_name: the app name
+        :param bytes_per_second: the limit for reads and for writes, None for no limit
+        :return: True if the limit was set on at least one disk, False otherwise
+        """
+        limit = "max" if bytes_per_second is None else str(int(bytes_per_second))
+        results = [
+            self._write(app_name, "io.max", f"{device} rbps={limit} wbps={limit}")
+            for device in self._get_block_devices()
+        ]
+        return any(results)
+
+    def set_frozen(self, app_name, frozen):
+        """
+        Freeze or thaw all processes of the app.
+        :param app_name: the app name
+        :param frozen: True to freeze, False to thaw
+        :return: True on success, False otherwise
+        """
+        return self._write(app_name, "cgroup.freeze", "1" if frozen else "0")
+
+    def release(self, app_name):
+        """
+        Lift all limits and move the app's processes back where they came from.
+        :param app_name: the app name
+        :return: None
+        """
+        moved_pids = self._moved_pids.pop(app_name, {})
+        if not os.path.isdir(self.app_path(app_name)):
+            return
+        self.set_frozen(app_name, False)
+        self.set_cpu_percent(app_name, None)
+        self.set_io_bytes_per_second(app_name, None)
+        for pid, original_cgroup in moved_pids.items():
+            if original_cgroup is None:
+                continue
+            try:
+                with open(
+                    os.path.join(self.root, original_cgroup.lstrip("/"), "cgroup.procs"), "w"
+                ) as f:
+                    f.write(str(pid))
+            except OSError as e:
+                # most likely the process is gone
+                logger.debug(f"Could not move process {pid} back to {original_cgroup}: {e}")
+        try:
+            os.rmdir(self.app_path(app_name))
+        except OSError as e:
+            logger.debug(f"Could not remove cgroup of {app_name}: {e}")
+
+    def _ensure_cgroup(self, app_name):
+        """
+        Create the parent and app cgroups, with the cpu and io controllers enabled for the app.
+        :param app_name: the app name
+        :return: True if the app's cgroup exists, False otherwise
+        """
+        app_path = self.app_path(app_name)
+        if os.path.isdir(app_path):
+            return True
+        try:
+            if not os.path.isdir(self.parent_path):
+                self._leave_service_cgroup()
+                os.makedirs(self.parent_path, exist_ok=True)
+                for path in (self.service_path, self.parent_path):
+                    try:
+                        with open(os.path.join(path, "cgroup.subtree_control"), "w") as f:
+                            f.write("+cpu +io")
+                    except OSError as e:
+                        logger.warning(f"Could not enable the cpu and io controllers in {path}: {e}")
+            os.mkdir(app_path)
+        except OSError as e:
+            logger.error(f"Could not create cgroup {app_path}: {e}")
+            return False
+        logger.info(f"Created cgroup {app_path} for app {app_name}.")
+        return True
+
+    def _leave_service_cgroup(self):
+        """
+        Move the daemon's processes from its delegated cgroup into the "daemon" leaf,
+        so that the cgroup may enable controllers for its children.
+        The root cgroup has no such restriction and is left alone.
+        :return: None
+        """
+        if os.path.normpath(self.service_path) == os.path.normpath(self.root):
+            return
+        try:
+            with open(os.path.join(self.service_path, "cgroup.procs")) as f:
+                pids = f.read().split()
+        except OSError:
+            return
+        if not pids:
+            return
+        daemon_path = os.path.join(self.service_path, CGROUP_DAEMON_NAME)
+        try:
+            os.makedirs(daemon_path, exist_ok=True)
+            for pid in pids:
+                # one pid per write, the kernel takes a single one
+                with open(os.path.join(daemon_path, "cgroup.procs"), "w") as f:
+                    f.write(pid)
+        except OSError as e:
+            logger.warning(f"Could not move the daemon into {daemon_path}: {e}")
+
+    def _write(self, app_name, control_file, value):
+        """
+        :return: True on success, False otherwise
+        """
+        pathname = os.path.join(self.app_path(app_name), control_file)
+        try:
+            with open(pathname, "w") as f:
+                f.write(value)
+        except OSError as e:
+            logger.warning(f"Could not write '{value}' to {pathname}: {e}")
+            return False
+        return True
+
+    def _get_block_devices(self):
+        """
+        :return: the "major:minor" of every disk in /sys/block, except loop and ram devices
+        """
+        if self.block_devices is None:
+            self.block_devices = []
+            try:
+                for device_name in sorted(os.listdir("/sys/block")):
+                    if device_name.startswith(("loop", "ram", "zram")):
+                        continue
+                    with open(f"/sys/block/{device_name}/dev") as f:
+                        self.block_devices.append(f.read().strip())
+            except OSError as e:
+                logger.warning(f"Could not list block devices for io.max: {e}")
+        return self.block_devices
+
+
+def _read_process_cgroup(pid):
+    """
+    :param pid: the process id, or "self"
+    :return: the cgroup v2 path of the process, e.g. "/user.slice/...", or None if unknown
+    """
+    try:
+        with open(f"/proc/{pid}/cgroup") as f:
+            for line in f:
+                if line.startswith("0::"):
+                    return line[3:].strip()
+    except OSError:
+        pass
+    return None
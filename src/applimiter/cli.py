@@ -5,20 +5,40 @@ Store all functions used to deal with cli input
 """
 
 import sys
-import time
+import pwd
+import json
 import datetime
 import argparse
 import logging
-from copy import deepcopy
+from contextlib import nullcontext
 
 from applimiter.constants import (
     CONFIG_FILE_PATH,
     USAGE_DATA_PATH,
+    AUDIT_LOG_PATH,
+    HISTORY_DIR_PATH,
     INITIAL_USAGE_DATA_STRUCTURE,
     GRACE_PERIOD_SECONDS,
+    ROLLING_WINDOW_MAX_MINUTES,
+)
+from applimiter.clock import SYSTEM_CLOCK
+from applimiter.modifications import (
+    apply_config_modification,
+    audit_entry,
+    modification_needs_delay,
+    removed_app_names,
+    validate_batch_operations,
+)
+from applimiter.utils import (
+    load_json,
+    save_json,
+    locked_file,
+    append_json_line,
+    check_exists_app,
+    check_privilege,
+    is_modifying_command,
+    group_usage_name,
 )
-from applimiter.utils import load_json, save_json, check_exists_app, check_privilege
-from applimiter.process_handler import get_process_pids
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +55,37 @@ def setup_logging():
     )
 
 
+def _rolling_limit(value):
+    """
+    Parse a rolling limit argument
+    :param value: "WINDOW:LIMIT" in minutes, e.g. "1440:90"
+    :return: the rolling limit dict stored in config
+    """
+    try:
+        window, limit = (int(part) for part in value.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"'{value}' is not WINDOW:LIMIT in minutes, e.g. 1440:90."
+        )
+    if not 0 < window <= ROLLING_WINDOW_MAX_MINUTES or limit < 0:
+        raise argparse.ArgumentTypeError(
+            f"The window of '{value}' must be between 1 and {ROLLING_WINDOW_MAX_MINUTES} minutes."
+        )
+    return {"window_minutes": window, "limit_minutes": limit}
+
+
+def _date_argument(value):
+    """
+    Parse a date argument
+    :param value: a date "YYYY-MM-DD"
+    :return: the datetime.date
+    """
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a date YYYY-MM-DD.")
+
+
 def parse_arguments():
     """
     Defines and parses command-line arguments for the application.
@@ -64,9 +115,16 @@ def parse_arguments():
     parser_daemon.add_argument(
         "-i",
         "--interval",
-        type=int,
+        type=float,
         default=60,
-        help="Check interval in seconds (default: 60).",
+        help="Check interval in seconds (default: 60). Intervals of 5 seconds or less"
+        " run in fast mode: between full cycles, every minute, only new processes"
+        " are looked at.",
+    )
+    parser_daemon.add_argument(
+        "--record-trace",
+        metavar="TRACE_FILE",
+        help="Record every cycle's process table, desktop users and clock into a trace file.",
     )
     # add
     parser_add = subparsers.add_parser(
@@ -103,6 +161,25 @@ def parse_arguments():
         required=True,
         help="Total weekly usage limit in minutes.",
     )
+    parser_add.add_argument(
+        "-r",
+        "--rolling",
+        nargs="+",
+        type=_rolling_limit,
+        metavar="WINDOW:LIMIT",
+        help="Rolling limits in minutes, e.g. 1440:90 for at most 90 minutes in any 24 hours.",
+    )
+    parser_add.add_argument(
+        "-s",
+        "--schedule",
+        nargs="+",
+        metavar="DAYS=HH:MM-HH:MM",
+        help="Allowed hours, e.g. weekdays=16:00-20:00 sat,sun=10:00-22:00.",
+    )
+    parser_add.add_argument(
+        "--timezone",
+        help="The timezone of --schedule, e.g. Europe/Berlin, the local one by default.",
+    )
 
     # remove
     parser_remove = subparsers.add_parser(
@@ -127,6 +204,25 @@ def parse_arguments():
     parser_update.add_argument(
         "-w", "--weekly", type=int, help="New weekly limit in minutes."
     )
+    parser_update.add_argument(
+        "-r",
+        "--rolling",
+        nargs="*",
+        type=_rolling_limit,
+        metavar="WINDOW:LIMIT",
+        help="New rolling limits in minutes, e.g. 1440:90 120:30, none to remove them.",
+    )
+    parser_update.add_argument(
+        "-s",
+        "--schedule",
+        nargs="*",
+        metavar="DAYS=HH:MM-HH:MM",
+        help="New allowed hours, e.g. weekdays=16:00-20:00, none to remove them.",
+    )
+    parser_update.add_argument(
+        "--timezone",
+        help="The timezone of --schedule, e.g. Europe/Berlin, the local one by default.",
+    )
 
     # update usage
     parser_update_usage = subparsers.add_parser(
@@ -199,14 +295,113 @@ def parse_arguments():
         help="The index number to apply, or 'all'.",
     )
 
+    # import
+    parser_import = subparsers.add_parser(
+        "import",
+        help="Apply many app changes from a file in one transaction (requires root).",
+    )
+    parser_import.add_argument(
+        "file",
+        help="A JSON file with an 'applications' list (added or updated by name)\n"
+             "and/or an 'operations' list of add_app/update_app/remove_app actions.",
+    )
+    parser_import.add_argument(
+        "--replace",
+        action="store_true",
+        help="Also remove configured apps that are not in the file's 'applications'.",
+    )
+
+    # export
+    parser_export = subparsers.add_parser(
+        "export", help="Export all configured applications as JSON."
+    )
+    parser_export.add_argument(
+        "-o",
+        "--output",
+        metavar="FILE",
+        help="Write to this file instead of stdout.",
+    )
+
+    # replay
+    parser_replay = subparsers.add_parser(
+        "replay", help="Replay a recorded daemon trace offline, as fast as possible."
+    )
+    parser_replay.add_argument("trace", help="The trace file recorded by 'daemon --record-trace'.")
+    parser_replay.add_argument(
+        "-c",
+        "--config",
+        metavar="CONFIG_FILE",
+        help="Use this config instead of the recorded one.",
+    )
+    parser_replay.add_argument(
+        "-u",
+        "--usage",
+        metavar="USAGE_FILE",
+        help="Start from this usage data instead of the recorded one.",
+    )
+    parser_replay.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the full replay result as JSON.",
+    )
+
+    # simulate
+    parser_simulate = subparsers.add_parser(
+        "simulate",
+        help="Fast-forward the daemon on a virtual clock through a scripted scenario.",
+    )
+    parser_simulate.add_argument("scenario", help="The scenario JSON file.")
+    parser_simulate.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the full simulation result as JSON.",
+    )
+
+    # report
+    parser_report = subparsers.add_parser(
+        "report", help="Report the usage history of apps and groups."
+    )
+    parser_report.add_argument(
+        "apps",
+        nargs="*",
+        metavar="APP",
+        help="The apps or groups to report on, all with history by default.",
+    )
+    parser_report.add_argument(
+        "--since",
+        type=_date_argument,
+        metavar="YYYY-MM-DD",
+        help="The first day of the report (default: 29 days before --until).",
+    )
+    parser_report.add_argument(
+        "--until",
+        type=_date_argument,
+        metavar="YYYY-MM-DD",
+        help="The last day of the report (default: today).",
+    )
+    parser_report.add_argument(
+        "-b",
+        "--by",
+        choices=["day", "week", "weekday", "hour"],
+        default="day",
+        help="Minutes per day or week, average minutes per weekday,\n"
+             "or a heatmap of the average minutes per weekday and hour (default: day).",
+    )
+    parser_report.add_argument(
+        "--csv",
+        action="store_true",
+        help="Print the report as CSV.",
+    )
+
     return parser.parse_args()
 
 
-def handle_cli_command(args, script_call_example="applimiter"):
+def handle_cli_command(args, script_call_example="applimiter", clock=SYSTEM_CLOCK):
     """
     Handles all CLI commands and output to stdout/stderr.
     :param args: argparse.Namespace that contains the CLI input.
     :param script_call_example:.....
+    :param clock: the clock to read the current time from
     :return: None
     """
     # exit if the permission is not satisfied
@@ -218,37 +413,289 @@ def handle_cli_command(args, script_call_example="applimiter"):
         )
         sys.exit(1)
 
-    # load config dict and create a copy
-    config = load_json(
-        CONFIG_FILE_PATH, read_only=False
-    )  # Load with write access for most commands
-    config_copy = deepcopy(config)
+    # replay and simulate work on their own input files and must not touch the system config
+    if args.command == "replay":
+        _handle_replay_command(args)
+        return
+    if args.command == "simulate":
+        _handle_simulate_command(args)
+        return
+    # the history is written by the daemon alone, the config is not needed
+    if args.command == "report":
+        _handle_report_command(args, clock)
+        return
+
+    # hold the config lock for the whole read-modify-write of modifying commands,
+    # so concurrent cli invocations don't overwrite each other's changes
+    config_lock = (
+        locked_file(CONFIG_FILE_PATH, exclusive=True)
+        if is_modifying_command(args)
+        else nullcontext()
+    )
+    with config_lock:
+        # load config dict, it is loaded fresh so commands may modify it in place
+        config = load_json(
+            CONFIG_FILE_PATH, read_only=False
+        )  # Load with write access for most commands
+
+        # Command Dispatcher
+        if args.command in ["add", "update", "config-delay"]:
+            _handle_add_update_config_delay_commands(args, config, clock)
+
+        elif args.command == "remove":
+            _handle_remove_command(args, config, clock)
+
+        elif args.command == "pending":
+            _handle_pending_command(args, config, clock)
+
+        elif args.command == "status":
+            _handle_status_command(args, config, clock)
+
+        elif args.command == "list":
+            _handle_list_command(args, config)
+
+        elif args.command == "update-usage":
+            _handle_update_usage_command(args, config)
+
+        elif args.command == "import":
+            _handle_import_command(args, config, clock)
 
-    # Command Dispatcher
-    if args.command in ["add", "update", "config-delay"]:
-        _handle_add_update_config_delay_commands(args, config_copy)
+        elif args.command == "export":
+            _handle_export_command(args, config)
 
-    elif args.command == "remove":
-        _handle_remove_command(args, config_copy)
 
-    elif args.command == "pending":
-        _handle_pending_command(args, config_copy)
+def _handle_import_command(args, config, clock=SYSTEM_CLOCK):
+    """
+    Handle import command: load, validate and save many modifications at once,
+    or queue them as a single pending batch if the modification delay applies.
+    :param args: the argparse namespace
+    :param config: the config dict read from config file
+    :param clock: the clock to read the current time from
+    :return: None
+    """
+    try:
+        with open(args.file, "r", encoding="utf-8") as f:
+            document = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Error: Could not read import file '{args.file}': {e}", file=sys.stderr)
+        return
+    if not isinstance(document, dict):
+        print("Error: The import file must contain a JSON object.", file=sys.stderr)
+        return
+
+    operations = document.get("operations", [])
+    imported_apps = document.get("applications", [])
+    if not (
+        isinstance(operations, list)
+        and isinstance(imported_apps, list)
+        and all(isinstance(app, dict) for app in imported_apps)
+    ):
+        print(
+            "Error: 'operations' and 'applications' must be lists of objects.",
+            file=sys.stderr,
+        )
+        return
+    operations = list(operations)
+    apps_by_name = {app["name"]: app for app in config.get("applications", [])}
+    for app in imported_apps:
+        action = "update_app" if app.get("name") in apps_by_name else "add_app"
+        operations.append({"action": action, "payload": app})
+    if args.replace:
+        imported_names = {app.get("name") for app in imported_apps}
+        operations.extend(
+            {"action": "remove_app", "payload": {"name": name}}
+            for name in apps_by_name
+            if name not in imported_names
+        )
+    if not operations:
+        print("Nothing to import.")
+        return
+
+    # validate first, so that a broken batch is never queued nor crashes the delay check
+    error = validate_batch_operations(set(apps_by_name), operations)
+    if error:
+        print(f"Error: {error}", file=sys.stderr)
+        return
+    action_payload = {"action": "batch", "payload": {"operations": operations}}
+    if modification_needs_delay(config, action_payload, apps_by_name):
+        pending_item = _queue_pending_modification(
+            config, action_payload, f"batch_{len(operations)}", clock
+        )
+        unlock_time_str = datetime.datetime.fromtimestamp(
+            pending_item["unlock_timestamp"]
+        ).strftime("%Y-%m-%d %H:%M:%S")
+        print(
+            f"Batch of {len(operations)} operations added to pending queue."
+            f" Apply after {unlock_time_str}."
+        )
+    elif _apply_config_modification(config, action_payload):
+        save_json(CONFIG_FILE_PATH, config)
+        _cleanup_usage_data(removed_app_names(action_payload))
+        print(f"Imported {len(operations)} operations successfully.")
+
+
+def _handle_export_command(args, config):
+    """
+    Handle export command
+    :param args: the argparse namespace
+    :param config: the config dict read from config file
+    :return: None
+    """
+    document = {"applications": config.get("applications", [])}
+    if args.output:
+        save_json(args.output, document)
+        print(
+            f"Exported {len(document['applications'])} applications to {args.output}."
+        )
+    else:
+        print(json.dumps(document, indent=4, ensure_ascii=False))
+
+
+def _handle_replay_command(args):
+    """
+    Handle replay command
+    :param args: the argparse namespace
+    :return: None
+    """
+    from applimiter.replay import replay_trace
+
+    config = load_json(args.config, read_only=True) if args.config else None
+    usage_data = load_json(args.usage, read_only=True) if args.usage else None
+    try:
+        result = replay_trace(args.trace, config=config, usage_data=usage_data)
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not replay trace '{args.trace}': {e}", file=sys.stderr)
+        return
+
+    _print_run_result("Replay", result, args.json)
+
+
+def _handle_simulate_command(args):
+    """
+    Handle simulate command
+    :param args: the argparse namespace
+    :return: None
+    """
+    from applimiter.simulation import run_simulation
+
+    scenario = load_json(args.scenario, read_only=True)
+    try:
+        result = run_simulation(scenario)
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"Error: Invalid scenario '{args.scenario}': {e}", file=sys.stderr)
+        return
+
+    _print_run_result("Simulation", result, args.json)
+
+
+def _handle_report_command(args, clock=SYSTEM_CLOCK):
+    """
+    Handle report command
+    :param args: the argparse namespace
+    :param clock: the clock to read the current time from
+    :return: None
+    """
+    from applimiter.history import build_report, list_history_apps
+
+    last_day = args.until or clock.now().date()
+    first_day = args.since or last_day - datetime.timedelta(days=29)
+    if first_day > last_day:
+        print("Error: --since must not be after --until.", file=sys.stderr)
+        return
+    app_names = args.apps or list_history_apps(HISTORY_DIR_PATH)
+    if not app_names:
+        print("No usage history recorded yet.")
+        return
+    rows = build_report(app_names, first_day, last_day, args.by, HISTORY_DIR_PATH)
+
+    if args.csv:
+        import csv
+
+        writer = csv.writer(sys.stdout)
+        if args.by == "hour":
+            writer.writerow(["app", "weekday", "hour", "average_minutes"])
+        elif args.by == "weekday":
+            writer.writerow(["app", "weekday", "average_minutes"])
+        else:
+            writer.writerow(["app", args.by, "minutes"])
+        writer.writerows([*row[:-1], f"{row[-1]:.1f}"] for row in rows)
+        return
 
-    elif args.command == "status":
-        _handle_status_command(args, config_copy)
+    print(f"--- Usage Report {first_day} to {last_day} ---")
+    for app_name in app_names:
+        app_rows = [row for row in rows if row[0] == app_name]
+        print(f"\n{app_name}:")
+        if args.by == "hour":
+            _print_heatmap(app_rows)
+            continue
+        unit = "min/day" if args.by == "weekday" else "min"
+        for _, label, minutes in app_rows:
+            print(f"  {label:<12}{minutes:>8.1f} {unit}")
+        if args.by != "weekday":
+            print(f"  {'Total':<12}{sum(row[2] for row in app_rows):>8.1f} min")
 
-    elif args.command == "list":
-        _handle_list_command(args, config_copy)
 
-    elif args.command == "update-usage":
-        _handle_update_usage_command(args, config_copy)
+# average minutes in an hour, up to each bound, and how they are shaded in the heatmap
+_HEATMAP_SHADES = [(0, " "), (15, "░"), (30, "▒"), (45, "▓"), (60, "█")]
 
 
-def _handle_add_update_config_delay_commands(args, config):
+def _print_heatmap(app_rows):
+    """
+    Print a weekday by hour heatmap of the average minutes used
+    :param app_rows: the (app name, weekday, hour, minutes) rows of one app
+    :return: None
+    """
+    print("      " + "".join(f"{hour:02d}" for hour in range(24)))
+    cells_by_weekday = {}
+    for _, weekday, _, minutes in app_rows:
+        shade = next(shade for bound, shade in _HEATMAP_SHADES if minutes <= bound)
+        cells_by_weekday.setdefault(weekday, []).append(shade * 2)
+    for weekday, cells in cells_by_weekday.items():
+        print(f"  {weekday}  {''.join(cells)}")
+    print(
+        "  "
+        + "  ".join(
+            f"{shade * 2} {'0' if not bound else f'<={bound}'}" for bound, shade in _HEATMAP_SHADES
+        )
+        + " min"
+    )
+
+
+def _print_run_result(title, result, as_json):
+    """
+    Print the result of a replay or a simulation
+    :param title: the kind of run, shown in the header
+    :param result: the result dict
+    :param as_json: print the full result as JSON instead of a summary
+    :return: None
+    """
+    if as_json:
+        print(json.dumps(result, indent=4, ensure_ascii=False))
+        return
+
+    cycles_per_second = (
+        result["cycles"] / result["elapsed_seconds"] if result["elapsed_seconds"] else 0
+    )
+    print(f"--- {title} Result ---")
+    print(
+        f"Ran {result['cycles']} cycles in {result['elapsed_seconds']:.3f}s"
+        f" ({cycles_per_second:.0f} cycles/s)."
+    )
+    for app_name, app_usage in result["usage_data"].items():
+        print(
+            f"- {app_name}: today {app_usage.get('daily_seconds_today', 0) / 60:.1f} min,"
+            f" this week {app_usage.get('weekly_seconds_this_week', 0) / 60:.1f} min"
+        )
+    print(f"Notifications sent: {len(result['notifications'])}")
+    print(f"Processes terminated: {len(result['terminations'])}")
+
+
+def _handle_add_update_config_delay_commands(args, config, clock=SYSTEM_CLOCK):
     """
     handle add, update, config-delay
     :param args: argparse.Namespace
     :param config: the config dict read from config file
+    :param clock: the clock to read the current time from
     :return: None
     """
     action_payload = None
@@ -264,9 +711,16 @@ def _handle_add_update_config_delay_commands(args, config):
                     "weekdays": args.daily_weekdays,
                     "weekends": args.daily_weekends,
                 },
-                "weekly_limits": args.weekly,
+                "weekly_limit_minutes": args.weekly,
             },
         }
+        if getattr(args, "rolling", None):
+            action_payload["payload"]["rolling_limits"] = args.rolling
+        if getattr(args, "schedule", None):
+            schedule = _schedule_from_args(args)
+            if schedule is None:
+                return
+            action_payload["payload"]["schedule"] = schedule
 
     # update
     elif args.command == "update":
@@ -284,6 +738,13 @@ def _handle_add_update_config_delay_commands(args, config):
             }
         if args.weekly is not None:
             payload["weekly_limit_minutes"] = args.weekly
+        if getattr(args, "rolling", None) is not None:
+            payload["rolling_limits"] = args.rolling
+        if getattr(args, "schedule", None) is not None:
+            schedule = _schedule_from_args(args) if args.schedule else {}
+            if schedule is None:
+                return
+            payload["schedule"] = schedule
         if args.keywords is not None:
             payload["process_keywords"] = args.keywords
         if len(payload) > 1:
@@ -311,62 +772,10 @@ def _handle_add_update_config_delay_commands(args, config):
             }
 
     if action_payload:
-        needs_delay = False
-        if config.get("enable_config_modification_delay", False):
-            if action_payload["action"] == "update_app":
-                app_to_update = next(
-                    (
-                        app
-                        for app in config.get("applications", [])
-                        if app["name"] == action_payload["payload"]["name"]
-                    ),
-                    None,
-                )
-                if app_to_update:
-                    if "daily_limits_by_day" in action_payload["payload"] and (
-                            float(
-                                action_payload["payload"]["daily_limits_by_day"][
-                                    "weekdays"
-                                ]
-                            )
-                            > float(
-                        app_to_update.get("daily_limits_by_day", {}).get(
-                            "weekdays", 0
-                        )
-                    )
-                            or float(
-                        action_payload["payload"]["daily_limits_by_day"][
-                            "weekends"
-                        ]
-                    )
-                            > float(
-                        app_to_update.get("daily_limits_by_day", {}).get(
-                            "weekends", 0
-                        )
-                    )
-                    ):
-                        needs_delay = True
-                    if (
-                            not needs_delay
-                            and "weekly_limit_minutes" in action_payload["payload"]
-                            and float(action_payload["payload"]["weekly_limit_minutes"])
-                            > float(app_to_update.get("weekly_limit_minutes", 0))
-                    ):
-                        needs_delay = True
-
-        if needs_delay:
-
-            pending_item = {
-                **action_payload,
-                "unlock_timestamp": time.time() + config.get(
-                    "config_modification_delay_seconds", 0
-                ),
-                "id": f"{datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%S%f')}_{action_payload['action']}",
-            }
-            config.setdefault("pending_modifications", []).append(
-                pending_item
+        if modification_needs_delay(config, action_payload):
+            pending_item = _queue_pending_modification(
+                config, action_payload, action_payload["action"], clock
             )
-            save_json(CONFIG_FILE_PATH, config)
             unlock_time_str = datetime.datetime.fromtimestamp(
                 pending_item["unlock_timestamp"]
             ).strftime("%Y-%m-%d %H:%M:%S")
@@ -379,6 +788,46 @@ def _handle_add_update_config_delay_commands(args, config):
                 print(f"Action '{args.command}' applied successfully.")
 
 
+def _schedule_from_args(args):
+    """
+    Build a schedule config from --schedule and --timezone
+    :param args: argparse.Namespace
+    :return: the schedule dict, or None if it is invalid, with the error printed
+    """
+    from applimiter.schedule import CompiledSchedule, parse_schedule_argument
+
+    try:
+        schedule = {"allowed": parse_schedule_argument(args.schedule)}
+        if args.timezone:
+            schedule["timezone"] = args.timezone
+        CompiledSchedule(schedule)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return None
+    return schedule
+
+
+def _queue_pending_modification(config, action_payload, id_suffix, clock=SYSTEM_CLOCK):
+    """
+    Append a modification to the pending queue and save the config.
+    :param config: the config dict read from config file
+    :param action_payload: the modification dict with "action" and "payload"
+    :param id_suffix: appended to the timestamp to build the pending item id
+    :param clock: the clock to read the current time from
+    :return: the queued pending item
+    """
+    pending_item = {
+        **action_payload,
+        "unlock_timestamp": clock.time() + config.get(
+            "config_modification_delay_seconds", 0
+        ),
+        "id": f"{clock.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%S%f')}_{id_suffix}",
+    }
+    config.setdefault("pending_modifications", []).append(pending_item)
+    save_json(CONFIG_FILE_PATH, config)
+    return pending_item
+
+
 def _handle_update_usage_command(args, config):
     """
     Handle update-usage command
@@ -391,16 +840,19 @@ def _handle_update_usage_command(args, config):
     if not check_exists_app(app_name, config):
         print(f"Error: Application '{app_name}' not found.", file=sys.stderr)
         return
-    # load usage, do some changes, save it
-    usage_data = load_json(USAGE_DATA_PATH, {})
-    app_usage = usage_data.setdefault(app_name, INITIAL_USAGE_DATA_STRUCTURE.copy())
-    app_usage["daily_seconds_today"] += args.minutes * 60
-    app_usage["daily_seconds_today"] = max(app_usage["daily_seconds_today"], 0)
-    app_usage["weekly_seconds_this_week"] += args.minutes * 60
-    app_usage["weekly_seconds_this_week"] = max(
-        app_usage["weekly_seconds_this_week"], 0
-    )
-    save_json(USAGE_DATA_PATH, usage_data)
+    # load usage, do some changes, save it, locked so the daemon merges instead of overwriting
+    with locked_file(USAGE_DATA_PATH, exclusive=True):
+        usage_data = load_json(USAGE_DATA_PATH, {})
+        app_usage = usage_data.setdefault(
+            app_name, INITIAL_USAGE_DATA_STRUCTURE.copy()
+        )
+        app_usage["daily_seconds_today"] += args.minutes * 60
+        app_usage["daily_seconds_today"] = max(app_usage["daily_seconds_today"], 0)
+        app_usage["weekly_seconds_this_week"] += args.minutes * 60
+        app_usage["weekly_seconds_this_week"] = max(
+            app_usage["weekly_seconds_this_week"], 0
+        )
+        save_json(USAGE_DATA_PATH, usage_data)
     # print the result
     add_or_remove = "added" if args.minutes >= 0 else "removed"
     print(
@@ -431,52 +883,52 @@ def _handle_list_command(args, config):
         )
 
 
-def _handle_status_command(args, config):
+def _handle_status_command(args, config, clock=SYSTEM_CLOCK):
     """
     handle status command
     :param args: the argparse namespace
     :param config: the config dict read from config file
+    :param clock: the clock to read the current time from
     :return: None
     """
 
+    # psutil is only needed by status, keep it out of the other commands' startup
+    from applimiter.process_handler import get_process_pids
+
     usage_data = load_json(USAGE_DATA_PATH, {}, read_only=True)
     print("--- Application Status ---")
     # applications
     if not config.get("applications"):
         print("No applications configured.")
+    is_weekday = 0 <= clock.now().weekday() <= 4
+    day_type_str = (
+        "(Weekday)" if is_weekday else "(Weekend)"
+    )
+    # pids by app, groups are running when any of their apps is
+    running_pids = {}
     for app_conf in config.get("applications", []):
         name = app_conf["name"]
         app_usage = usage_data.get(name, INITIAL_USAGE_DATA_STRUCTURE.copy())
-        daily_used_s = app_usage.get("daily_seconds_today", 0)
-        weekly_used_s = app_usage.get("weekly_seconds_this_week", 0)
-        is_weekday = 0 <= datetime.datetime.now().weekday() <= 4
-        day_type_str = (
-            "(Weekday)" if is_weekday else "(Weekend)"
-        )
-        todays_daily_limit_m = app_conf.get("daily_limits_by_day", {}).get(
-            "weekdays" if day_type_str == "(Weekday)" else "weekends", float("inf")
-        )
-        weekly_limit_m = app_conf.get("weekly_limit_minutes", float("inf"))
         pids = get_process_pids(app_conf.get("process_keywords", []))
+        running_pids[name] = pids
         running_status = f"Running (PIDs: {pids})" if pids else "Not Running"
         print(f"\nApp: {name} ({running_status})")
-        print(
-            f"  Today {day_type_str}: {daily_used_s / 60:.1f} /"
-            f" {todays_daily_limit_m if todays_daily_limit_m != float('inf') else 'Unlimited'} min"
+        _print_usage_status(app_usage, app_conf, day_type_str, clock)
+    # groups
+    if config.get("groups"):
+        print("\n--- Group Status ---")
+    for group_conf in config.get("groups", []):
+        member_names = group_conf.get("apps", [])
+        running_members = [name for name in member_names if running_pids.get(name)]
+        running_status = (
+            f"Running: {', '.join(running_members)}" if running_members else "Not Running"
         )
-        print(
-            f"  This Week: {weekly_used_s / 60:.1f} / "
-            f"{weekly_limit_m if weekly_limit_m != float('inf') else 'Unlimited'} min"
+        print(f"\nGroup: {group_conf['name']} ({running_status})")
+        print(f"  Apps: {', '.join(member_names) or 'None'}")
+        group_usage = usage_data.get(
+            group_usage_name(group_conf["name"]), INITIAL_USAGE_DATA_STRUCTURE.copy()
         )
-        if app_usage.get("first_limit_breach_timestamp"):
-            breach_time = app_usage["first_limit_breach_timestamp"]
-            grace_ends = breach_time + GRACE_PERIOD_SECONDS
-            if time.time() < grace_ends:
-                print(
-                    f"  Status: In grace period ({int(grace_ends - time.time())}s remaining)"
-                )
-            else:
-                print("  Status: Grace period expired")
+        _print_usage_status(group_usage, group_conf, day_type_str, clock)
     print("\n--- Global Configuration ---")
     # modification delay
     modification_delay_enabled = config.get('enable_config_modification_delay', False)
@@ -484,6 +936,9 @@ def _handle_status_command(args, config):
     if modification_delay_enabled:
         modification_delay_str += f" {config.get('config_modification_delay_seconds', 0)} s"
     print(modification_delay_str)
+    print(
+        f"Per-User Limits: {'Enabled' if config.get('enable_per_user_limits', False) else 'Disabled'}"
+    )
     # pending modifications
     if config.get("pending_modifications"):
         print(
@@ -493,11 +948,132 @@ def _handle_status_command(args, config):
         print("No pending modifications.")
 
 
-def _handle_pending_command(args, config):
+def _print_usage_status(app_usage, app_conf, day_type_str, clock=SYSTEM_CLOCK):
+    """
+    Print the usage of an app or group against its limits, and of each user with per-user limits
+    :param app_usage: the usage data of the app or group
+    :param app_conf: the config of the app or group
+    :param day_type_str: "(Weekday)" or "(Weekend)"
+    :param clock: the clock to read the current time from
+    :return: None
+    """
+    daily_used_s = app_usage.get("daily_seconds_today", 0)
+    weekly_used_s = app_usage.get("weekly_seconds_this_week", 0)
+    todays_daily_limit_m = app_conf.get("daily_limits_by_day", {}).get(
+        "weekdays" if day_type_str == "(Weekday)" else "weekends", float("inf")
+    )
+    weekly_limit_m = app_conf.get("weekly_limit_minutes", float("inf"))
+    print(
+        f"  Today {day_type_str}: {daily_used_s / 60:.1f} /"
+        f" {todays_daily_limit_m if todays_daily_limit_m != float('inf') else 'Unlimited'} min"
+    )
+    print(
+        f"  This Week: {weekly_used_s / 60:.1f} / "
+        f"{weekly_limit_m if weekly_limit_m != float('inf') else 'Unlimited'} min"
+    )
+    if app_usage.get("first_limit_breach_timestamp"):
+        breach_time = app_usage["first_limit_breach_timestamp"]
+        grace_ends = breach_time + GRACE_PERIOD_SECONDS
+        if clock.time() < grace_ends:
+            print(
+                f"  Status: In grace period ({int(grace_ends - clock.time())}s remaining)"
+            )
+        else:
+            print("  Status: Grace period expired")
+    _print_rolling_status(app_usage, app_conf, clock)
+    _print_schedule_status(app_conf, clock)
+    # with per-user limits, each user's usage
+    for uid_str, user_usage in sorted(app_usage.get("users", {}).items()):
+        user_status = ""
+        if user_usage.get("first_limit_breach_timestamp"):
+            grace_ends = user_usage["first_limit_breach_timestamp"] + GRACE_PERIOD_SECONDS
+            user_status = (
+                f", in grace period ({int(grace_ends - clock.time())}s remaining)"
+                if clock.time() < grace_ends
+                else ", grace period expired"
+            )
+        print(
+            f"  User {_user_name(uid_str)}:"
+            f" today {user_usage.get('daily_seconds_today', 0) / 60:.1f} min,"
+            f" this week {user_usage.get('weekly_seconds_this_week', 0) / 60:.1f} min"
+            f"{user_status}"
+        )
+
+
+def _print_rolling_status(app_usage, app_conf, clock=SYSTEM_CLOCK):
+    """
+    Print the usage in each rolling window of an app or group, as of now
+    :param app_usage: the usage data of the app or group
+    :param app_conf: the config of the app or group
+    :param clock: the clock to read the current time from
+    :return: None
+    """
+    import copy
+
+    from applimiter.rolling import RollingUsage, parse_rolling_limits, format_window
+
+    rolling_limits = parse_rolling_limits(app_conf)
+    if not rolling_limits:
+        return
+    # slide a copy to now, the daemon last moved the windows at its last cycle
+    rolling_usage = RollingUsage(
+        copy.deepcopy(app_usage.get("rolling_usage") or {}),
+        [window for window, _ in rolling_limits],
+    )
+    rolling_usage.advance(clock.time())
+    for window, limit_seconds in rolling_limits:
+        print(
+            f"  Last {format_window(window)}: {rolling_usage.window_seconds(window) / 60:.1f} /"
+            f" {limit_seconds / 60:.0f} min"
+        )
+
+
+def _print_schedule_status(app_conf, clock=SYSTEM_CLOCK):
+    """
+    Print the allowed hours of an app or group, and whether it is allowed now
+    :param app_conf: the config of the app or group
+    :param clock: the clock to read the current time from
+    :return: None
+    """
+    if not app_conf.get("schedule"):
+        return
+    from applimiter.schedule import CompiledSchedule
+
+    try:
+        schedule = CompiledSchedule(app_conf["schedule"])
+    except ValueError as e:
+        print(f"  Allowed Hours: invalid schedule ({e})")
+        return
+    timezone_str = f" ({app_conf['schedule']['timezone']})" if app_conf["schedule"].get("timezone") else ""
+    print(f"  Allowed Hours: {schedule.describe() or 'never'}{timezone_str}")
+    now_ts = clock.time()
+    state_str = "Allowed" if schedule.is_allowed(now_ts) else "Not allowed"
+    next_transition = schedule.next_transition(now_ts)
+    if next_transition is not None:
+        until_str = datetime.datetime.fromtimestamp(next_transition, schedule.timezone).strftime(
+            "%a %H:%M"
+        )
+        state_str += f" until {until_str}"
+    print(f"  Schedule: {state_str}")
+
+
+def _user_name(uid_str):
+    """
+    :param uid_str: a user id, as stored in the usage data
+    :return: the user's login name, or the uid if it has none
+    """
+    try:
+        return pwd.getpwuid(int(uid_str)).pw_name
+    except (KeyError, ValueError):
+        return uid_str
+
+
+def _handle_pending_command(args, config, clock=SYSTEM_CLOCK):
     """
     Handle pending command
     :param args: the argparse namespace
     :param config: the config dict read from config file
+    :param clock: the clock to read the current time from
     :return: None
     """
     if args.pending_action == "list":
@@ -509,8 +1085,8 @@ def _handle_pending_command(args, config):
         for idx, item in enumerate(current_pending_list):
             unlock_time_unix = item.get("unlock_timestamp")
             time_left_str = " (Applicable)"
-            if time.time() < unlock_time_unix:
-                time_left = unlock_time_unix - time.time()
+            if clock.time() < unlock_time_unix:
+                time_left = unlock_time_unix - clock.time()
                 time_left_str = f" ({int(time_left // 60)}m {int(time_left % 60)}s until applicable)"
             print(
                 f"\n[{idx + 1}] ID: {item.get('id', 'No ID')}\n"
@@ -546,16 +1122,15 @@ def _handle_pending_command(args, config):
         save_json(CONFIG_FILE_PATH, config)
 
     elif args.pending_action == "apply":
-        _apply_pending_modifications_logic(
-            args, config
-        )
+        _apply_pending_modifications_logic(args, config, clock)
 
 
-def _handle_remove_command(args, config):
+def _handle_remove_command(args, config, clock=SYSTEM_CLOCK):
     """
     Handle remove command
     :param args: argparse namespace
     :param config: the config dict read from config file
+    :param clock: the clock to read the current time from
     :return: None
     """
     app_name = args.name
@@ -564,17 +1139,11 @@ def _handle_remove_command(args, config):
         print(f"Error: Application '{app_name}' not found.", file=sys.stderr)
         return
 
-    if config.get("enable_config_modification_delay", False):
-        action_payload = {"action": "remove_app", "payload": {"name": app_name}}
-        pending_item = {
-            **action_payload,
-            "unlock_timestamp": time.time() + config.get("config_modification_delay_seconds", 0),
-            "id": f"{datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%S%f')}_remove_{app_name}",
-        }
-        config.setdefault("pending_modifications", []).append(
-            pending_item
+    action_payload = {"action": "remove_app", "payload": {"name": app_name}}
+    if modification_needs_delay(config, action_payload):
+        pending_item = _queue_pending_modification(
+            config, action_payload, f"remove_{app_name}", clock
         )
-        save_json(CONFIG_FILE_PATH, config)
         unlock_time_str = datetime.datetime.fromtimestamp(
             pending_item["unlock_timestamp"]
         ).strftime("%Y-%m-%d %H:%M:%S")
@@ -587,18 +1156,15 @@ def _handle_remove_command(args, config):
         ]
         save_json(CONFIG_FILE_PATH, config)
         print(f"Application '{app_name}' removed from configuration.")
-        usage_data = load_json(USAGE_DATA_PATH, read_only=False)
-        if app_name in usage_data:
-            usage_data.pop(app_name)
-            save_json(USAGE_DATA_PATH, usage_data)
-            print(f"Usage data for '{app_name}' cleaned up.")
+        _cleanup_usage_data([app_name])
 
 
-def _apply_pending_modifications_logic(args, config):
+def _apply_pending_modifications_logic(args, config, clock=SYSTEM_CLOCK):
     """
     Apply the pending modifications based on item number or all.
     :param args: argparse.Namespace that contains the CLI input.
     :param config: the config dict read from config file
+    :param clock: the clock to read the current time from
     :return: None
     """
     pending_mod_list = config.get("pending_modifications", [])
@@ -614,7 +1180,7 @@ def _apply_pending_modifications_logic(args, config):
         items_to_process = [
             (idx, item)
             for idx, item in enumerate(pending_mod_list)
-            if time.time() >= item.get("unlock_timestamp", 0)
+            if clock.time() >= item.get("unlock_timestamp", 0)
         ]
         if not items_to_process:
             print("No pending modifications are ready to be applied.")
@@ -626,7 +1192,7 @@ def _apply_pending_modifications_logic(args, config):
                 print("Error: Invalid index.",
                       file=sys.stderr)
                 return
-            if time.time() < pending_mod_list[item_index].get("unlock_timestamp", 0):
+            if clock.time() < pending_mod_list[item_index].get("unlock_timestamp", 0):
                 print("Error: This modification is not yet unlocked.",
                       file=sys.stderr)
                 return
@@ -641,22 +1207,19 @@ def _apply_pending_modifications_logic(args, config):
 
     for idx, pending_item in items_to_process:
         logger.info(f"Applying pending modification (ID: {pending_item.get('id')})...")
-        if _apply_config_modification(config, pending_item):
+        error = apply_config_modification(config, pending_item)
+        # recorded like the daemon records the modifications it applies
+        append_json_line(AUDIT_LOG_PATH, audit_entry(pending_item, "cli", clock.now(), error))
+        if not error:
             print(
                 f"Successfully applied pending modification: {pending_item.get('action')} for {pending_item.get('payload', {}).get('name')}"
             )
             changes_applied_count += 1
             indices_to_remove.append(idx)
 
-            if pending_item.get("action") == "remove_app":
-                app_name = pending_item.get("payload", {}).get("name")
-                if app_name:
-                    usage_data = load_json(USAGE_DATA_PATH, read_only=False)
-                    if app_name in usage_data:
-                        usage_data.pop(app_name)
-                        save_json(USAGE_DATA_PATH, usage_data)
-                        print(f"Cleaned up usage data for '{app_name}'.")
+            _cleanup_usage_data(removed_app_names(pending_item))
         else:
+            print(f"Error: {error}", file=sys.stderr)
             logger.error(
                 f"Failed to apply pending modification (ID: {pending_item.get('id')})."
             )
@@ -673,6 +1236,25 @@ def _apply_pending_modifications_logic(args, config):
         )
 
 
+def _cleanup_usage_data(app_names):
+    """
+    Remove the usage data of removed apps with a single write.
+    :param app_names: the names of the removed apps
+    :return: None
+    """
+    if not app_names:
+        return
+    with locked_file(USAGE_DATA_PATH, exclusive=True):
+        usage_data = load_json(USAGE_DATA_PATH, read_only=False)
+        cleaned_names = [
+            name for name in app_names if usage_data.pop(name, None) is not None
+        ]
+        if cleaned_names:
+            save_json(USAGE_DATA_PATH, usage_data)
+    for app_name in cleaned_names:
+        print(f"Cleaned up usage data for '{app_name}'.")
+
+
 def _apply_config_modification(config, modification_to_apply):
     """
     Applies a configuration modification to the config dictionary in memory.
@@ -680,55 +1262,8 @@ def _apply_config_modification(config, modification_to_apply):
     :param modification_to_apply: the modification to apply
     :return: True if the modification is applied, False otherwise
     """
-    action = modification_to_apply["action"]
-    payload = modification_to_apply["payload"]
-    apps = config.get("applications", [])
-
-    exists_app = check_exists_app(payload["name"], config)
-    # add
-    if action == "add_app":
-        if exists_app:
-            print(
-                f"Error: Application '{payload['name']}' already exists.",
-                file=sys.stderr,
-            )
-            return False
-        apps.append(payload)
-
-    # remove
-    elif action == "remove_app":
-        if not exists_app:
-            print(
-                f"Error: Application '{payload['name']}' not found in config.",
-                file=sys.stderr,
-            )
-            return False
-        config["applications"] = [
-            app for app in apps if app["name"] != payload["name"]
-        ]
-
-    # update
-    elif action == "update_app":
-        if not exists_app:
-            print(
-                f"Error: Application '{payload['name']}' not found for update.",
-                file=sys.stderr,
-            )
-            return False
-
-        for app in apps:
-            if app["name"] == payload["name"]:
-                app.update({k: v for k, v in payload.items() if v is not None})
-                break
-
-    # config delay
-    elif action == "set_config_delay":
-        config["enable_config_modification_delay"] = payload.get("enable", False)
-        config["config_modification_delay_seconds"] = payload.get("delay_seconds", 0)
-
-
-    else:
-        print(f"Error: Unknown action '{action}'.", file=sys.stderr)
+    error = apply_config_modification(config, modification_to_apply)
+    if error:
+        print(f"Error: {error}", file=sys.stderr)
         return False
-
     return True
@@ -0,0 +1,255 @@
+# AppLimiter/src/applimiter/clock.py
+
+"""
+Store the clocks used by the daemon and the cli.
+
+All reads of the current time and all sleeps go through a clock object, so the
+daemon can be driven by a VirtualClock in replays, simulations and tests.
+
+The monotonic clock stops while the machine is suspended, the boot time clock
+doesn't, so the difference between the two is the time spent suspended.
+"""
+
+import os
+import time
+import select
+import logging
+import weakref
+import datetime
+
+logger = logging.getLogger(__name__)
+
+# prctl options from <linux/prctl.h>
+_PR_SET_TIMERSLACK = 29
+_PR_GET_TIMERSLACK = 30
+
+
+class SystemClock:
+    """
+    The real wall and monotonic clocks of the machine.
+    """
+
+    def time(self):
+        """
+        :return: the current unix timestamp in seconds
+        """
+        return time.time()
+
+    def now(self, tz=None):
+        """
+        :param tz: an optional tzinfo, local time is used if None
+        :return: the current datetime
+        """
+        return datetime.datetime.now(tz)
+
+    def monotonic(self):
+        """
+        :return: a monotonic timestamp in seconds, only meaningful as a difference
+        """
+        return time.monotonic()
+
+    def boottime(self):
+        """
+        :return: like monotonic, but also counting the time spent suspended
+        """
+        if hasattr(time, "CLOCK_BOOTTIME"):
+            return time.clock_gettime(time.CLOCK_BOOTTIME)
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        """
+        Block for the given number of seconds.
+        :param seconds: the number of seconds to sleep
+        :return: None
+        """
+        time.sleep(seconds)
+
+    def wait(self, event, seconds):
+        """
+        Block for the given number of seconds, or until the event is set.
+        :param event: a WakeupPipe or threading.Event that ends the wait early
+        :param seconds: the maximum number of seconds to wait
+        :return: True if the event was set, False if the time ran out
+        """
+        return event.wait(seconds)
+
+
+class WakeupPipe:
+    """
+    A self-pipe with the interface of threading.Event, that wakes a wait from a signal handler.
+    Setting a threading.Event from a signal handler takes its lock, which the interrupted main
+    thread may be holding. The pipe has no lock: installed with signal.set_wakeup_fd, the
+    interpreter writes to it when a signal arrives, before any Python handler runs.
+    """
+
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        os.set_blocking(self.read_fd, False)
+        os.set_blocking(self.write_fd, False)
+        self._finalizer = weakref.finalize(self, _close_fds, self.read_fd, self.write_fd)
+
+    def set(self):
+        """
+        Wake the waiter, from any thread.
+        :return: None
+        """
+        try:
+            os.write(self.write_fd, b"\0")
+        except BlockingIOError:
+            # the pipe is full, the waiter is woken anyway
+            pass
+
+    def is_set(self):
+        """
+        :return: True if the pipe has a pending wake-up
+        """
+        return self.wait(0)
+
+    def wait(self, timeout=None):
+        """
+        Block until woken, or for at most timeout seconds.
+        :param timeout: the maximum number of seconds to wait, forever if None
+        :return: True if woken, False if the time ran out
+        """
+        readable, _, _ = select.select([self.read_fd], [], [], timeout)
+        return bool(readable)
+
+    def clear(self):
+        """
+        Drop the pending wake-ups.
+        :return: None
+        """
+        try:
+            while os.read(self.read_fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        """
+        Close both ends of the pipe.
+        :return: None
+        """
+        self._finalizer()
+
+
+def _close_fds(*fds):
+    for fd in fds:
+        os.close(fd)
+
+
+class VirtualClock:
+    """
+    A clock that only moves when told to, sleeping advances it instantly.
+    """
+
+    def __init__(self, start_timestamp=0.0):
+        """
+        :param start_timestamp: the unix timestamp the clock starts at
+        """
+        self._timestamp = float(start_timestamp)
+        self._monotonic = 0.0
+        self._boottime = 0.0
+
+    def time(self):
+        return self._timestamp
+
+    def now(self, tz=None):
+        return datetime.datetime.fromtimestamp(self._timestamp, tz)
+
+    def monotonic(self):
+        return self._monotonic
+
+    def boottime(self):
+        return self._boottime
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def wait(self, event, seconds):
+        if event.is_set():
+            return True
+        self.advance(seconds)
+        return False
+
+    def advance(self, seconds):
+        """
+        Move the clock forward.
+        :param seconds: the number of seconds to move forward
+        :return: None
+        """
+        if seconds < 0:
+            raise ValueError("A virtual clock cannot move backwards.")
+        self._timestamp += seconds
+        self._monotonic += seconds
+        self._boottime += seconds
+
+    def suspend(self, seconds):
+        """
+        Move the clock forward as if the machine was suspended, the monotonic clock stands still.
+        :param seconds: the number of seconds spent suspended
+        :return: None
+        """
+        if seconds < 0:
+            raise ValueError("A virtual clock cannot move backwards.")
+        self._timestamp += seconds
+        self._boottime += seconds
+
+    def set_time(self, timestamp, monotonic=None, boottime=None):
+        """
+        Jump the wall clock to a timestamp, the monotonic clocks follow forward jumps only,
+        unless their recorded values are given.
+        :param timestamp: the new unix timestamp
+        :param monotonic: the new monotonic time, e.g. recorded in a trace
+        :param boottime: the new boot time, e.g. recorded in a trace
+        :return: None
+        """
+        forward = max(timestamp - self._timestamp, 0.0)
+        if monotonic is None or boottime is None:
+            self._monotonic += forward
+            self._boottime += forward
+        else:
+            self._monotonic = float(monotonic)
+            self._boottime = float(boottime)
+        self._timestamp = float(timestamp)
+
+
+def set_timer_slack(seconds):
+    """
+    Set the timer slack of the calling thread with prctl(PR_SET_TIMERSLACK).
+    The kernel may then delay the thread's timed waits by up to this much, so that
+    its wake-ups are coalesced with other timers and the CPU stays idle longer.
+    :param seconds: the allowed slack in seconds
+    :return: True if the slack was set, False if not supported
+    """
+    try:
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        result = libc.prctl(
+            _PR_SET_TIMERSLACK, ctypes.c_ulong(int(seconds * 1_000_000_000)), 0, 0, 0
+        )
+    except (OSError, AttributeError) as e:
+        logger.debug(f"Timer slack not supported: {e}")
+        return False
+    if result != 0:
+        logger.debug(f"prctl(PR_SET_TIMERSLACK) failed with errno {ctypes.get_errno()}")
+        return False
+    return True
+
+
+def get_timer_slack():
+    """
+    :return: the timer slack of the calling thread in seconds, or None if not supported
+    """
+    try:
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        result = libc.prctl(_PR_GET_TIMERSLACK, 0, 0, 0, 0)
+    except (OSError, AttributeError):
+        return None
+    return result / 1_000_000_000 if result >= 0 else None
+
+
+SYSTEM_CLOCK = SystemClock()
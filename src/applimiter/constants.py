@@ -7,9 +7,42 @@ Store all constants
 
 CONFIG_FILE_PATH = "/etc/AppLimiter/config.json"
 USAGE_DATA_PATH = "/var/lib/AppLimiter/usage_data.json"
+AUDIT_LOG_PATH = "/var/lib/AppLimiter/audit.log"
+# per-minute usage history, one directory per app, read by the 'report' command
+HISTORY_DIR_PATH = "/var/lib/AppLimiter/history"
+# the history keeps minutes, then hours for this many days, and days forever by default
+HISTORY_MINUTE_RETENTION_DAYS = 90
+HISTORY_HOUR_RETENTION_DAYS = 2 * 365
+# old history is compacted after cycles within this time, and looked for at most this often
+HISTORY_COMPACTION_BUDGET_SECONDS = 0.05
+HISTORY_COMPACTION_SCAN_INTERVAL_SECONDS = 60 * 60
 GRACE_PERIOD_SECONDS = 5 * 60
 PROCESS_TERMINATING_PATIENCE = 5
 DAEMON_CHECK_INTERVAL_SECONDS = 60
+# intervals up to this run in fast mode: a full rescan and usage save only every
+# FULL_CYCLE_INTERVAL_SECONDS, and cheap incremental cycles in between
+FAST_MODE_MAX_INTERVAL_SECONDS = 5
+FULL_CYCLE_INTERVAL_SECONDS = 60
+# the daemon's wake-ups may be delayed by this fraction of the interval, at most a second
+DAEMON_TIMER_SLACK_FRACTION = 0.01
+DAEMON_TIMER_SLACK_MAX_SECONDS = 1.0
+# process and session caches of a stopped daemon, /run is emptied at boot
+DAEMON_STATE_SNAPSHOT_PATH = "/run/applimiter/daemon_state.json"
+# the login records read by the 'users' command, rewritten on every login and logout
+UTMP_PATH = "/run/utmp"
+SESSION_CACHE_MAX_AGE_SECONDS = 5 * 60
+# a desktop session gets at most one notification dialog this often, later ones are merged into it
+NOTIFICATION_MIN_INTERVAL_SECONDS = 60
+# the PATH of programs started in a user's desktop session
+SESSION_PATH = "/usr/local/bin:/usr/bin:/bin"
+# how long to wait for a user's session bus before falling back to zenity
+DBUS_TIMEOUT_SECONDS = 2
+# how often the grace period countdown dialogs are updated between cycles
+COUNTDOWN_UPDATE_SECONDS = 5
+# rolling limits keep per-minute usage for the longest window allowed
+ROLLING_WINDOW_MAX_MINUTES = 24 * 60
+# schedules are compiled into transition times for this many days ahead
+SCHEDULE_HORIZON_DAYS = 8
 
 
 DEFAULT_CONFIG_FILE = {
@@ -17,11 +50,23 @@ DEFAULT_CONFIG_FILE = {
     "enable_config_modification_delay": False,
     "config_modification_delay_seconds": 0,
     "pending_modifications": [],
-
+    "enable_exec_blocking": False,
+    "enable_per_user_limits": False,
+    "notification_min_interval_seconds": NOTIFICATION_MIN_INTERVAL_SECONDS,
+    "history_retention": {
+        "minute_days": HISTORY_MINUTE_RETENTION_DAYS,
+        "hour_days": HISTORY_HOUR_RETENTION_DAYS,
+        "day_days": None,
+    },
 }
 
 DEFAULT_USAGE_DATA_FILE = {}
 
+# the usage data values that only accumulate, a concurrent change of the cli adds to them,
+# for every other value the daemon's change wins
+USAGE_COUNTER_KEYS = frozenset(
+    {"daily_seconds_today", "weekly_seconds_this_week", "minutes", "window_sums"}
+)
 INITIAL_USAGE_DATA_STRUCTURE = {
     "daily_seconds_today": 0,
     "weekly_seconds_this_week": 0,
@@ -33,4 +78,10 @@ INITIAL_USAGE_DATA_STRUCTURE = {
     "notif_weekly_limit_reached_sent": False,
     "first_limit_breach_type": None,
     "first_limit_breach_timestamp": None,
+    "notif_rolling_5_sent": False,
+    "notif_rolling_limit_reached_sent": False,
+    # the schedule transition the app was last warned about
+    "notif_schedule_warning_for": None,
+    # the per-minute ring buffer of apps with rolling limits, see rolling.RollingUsage
+    "rolling_usage": None,
 }
@@ -6,8 +6,11 @@ Contains the core run_daemon function for background monitoring.
 
 import os
 import sys
+import copy
 import time
+import signal
 import datetime
+import itertools
 import logging
 import traceback
 
@@ -15,15 +18,60 @@ import traceback
 from applimiter.constants import (
     CONFIG_FILE_PATH,
     USAGE_DATA_PATH,
+    AUDIT_LOG_PATH,
     GRACE_PERIOD_SECONDS,
     DAEMON_CHECK_INTERVAL_SECONDS,
+    FAST_MODE_MAX_INTERVAL_SECONDS,
+    FULL_CYCLE_INTERVAL_SECONDS,
+    DAEMON_TIMER_SLACK_FRACTION,
+    DAEMON_TIMER_SLACK_MAX_SECONDS,
+    DAEMON_STATE_SNAPSHOT_PATH,
+    HISTORY_COMPACTION_BUDGET_SECONDS,
+    NOTIFICATION_MIN_INTERVAL_SECONDS,
+    COUNTDOWN_UPDATE_SECONDS,
     DEFAULT_CONFIG_FILE,
     DEFAULT_USAGE_DATA_FILE,
     INITIAL_USAGE_DATA_STRUCTURE,
+    USAGE_COUNTER_KEYS,
+)
+from applimiter.clock import SYSTEM_CLOCK, WakeupPipe, set_timer_slack
+from applimiter.sd_notify import SystemdNotifier
+from applimiter.exec_blocker import ExecBlocker, executable_file_id
+from applimiter.cgroups import CgroupManager
+from applimiter.rolling import RollingUsage, parse_rolling_limits, format_window
+from applimiter.schedule import CompiledSchedule
+from applimiter.history import UsageHistory
+from applimiter.dbus_notify import DBusNotifier
+from applimiter.utils import (
+    load_json,
+    save_json,
+    load_json_versioned,
+    save_json_versioned,
+    locked_file,
+    file_version,
+    merge_json_changes,
+    append_json_line,
+    check_dependencies,
+    group_usage_name,
+)
+from applimiter.modifications import (
+    PendingScheduler,
+    apply_config_modification,
+    audit_entry,
+    removed_app_names,
+)
+from applimiter.process_handler import (
+    ProcessTableCache,
+    scan_process_table,
+    match_process_table,
+    terminate_processes,
+    build_children_index,
+    collect_process_subtrees,
 )
-from applimiter.utils import load_json, save_json, check_dependencies
-from applimiter.process_handler import get_process_pids, terminate_process
 from applimiter.notification_manager import (
+    DesktopSessionCache,
+    NotificationAggregator,
+    CountdownDialogs,
     get_desktop_users_with_display_info,
     send_desktop_notification_zenity,
 )
@@ -32,10 +80,11 @@ from applimiter.notification_manager import (
 logger = logging.getLogger(__name__)
 
 
-def run_daemon(check_interval=DAEMON_CHECK_INTERVAL_SECONDS):
+def run_daemon(check_interval=DAEMON_CHECK_INTERVAL_SECONDS, recorder=None):
     """
     The main daemon loop to monitor application usage
     :param check_interval: the interval between checks in seconds
+    :param recorder: an optional replay.TraceRecorder that records every cycle's inputs
     :return: None
     """
     # exit if not running in root
@@ -65,252 +114,1354 @@ def run_daemon(check_interval=DAEMON_CHECK_INTERVAL_SECONDS):
         f"Check interval: {check_interval}"
     )
 
+    # accounting measures the real time between cycles, so late wake-ups cost nothing
+    set_timer_slack(
+        min(check_interval * DAEMON_TIMER_SLACK_FRACTION, DAEMON_TIMER_SLACK_MAX_SECONDS)
+    )
+
+    notifier = SystemdNotifier()
+    exec_blocker = ExecBlocker()
+    cgroups = CgroupManager() if CgroupManager.is_available() else None
+    app_limiter_daemon = AppLimiterDaemon(
+        check_interval,
+        recorder=recorder,
+        notifier=notifier,
+        exec_blocker=exec_blocker,
+        cgroups=cgroups,
+        history=UsageHistory(clock=SYSTEM_CLOCK),
+    )
+    app_limiter_daemon.restore_snapshot(DAEMON_STATE_SNAPSHOT_PATH)
+    app_limiter_daemon.install_signal_handlers()
     try:
-        while True:
-            # load config amd usage data
-            config = load_json(CONFIG_FILE_PATH, DEFAULT_CONFIG_FILE)
-            usage_data_all_apps = load_json(USAGE_DATA_PATH, DEFAULT_USAGE_DATA_FILE)
-
-            # record if need to save usage data file
-            apps_data_changed_this_cycle = False
-
-            # --- time logic ---
-            now = datetime.datetime.now()
-            # get current date and weekday
-            today_str = now.strftime("%Y-%m-%d")
-            day_of_week_today = now.weekday()  # 0 is Monday, 6 is Sunday
-            # get the start date of current week
-            days_since_week_start = (day_of_week_today - 0) % 7
-            current_week_start_date = now - datetime.timedelta(
-                days=days_since_week_start
+        app_limiter_daemon.run_forever()
+        logger.info("App Limiter daemon stopped by signal.")
+
+    except KeyboardInterrupt:
+        logger.info("App Limiter daemon stopped by user (KeyboardInterrupt).")
+    except Exception as e:
+        logger.critical(f"A critical error occurred in the main daemon loop: {e}")
+        logger.error(traceback.format_exc())
+    finally:
+        notifier.stopping()
+        # never leave an app frozen or throttled behind
+        app_limiter_daemon.release_escalations()
+        app_limiter_daemon.save_snapshot(DAEMON_STATE_SNAPSHOT_PATH)
+        if recorder is not None:
+            recorder.close()
+        exec_blocker.close()
+        if app_limiter_daemon.desktop_notifier is not None:
+            app_limiter_daemon.desktop_notifier.close()
+        if app_limiter_daemon.countdowns is not None:
+            app_limiter_daemon.countdowns.close_all()
+        notifier.close()
+        signal.set_wakeup_fd(-1)
+        app_limiter_daemon._wake_event.close()
+        logger.info("App Limiter daemon is shutting down.")
+
+
+class AppLimiterDaemon:
+    """
+    Runs the monitoring cycles of the daemon.
+
+    The clock, process scan, desktop user discovery, notifications and termination
+    are collaborators passed to the constructor, so that replay, simulation and
+    benchmarks can substitute stand-ins and drive the exact same accounting logic.
+    """
+
+    def __init__(
+        self,
+        check_interval=DAEMON_CHECK_INTERVAL_SECONDS,
+        scan_processes=None,
+        get_desktop_users=None,
+        send_notification=None,
+        terminate=None,
+        recorder=None,
+        clock=None,
+        notifier=None,
+        process_cache=None,
+        exec_blocker=None,
+        cgroups=None,
+        history=None,
+        countdowns=None,
+    ):
+        """
+        :param check_interval: the interval between checks in seconds, fast mode if at most FAST_MODE_MAX_INTERVAL_SECONDS
+        :param scan_processes: returns the current process table, defaults to a ProcessTableCache
+        :param get_desktop_users: returns the desktop users to notify, defaults to a DesktopSessionCache
+        :param send_notification: sends one notification to one desktop user, defaults to D-Bus with a zenity fallback
+        :param terminate: terminates one process of an app, by default whole subtrees are terminated in one batch
+        :param recorder: an optional replay.TraceRecorder
+        :param clock: the clock to read the time from, defaults to the system clock
+        :param notifier: an optional sd_notify.SystemdNotifier told about readiness and each cycle
+        :param process_cache: the ProcessTableCache used if scan_processes is None, defaults to one of /proc
+        :param exec_blocker: an optional exec_blocker.ExecBlocker, used if "enable_exec_blocking" is set in config
+        :param cgroups: an optional cgroups.CgroupManager, used for apps with an "escalation" config
+        :param history: an optional history.UsageHistory the credited usage is recorded in
+        :param countdowns: shows the grace period countdowns, defaults to CountdownDialogs with the real notifications
+        """
+        self.check_interval = check_interval
+        # notifications go to the users' session buses, zenity is the fallback
+        self.desktop_notifier = None
+        if send_notification is None:
+            self.desktop_notifier = DBusNotifier(fallback=send_desktop_notification_zenity)
+            send_notification = self.desktop_notifier.send
+            if countdowns is None:
+                countdowns = CountdownDialogs()
+        # one live countdown dialog per session and app during the grace period
+        self.countdowns = countdowns
+        # the notifications of a cycle go out together, one dialog per desktop session
+        self.notifications = NotificationAggregator(send_notification)
+        self.terminate = terminate
+        self.recorder = recorder
+        self.clock = clock or SYSTEM_CLOCK
+        self.notifier = notifier
+        self._ready_sent = False
+        self._last_watchdog_ping = None
+
+        # the caches are only used with the real collaborators
+        self.process_cache = None
+        scan_new_processes = scan_processes
+        if scan_processes is None:
+            self.process_cache = process_cache or ProcessTableCache()
+            scan_processes = self.process_cache.scan
+            scan_new_processes = self.process_cache.scan_new
+        self.session_cache = None
+        if get_desktop_users is None:
+            self.session_cache = DesktopSessionCache(
+                get_desktop_users_with_display_info, clock=self.clock
             )
-            current_week_start_date_str = current_week_start_date.strftime("%Y-%m-%d")
-
-            # get desktop user info
-            current_desktop_users = get_desktop_users_with_display_info()
-            # iterate through each configured application
-            for app_config in config.get("applications", []):
-                app_name = app_config["name"]
-                keywords = app_config.get("process_keywords", [])
-
-                # ... (limit calculation logic) ...
-                daily_limits_by_day_config = app_config.get("daily_limits_by_day")
-                todays_daily_limit_min = float("inf")
-                if daily_limits_by_day_config:
-                    if 0 <= day_of_week_today <= 4:
-                        todays_daily_limit_min = float(
-                            daily_limits_by_day_config.get("weekdays", float("inf"))
-                        )
-                    else:
-                        todays_daily_limit_min = float(
-                            daily_limits_by_day_config.get("weekends", float("inf"))
-                        )
-                daily_limit_sec = (
-                    todays_daily_limit_min * 60
-                    if todays_daily_limit_min != float("inf")
-                    else float("inf")
-                )
-                weekly_limit_sec_val = app_config.get(
-                    "weekly_limit_minutes", float("inf")
-                )
-                weekly_limit_sec = (
-                    float(weekly_limit_sec_val) * 60
-                    if weekly_limit_sec_val != float("inf")
-                    else float("inf")
+            get_desktop_users = self.session_cache.get_users
+        self.scan_processes = scan_processes
+        self.scan_new_processes = scan_new_processes
+        self.get_desktop_users = get_desktop_users
+        self.fast_mode = check_interval <= FAST_MODE_MAX_INTERVAL_SECONDS
+        self._last_full_cycle_monotonic = None
+        # notifications and terminations in the current cycle, their state is saved at once
+        self._actions_taken = 0
+
+        # launch blocking: the (uid, app name) past their grace period and the executables seen running them
+        self.exec_blocker = exec_blocker
+        self.blocked_apps = set()
+        self._app_executables = {}
+        self._blocked_executables = ({}, {})
+
+        # the escalation state applied to each app's cgroup, by (uid, app name)
+        self.cgroups = cgroups
+        self._escalations = {}
+        # written with the usage data, the per-minute history outlives its resets
+        self.history = history
+        # compiled schedules by app name, with the config they were compiled from,
+        # and the earliest time a schedule needs the daemon awake
+        self._schedules = {}
+        self.next_schedule_wakeup = None
+        # accounting state: the clocks of the previous cycle and the (uid, app name) running in it,
+        # uid is None unless per-user limits are enabled
+        self._last_cycle_monotonic = None
+        self._last_cycle_boottime = None
+        self._running_apps = set()
+
+        # the config is kept in memory and only reloaded when the file changes
+        self.config = None
+        self.config_version = None
+        self.pending_scheduler = PendingScheduler()
+
+        # the usage data is kept in memory too, with the data and version last loaded or saved
+        self.usage_data = None
+        self._usage_data_base = None
+        self._usage_data_version = None
+        self._usage_data_dirty = False
+
+        # set from signal handlers, acted on between cycles,
+        # a signal wakes the wait through the pipe, the handlers only set flags
+        self._wake_event = WakeupPipe()
+        self._stop_requested = False
+        self._reload_requested = False
+        self._stats_requested = False
+        self.stats = {
+            "cycles": 0,
+            "full_cycles": 0,
+            "total_cycle_seconds": 0.0,
+            "max_cycle_seconds": 0.0,
+            "last_cycle_seconds": 0.0,
+            "processes_scanned": 0,
+            "suspended_seconds": 0.0,
+        }
+
+    def run_forever(self):
+        """
+        Run monitoring cycles until a stop is requested, waiting check_interval between them.
+        In fast mode only every FULL_CYCLE_INTERVAL_SECONDS a cycle is a full one.
+        A cycle always runs to completion, and unsaved usage is saved before returning.
+        :return: None
+        """
+        while not self._stop_requested:
+            self.run_cycle(full=self._full_cycle_due())
+            if self.history is not None:
+                # old history is compacted bit by bit, in the time the daemon would wait anyway
+                self.history.compact(
+                    self.config.get("history_retention") or {},
+                    HISTORY_COMPACTION_BUDGET_SECONDS,
                 )
+            self._wait_for_next_cycle()
+        self.save_usage_data()
+        if self.history is not None:
+            self.history.flush()
+
+    def _full_cycle_due(self):
+        """
+        :return: True if the next cycle must be a full one
+        """
+        return (
+            not self.fast_mode
+            or self._last_full_cycle_monotonic is None
+            or self.clock.monotonic() - self._last_full_cycle_monotonic
+            >= FULL_CYCLE_INTERVAL_SECONDS
+        )
 
-                if not keywords:
+    def _wait_for_next_cycle(self):
+        """
+        Wait check_interval seconds, or less if a schedule changes state sooner,
+        serving signal requests and updating the countdown dialogs while waiting.
+        A reload or statistics request doesn't start a cycle early.
+        :return: None
+        """
+        deadline = self.clock.monotonic() + self.check_interval
+        if self.next_schedule_wakeup is not None:
+            # warn and close apps on time when their allowed hours end
+            deadline = min(
+                deadline,
+                self.clock.monotonic() + max(self.next_schedule_wakeup - self.clock.time(), 0),
+            )
+        # waiting is not being stuck, keep the watchdog pet during long intervals
+        ping_interval = None
+        if self.notifier is not None and self.notifier.watchdog_interval:
+            ping_interval = self.notifier.watchdog_interval / 2
+        # the cycle just updated the countdowns, the next update is due in a few seconds
+        next_countdown_update = self.clock.monotonic() + COUNTDOWN_UPDATE_SECONDS
+        while not self._stop_requested:
+            now_monotonic = self.clock.monotonic()
+            remaining = deadline - now_monotonic
+            if remaining <= 0:
+                return
+            if ping_interval is not None:
+                until_ping = self._last_watchdog_ping + ping_interval - now_monotonic
+                if until_ping <= 0:
+                    self.notifier.watchdog()
+                    self._last_watchdog_ping = now_monotonic
+                    continue
+                remaining = min(remaining, until_ping)
+            if self.countdowns is not None and self.countdowns.active:
+                until_update = next_countdown_update - now_monotonic
+                if until_update <= 0:
+                    self.countdowns.tick(self.clock.time())
+                    next_countdown_update = now_monotonic + COUNTDOWN_UPDATE_SECONDS
                     continue
+                remaining = min(remaining, until_update)
+            if self.clock.wait(self._wake_event, remaining):
+                self._wake_event.clear()
+                self.handle_signal_requests()
 
-                app_usage = usage_data_all_apps.get(
-                    app_name, INITIAL_USAGE_DATA_STRUCTURE.copy()
-                )
-                for key, default_value in INITIAL_USAGE_DATA_STRUCTURE.items():
-                    app_usage.setdefault(key, default_value)
-
-                # check if we need to reset daily usage data
-                daily_reset_needed = app_usage.get("last_daily_reset_date") != today_str
-                if daily_reset_needed:
-                    logger.info(f"Performing daily reset for app: {app_name}")
-                    app_usage.update(
-                        {
-                            "daily_seconds_today": 0,
-                            "last_daily_reset_date": today_str,
-                            "notif_daily_5_sent": False,
-                            "notif_daily_limit_reached_sent": False,
-                        }
+    def install_signal_handlers(self):
+        """
+        SIGTERM and SIGINT stop the daemon after the current cycle, SIGHUP reloads the
+        config and SIGUSR1 logs the cycle statistics.
+        Must be called from the main thread.
+        :return: None
+        """
+        signal.set_wakeup_fd(self._wake_event.write_fd, warn_on_full_buffer=False)
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGUSR1):
+            signal.signal(signum, self._on_signal)
+
+    def _on_signal(self, signum, frame):
+        """
+        Record the request, the work is done outside the handler.
+        No lock is taken here: the interpreter already woke the loop through the wakeup fd.
+        """
+        if signum in (signal.SIGTERM, signal.SIGINT):
+            self._stop_requested = True
+        elif signum == signal.SIGHUP:
+            self._reload_requested = True
+        elif signum == signal.SIGUSR1:
+            self._stats_requested = True
+
+    def request_stop(self):
+        """
+        Ask run_forever to return after the current cycle.
+        :return: None
+        """
+        self._stop_requested = True
+        self._wake_event.set()
+
+    def handle_signal_requests(self):
+        """
+        Serve the reload and statistics requests recorded by the signal handlers.
+        :return: None
+        """
+        if self._reload_requested:
+            self._reload_requested = False
+            logger.info("Reloading config (SIGHUP).")
+            if self.notifier is not None:
+                self.notifier.reloading()
+            self.refresh_config(force=True)
+            if self.notifier is not None:
+                self.notifier.ready()
+        if self._stats_requested:
+            self._stats_requested = False
+            self.log_stats()
+
+    def log_stats(self):
+        """
+        Log the cycle statistics and cache hit counts.
+        :return: None
+        """
+        cycles = self.stats["cycles"]
+        mean_cycle_seconds = self.stats["total_cycle_seconds"] / cycles if cycles else 0.0
+        message = (
+            f"Cycles: {cycles}, "
+            f"mean {mean_cycle_seconds * 1000:.1f} ms, "
+            f"max {self.stats['max_cycle_seconds'] * 1000:.1f} ms, "
+            f"last {self.stats['last_cycle_seconds'] * 1000:.1f} ms, "
+            f"processes in last scan: {self.stats['processes_scanned']}, "
+            f"pending modifications: {len(self.pending_scheduler)}, "
+            f"suspended: {self.stats['suspended_seconds']:.0f} s, "
+            f"notifications/dialogs: "
+            f"{self.notifications.notifications_added}/{self.notifications.dialogs_sent}"
+        )
+        if self.process_cache is not None:
+            message += (
+                f", process cache hits/misses: "
+                f"{self.process_cache.hits}/{self.process_cache.misses}"
+            )
+        if self.session_cache is not None:
+            message += (
+                f", session cache hits/misses: "
+                f"{self.session_cache.hits}/{self.session_cache.misses}"
+            )
+        logger.info(message)
+
+    def save_snapshot(self, pathname):
+        """
+        Save the process and session caches, so a restarted daemon starts warm.
+        :param pathname: the snapshot file
+        :return: None
+        """
+        if self.process_cache is None and self.session_cache is None:
+            return
+        snapshot = {"saved_at": self.clock.time()}
+        if self.process_cache is not None:
+            snapshot["processes"] = self.process_cache.to_snapshot()
+        if self.session_cache is not None:
+            snapshot["sessions"] = self.session_cache.to_snapshot()
+        save_json(pathname, snapshot)
+
+    def restore_snapshot(self, pathname):
+        """
+        Restore the caches saved by save_snapshot, a missing or unusable snapshot is ignored.
+        :param pathname: the snapshot file
+        :return: None
+        """
+        snapshot = load_json(pathname, read_only=True)
+        try:
+            if self.process_cache is not None and snapshot.get("processes"):
+                self.process_cache.restore(snapshot["processes"])
+            if self.session_cache is not None and snapshot.get("sessions"):
+                self.session_cache.restore(snapshot["sessions"])
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Ignoring unusable daemon state snapshot {pathname}: {e}")
+            return
+        logger.info(f"Restored daemon caches from {pathname}.")
+
+    def run_cycle(self, full=True):
+        """
+        Run a single monitoring cycle: load config and usage data, account usage,
+        send notifications, terminate over-limit apps and save the usage data.
+        Config and usage data are only read again if their files changed.
+        :param full: False for a fast mode cycle, which only looks for new processes and
+                     only saves usage data if a notification was sent or an app terminated
+        :return: None
+        """
+        cycle_started = time.perf_counter()
+        # reload config only if it changed, then apply the modifications that unlocked
+        self.refresh_config()
+        now = self.clock.now()
+        removed_apps = self.apply_due_pending_modifications(now.timestamp())
+        config = self.config
+
+        usage_data_all_apps = self.refresh_usage_data()
+        for app_name in removed_apps:
+            if usage_data_all_apps.pop(app_name, None) is not None:
+                logger.info(f"Usage data for removed app {app_name} cleaned up.")
+                self._usage_data_dirty = True
+
+        if full:
+            process_table = self.scan_processes()
+            self._last_full_cycle_monotonic = self.clock.monotonic()
+            self.stats["full_cycles"] += 1
+        else:
+            process_table = self.scan_new_processes()
+        # get desktop user info
+        current_desktop_users = self.get_desktop_users()
+
+        if self.recorder is not None:
+            self.recorder.record(
+                now,
+                process_table,
+                current_desktop_users,
+                config,
+                usage_data_all_apps,
+                self.clock.monotonic(),
+                self.clock.boottime(),
+            )
+
+        self._actions_taken = 0
+        if self.process_cycle(
+            config, usage_data_all_apps, now, process_table, current_desktop_users
+        ):
+            self._usage_data_dirty = True
+        if full or self._actions_taken:
+            self.save_usage_data()
+        if full and self.history is not None:
+            self.history.flush()
+        if self.exec_blocker is not None:
+            self._update_exec_blocker(config)
+
+        cycle_seconds = time.perf_counter() - cycle_started
+        self.stats["cycles"] += 1
+        self.stats["total_cycle_seconds"] += cycle_seconds
+        self.stats["max_cycle_seconds"] = max(self.stats["max_cycle_seconds"], cycle_seconds)
+        self.stats["last_cycle_seconds"] = cycle_seconds
+        self.stats["processes_scanned"] = len(process_table)
+        if self.notifier is not None:
+            self._notify_cycle_done(cycle_seconds, len(config.get("applications", [])))
+
+    def _notify_cycle_done(self, cycle_seconds, app_count):
+        """
+        Tell systemd the daemon is ready after its first cycle, and pet the watchdog after each one.
+        :param cycle_seconds: how long the cycle took
+        :param app_count: the number of configured apps
+        :return: None
+        """
+        status = f"Last cycle {cycle_seconds * 1000:.1f} ms, tracking {app_count} apps"
+        if self._ready_sent:
+            self.notifier.watchdog(status)
+        else:
+            self.notifier.notify("READY=1", "WATCHDOG=1", f"STATUS={status}")
+            self._ready_sent = True
+        self._last_watchdog_ping = self.clock.monotonic()
+
+        watchdog_interval = self.notifier.watchdog_interval
+        if watchdog_interval and cycle_seconds > watchdog_interval / 2:
+            logger.warning(
+                f"Cycle took {cycle_seconds:.1f} s, more than half of the"
+                f" {watchdog_interval:.0f} s watchdog interval."
+            )
+
+    def refresh_usage_data(self):
+        """
+        Reload the usage data if the file changed since it was last loaded or saved,
+        merging in the changes of this daemon that are not saved yet.
+        :return: the usage data dict
+        """
+        usage_data_version = file_version(USAGE_DATA_PATH)
+        if self.usage_data is not None and usage_data_version == self._usage_data_version:
+            return self.usage_data
+        current_usage_data, usage_data_version = load_json_versioned(
+            USAGE_DATA_PATH, copy.deepcopy(DEFAULT_USAGE_DATA_FILE)
+        )
+        if self.usage_data is not None and self._usage_data_dirty:
+            # the cli changed the file while our changes were not saved, keep both
+            self.usage_data = merge_json_changes(
+                self._usage_data_base, self.usage_data, current_usage_data, USAGE_COUNTER_KEYS
+            )
+        else:
+            self.usage_data = current_usage_data
+        # keep what was loaded to merge with if the cli changes the file again
+        self._usage_data_base = copy.deepcopy(current_usage_data)
+        self._usage_data_version = usage_data_version
+        return self.usage_data
+
+    def save_usage_data(self):
+        """
+        Save the usage data if it has unsaved changes, merging concurrent changes of the cli.
+        :return: None
+        """
+        if not self._usage_data_dirty:
+            return
+        with locked_file(USAGE_DATA_PATH, exclusive=True):
+            self.usage_data = save_json_versioned(
+                USAGE_DATA_PATH,
+                self.usage_data,
+                self._usage_data_base,
+                self._usage_data_version,
+                USAGE_COUNTER_KEYS,
+            )
+            self._usage_data_version = file_version(USAGE_DATA_PATH)
+        self._usage_data_base = copy.deepcopy(self.usage_data)
+        self._usage_data_dirty = False
+
+    def refresh_config(self, force=False):
+        """
+        Reload the config if the file changed since it was last loaded or saved by the daemon,
+        and rebuild the pending modification schedule from it.
+        :param force: reload even if the file looks unchanged
+        :return: None
+        """
+        if (
+            not force
+            and self.config is not None
+            and file_version(CONFIG_FILE_PATH) == self.config_version
+        ):
+            return
+        self.config, self.config_version = load_json_versioned(
+            CONFIG_FILE_PATH, copy.deepcopy(DEFAULT_CONFIG_FILE)
+        )
+        self.pending_scheduler.sync(self.config.get("pending_modifications", []))
+
+    def apply_due_pending_modifications(self, now_ts):
+        """
+        Apply every pending modification whose unlock time has passed to the in-memory
+        config, save the config once and record each item in the audit log.
+        Items that fail to apply are dropped from the queue as well, with the error audited.
+        :param now_ts: the current unix timestamp
+        :return: the names of the apps removed by the applied modifications
+        """
+        next_unlock_timestamp = self.pending_scheduler.next_unlock_timestamp()
+        if next_unlock_timestamp is None or next_unlock_timestamp > now_ts:
+            return []
+
+        removed_apps = []
+        with locked_file(CONFIG_FILE_PATH, exclusive=True):
+            # the cli may have changed the queue since the config was loaded
+            self.refresh_config()
+            due_items = self.pending_scheduler.pop_unlocked(now_ts)
+            if not due_items:
+                return []
+
+            for pending_item in due_items:
+                error = apply_config_modification(self.config, pending_item)
+                if error:
+                    logger.error(
+                        f"Failed to apply pending modification (ID: {pending_item['id']}): {error}"
                     )
-                    apps_data_changed_this_cycle = True
+                else:
+                    logger.info(
+                        f"Applied pending modification (ID: {pending_item['id']}):"
+                        f" {pending_item.get('action')}"
+                    )
+                    removed_apps.extend(removed_app_names(pending_item))
+                append_json_line(
+                    AUDIT_LOG_PATH, audit_entry(pending_item, "daemon", self.clock.now(), error)
+                )
+
+            due_ids = {pending_item["id"] for pending_item in due_items}
+            self.config["pending_modifications"] = [
+                pending_item
+                for pending_item in self.config.get("pending_modifications", [])
+                if pending_item["id"] not in due_ids
+            ]
+            save_json(CONFIG_FILE_PATH, self.config)
+            self.config_version = file_version(CONFIG_FILE_PATH)
+        return removed_apps
+
+    def process_cycle(
+        self, config, usage_data_all_apps, now, process_table, current_desktop_users
+    ):
+        """
+        Account usage and enforce limits for every configured app and group, updating usage data in place.
+        With "enable_per_user_limits" set in config, each user's processes of an app are
+        accounted and limited on their own, in usage_data[app]["users"][uid].
+        :param config: the config dict
+        :param usage_data_all_apps: the usage data dict, modified in place
+        :param now: the datetime of this cycle
+        :param process_table: the process table snapshot of this cycle
+        :param current_desktop_users: the desktop users to notify
+        :return: True if the usage data changed and needs to be saved, False otherwise
+        """
+        now_ts = now.timestamp()
+        # time awake since the previous cycle, the first cycle counts as one check interval
+        elapsed_seconds = self._awake_seconds_since_last_cycle()
+        self.next_schedule_wakeup = None
+        # record if need to save usage data file
+        apps_data_changed_this_cycle = False
 
-                # check if we need to reset weekly usage data
-                weekly_reset_needed = (
-                    app_usage.get("last_weekly_reset_date")
-                    != current_week_start_date_str
+        # --- time logic ---
+        # get current date and weekday
+        today_str = now.strftime("%Y-%m-%d")
+        day_of_week_today = now.weekday()  # 0 is Monday, 6 is Sunday
+        # get the start date of current week
+        days_since_week_start = (day_of_week_today - 0) % 7
+        current_week_start_date = now - datetime.timedelta(
+            days=days_since_week_start
+        )
+        current_week_start_date_str = current_week_start_date.strftime("%Y-%m-%d")
+        periods = (today_str, current_week_start_date_str)
+
+        # (uid, app name) of the apps past their grace period, their launches may be blocked,
+        # uid is None when the app is limited for all users together
+        blocked_apps = set()
+        # built on the first match, then shared by all apps
+        children_by_ppid = None
+        uid_by_pid = None
+
+        apps_by_name = {app["name"]: app for app in config.get("applications", [])}
+        per_user = config.get("enable_per_user_limits", False)
+        # per user, the sessions to notify and the users with an app still to account,
+        # it may have stopped or still be escalated since the previous cycle
+        desktop_users_by_uid = {}
+        tracked_uids_by_app = {}
+        if per_user:
+            for user_info in current_desktop_users:
+                desktop_users_by_uid.setdefault(user_info.get("uid"), []).append(user_info)
+            for uid, app_name in itertools.chain(self._running_apps, self._escalations):
+                tracked_uids_by_app.setdefault(app_name, set()).add(uid)
+
+        # the config and pids by uid of each app, then of each group, all accounted alike,
+        # with the (uid, name) entries blocked when one is past its grace period
+        accounted = []
+        # the single app -> pids by uid result of this cycle, groups are evaluated from it
+        pids_by_app = {}
+
+        # iterate through each configured application
+        for app_config in config.get("applications", []):
+            app_name = app_config["name"]
+            keywords = app_config.get("process_keywords", [])
+            if not keywords:
+                continue
+
+            pids = match_process_table(process_table, keywords)
+            if pids:
+                # children with generic names, like python3 or wine64-preloader, belong to the app too
+                if children_by_ppid is None:
+                    children_by_ppid = build_children_index(process_table)
+                pids = collect_process_subtrees(pids, children_by_ppid)
+
+            if not per_user:
+                pids_by_uid = {None: pids}
+            else:
+                # split the matches of the shared scan by owner, no rescan per user
+                if pids and uid_by_pid is None:
+                    uid_by_pid = {process.pid: process.uid for process in process_table}
+                pids_by_uid = {}
+                for pid in pids:
+                    pids_by_uid.setdefault(uid_by_pid.get(pid), []).append(pid)
+                for uid in tracked_uids_by_app.get(app_name, ()):
+                    pids_by_uid.setdefault(uid, [])
+            pids_by_app[app_name] = pids_by_uid
+            accounted.append((app_config, pids_by_uid, [app_name]))
+
+        # a group's budget is used once per interval while any of its apps runs
+        for group_config in config.get("groups", []):
+            group_name = group_usage_name(group_config["name"])
+            member_names = group_config.get("apps", [])
+            pids_by_uid = {} if per_user else {None: []}
+            keywords = []
+            for member_name in member_names:
+                for uid, user_pids in pids_by_app.get(member_name, {}).items():
+                    pids_by_uid.setdefault(uid, []).extend(user_pids)
+                keywords.extend(apps_by_name.get(member_name, {}).get("process_keywords", []))
+            for uid in tracked_uids_by_app.get(group_name, ()):
+                pids_by_uid.setdefault(uid, [])
+            # a process matched by two members is still only one process
+            pids_by_uid = {uid: list(dict.fromkeys(user_pids)) for uid, user_pids in pids_by_uid.items()}
+            accounted.append(
+                (
+                    {**group_config, "name": group_name, "process_keywords": keywords},
+                    pids_by_uid,
+                    [group_name, *member_names],
                 )
-                if weekly_reset_needed:
-                    logger.info(f"Performing weekly reset for app: {app_name}")
-                    app_usage.update(
-                        {
-                            "weekly_seconds_this_week": 0,
-                            "last_weekly_reset_date": current_week_start_date_str,
-                            "notif_weekly_5_sent": False,
-                            "notif_weekly_limit_reached_sent": False,
-                        }
+            )
+
+        for app_config, pids_by_uid, blocked_names in accounted:
+            app_name = app_config["name"]
+            limits = todays_limits(app_config, day_of_week_today)
+            for uid, user_pids in pids_by_uid.items():
+                # processes of an unknown owner count for the app as a whole
+                if uid is None:
+                    app_usage = usage_data_all_apps.get(
+                        app_name, INITIAL_USAGE_DATA_STRUCTURE.copy()
+                    )
+                    desktop_users = current_desktop_users
+                else:
+                    users_usage = usage_data_all_apps.setdefault(
+                        app_name, INITIAL_USAGE_DATA_STRUCTURE.copy()
+                    ).setdefault("users", {})
+                    app_usage = users_usage.get(
+                        str(uid), INITIAL_USAGE_DATA_STRUCTURE.copy()
                     )
+                    desktop_users = desktop_users_by_uid.get(uid, [])
+
+                if self._account_app_usage(
+                    app_config,
+                    app_usage,
+                    uid,
+                    user_pids,
+                    process_table,
+                    now_ts,
+                    periods,
+                    limits,
+                    desktop_users,
+                    elapsed_seconds,
+                ):
                     apps_data_changed_this_cycle = True
 
-                # ... (rest of the loop, including process check and notification logic) ...
+                breach_timestamp = app_usage.get("first_limit_breach_timestamp")
                 if (
-                    daily_reset_needed
-                    and app_usage.get("first_limit_breach_type") == "daily"
-                ) or (
-                    weekly_reset_needed
-                    and app_usage.get("first_limit_breach_type") == "weekly"
+                    breach_timestamp is not None
+                    and now_ts >= breach_timestamp + GRACE_PERIOD_SECONDS
                 ):
+                    blocked_apps.update((uid, name) for name in blocked_names)
+
+                if uid is None:
+                    usage_data_all_apps[app_name] = app_usage
+                else:
+                    users_usage[str(uid)] = app_usage
+
+        self.blocked_apps = blocked_apps
+        if self.countdowns is not None:
+            self.countdowns.close_unseen()
+        self.notifications.flush(
+            now_ts,
+            config.get("notification_min_interval_seconds", NOTIFICATION_MIN_INTERVAL_SECONDS),
+        )
+        return apps_data_changed_this_cycle
+
+    def _account_app_usage(
+        self,
+        app_config,
+        app_usage,
+        uid,
+        pids,
+        process_table,
+        now_ts,
+        periods,
+        limits,
+        desktop_users,
+        elapsed_seconds,
+    ):
+        """
+        Reset, credit and enforce the usage of one app, or of one user's share of it.
+        :param app_config: the app's config
+        :param app_usage: the usage data of the app or user, modified in place
+        :param uid: the user id the usage belongs to, None for all users together
+        :param pids: the pids of the app, or of the user's processes of it, leaves first
+        :param process_table: the process table snapshot of this cycle
+        :param now_ts: the unix timestamp of this cycle
+        :param periods: the (day, week start) date strings of this cycle
+        :param limits: (daily limit in seconds, daily limit in minutes, weekly limit in seconds)
+        :param desktop_users: the desktop users to notify
+        :param elapsed_seconds: the seconds awake since the previous cycle
+        :return: True if the usage data changed, False otherwise
+        """
+        app_name = app_config["name"]
+        keywords = app_config.get("process_keywords", [])
+        today_str, current_week_start_date_str = periods
+        daily_limit_sec, todays_daily_limit_min, weekly_limit_sec = limits
+        usage_key = (uid, app_name)
+        app_label = app_name if uid is None else f"{app_name} of user {uid}"
+        apps_data_changed_this_cycle = False
+
+        for key, default_value in INITIAL_USAGE_DATA_STRUCTURE.items():
+            app_usage.setdefault(key, default_value)
+
+        # check if we need to reset daily usage data
+        daily_reset_needed = app_usage.get("last_daily_reset_date") != today_str
+        if daily_reset_needed:
+            logger.info(f"Performing daily reset for app: {app_label}")
+            app_usage.update(
+                {
+                    "daily_seconds_today": 0,
+                    "last_daily_reset_date": today_str,
+                    "notif_daily_5_sent": False,
+                    "notif_daily_limit_reached_sent": False,
+                }
+            )
+            apps_data_changed_this_cycle = True
+
+        # check if we need to reset weekly usage data
+        weekly_reset_needed = (
+            app_usage.get("last_weekly_reset_date")
+            != current_week_start_date_str
+        )
+        if weekly_reset_needed:
+            logger.info(f"Performing weekly reset for app: {app_label}")
+            app_usage.update(
+                {
+                    "weekly_seconds_this_week": 0,
+                    "last_weekly_reset_date": current_week_start_date_str,
+                    "notif_weekly_5_sent": False,
+                    "notif_weekly_limit_reached_sent": False,
+                }
+            )
+            apps_data_changed_this_cycle = True
+
+        # ... (rest of the loop, including process check and notification logic) ...
+        if (
+            daily_reset_needed
+            and app_usage.get("first_limit_breach_type") == "daily"
+        ) or (
+            weekly_reset_needed
+            and app_usage.get("first_limit_breach_type") == "weekly"
+        ):
+            logger.info(
+                f"Resetting limit breach state for app {app_label} due to daily/weekly reset."
+            )
+            app_usage["first_limit_breach_timestamp"] = None
+            app_usage["first_limit_breach_type"] = None
+
+        # rolling windows slide every minute instead of resetting at midnight
+        rolling_limits = parse_rolling_limits(app_config) if app_config.get("rolling_limits") else []
+        rolling_usage = None
+        if rolling_limits:
+            if app_usage.get("rolling_usage") is None:
+                app_usage["rolling_usage"] = {}
+            rolling_usage = RollingUsage(
+                app_usage["rolling_usage"], [window for window, _ in rolling_limits]
+            )
+            rolling_usage.advance(now_ts)
+            if app_usage.get("first_limit_breach_type") == "rolling" and all(
+                rolling_usage.window_seconds(window) < limit_seconds
+                for window, limit_seconds in rolling_limits
+            ):
+                logger.info(
+                    f"Resetting limit breach state for app {app_label}, its rolling windows are below their limits."
+                )
+                app_usage["first_limit_breach_timestamp"] = None
+                app_usage["first_limit_breach_type"] = None
+                app_usage["notif_rolling_limit_reached_sent"] = False
+                apps_data_changed_this_cycle = True
+            if app_usage.get("notif_rolling_5_sent") and all(
+                rolling_usage.window_seconds(window) <= limit_seconds - (5 * 60)
+                for window, limit_seconds in rolling_limits
+            ):
+                app_usage["notif_rolling_5_sent"] = False
+                apps_data_changed_this_cycle = True
+
+        # allowed hours, from transitions compiled once, not from the rules every cycle
+        schedule = self._compiled_schedule(app_config)
+        if schedule is not None:
+            allowed_now = schedule.is_allowed(now_ts)
+            next_transition = schedule.next_transition(now_ts)
+            if next_transition is not None:
+                # wake up for the warning before the allowed hours end, and for the change itself
+                wakeups = [next_transition]
+                if allowed_now and next_transition - (5 * 60) > now_ts:
+                    wakeups.append(next_transition - (5 * 60))
+                if self.next_schedule_wakeup is not None:
+                    wakeups.append(self.next_schedule_wakeup)
+                self.next_schedule_wakeup = min(wakeups)
+            if allowed_now and app_usage.get("first_limit_breach_type") == "schedule":
+                logger.info(f"Resetting limit breach state for app {app_label}, it is allowed again.")
+                app_usage["first_limit_breach_timestamp"] = None
+                app_usage["first_limit_breach_type"] = None
+                apps_data_changed_this_cycle = True
+
+        # ... (process running check, trigger_zenity function definition) ...
+        running_seconds = self._running_seconds(
+            usage_key, pids, process_table, now_ts, elapsed_seconds
+        )
+        if running_seconds > 0:
+            app_usage["daily_seconds_today"] += running_seconds
+            app_usage["weekly_seconds_this_week"] += running_seconds
+            if rolling_usage is not None:
+                rolling_usage.add(now_ts, running_seconds)
+            if self.history is not None:
+                # the users of an app share its history, a minute holds at most 60 seconds
+                self.history.record(app_config["name"], now_ts, running_seconds)
+            apps_data_changed_this_cycle = True
+
+        def trigger_zenity_for_all_users(
+            title_suffix, message_body, dialog_type="--warning"
+        ):
+            self._actions_taken += 1
+            if not desktop_users:
+                logger.info(
+                    f"No desktop users to notify for {app_label} - {title_suffix}."
+                )
+                return
+            for user_info_item in desktop_users:
+                self.notifications.add(
+                    user_info_item,
+                    f"{app_name}: {title_suffix}",
+                    message_body,
+                    dialog_type=dialog_type,
+                )
+
+        if app_usage.get("first_limit_breach_timestamp") is not None:
+            if (
+                now_ts
+                >= app_usage["first_limit_breach_timestamp"]
+                + GRACE_PERIOD_SECONDS
+            ):
+                if bool(pids):
+                    limit_type_str = app_usage.get(
+                        "first_limit_breach_type", "Time"
+                    ).capitalize()
                     logger.info(
-                        f"Resetting limit breach state for app {app_name} due to daily/weekly reset."
+                        f"Grace period expired for app {app_label}. Terminating."
+                    )
+                    trigger_zenity_for_all_users(
+                        f"{limit_type_str} Limit: Terminated",
+                        f"The grace period has ended.\nApplication '{app_name}' has been closed.",
+                        "--error",
                     )
-                    app_usage["first_limit_breach_timestamp"] = None
-                    app_usage["first_limit_breach_type"] = None
+                    self._actions_taken += 1
+                    if self._escalations.pop(usage_key, None) is not None:
+                        # frozen processes cannot handle SIGTERM, and a relaunch is closed, not throttled
+                        logger.info(f"Releasing cgroup limits of app {_cgroup_name(usage_key)}.")
+                        self.cgroups.release(_cgroup_name(usage_key))
+                    if self.exec_blocker is not None:
+                        self._learn_executables(app_name, keywords, pids)
+                    self._terminate_all(pids, app_name)
+                    # it stopped now, not at some time before the next cycle
+                    self._running_apps.discard(usage_key)
 
-                pids = get_process_pids(keywords)
-                # ... (process running check, trigger_zenity function definition) ...
-                if bool(pids):
-                    app_usage["daily_seconds_today"] += check_interval
-                    app_usage["weekly_seconds_this_week"] += check_interval
+        # --- MODIFIED NOTIFICATION LOGIC ---
+        if app_usage.get("first_limit_breach_timestamp") is None:
+            limit_min_str_daily = (
+                f"{todays_daily_limit_min:.0f}"
+                if todays_daily_limit_min != float("inf")
+                else "unlimited"
+            )
+            if daily_limit_sec != float("inf"):
+                if app_usage[
+                    "daily_seconds_today"
+                ] >= daily_limit_sec and not app_usage.get(
+                    "notif_daily_limit_reached_sent"
+                ):
+                    logger.info(
+                        f"App {app_label} has reached its daily limit ({limit_min_str_daily} min)."
+                    )
+                    trigger_zenity_for_all_users(
+                        "Daily Limit Reached",
+                        f"'{app_name}' has used its daily minutes.\nIt will close in {GRACE_PERIOD_SECONDS / 60:.0f} minutes.",
+                        "--warning",
+                    )
+                    app_usage["notif_daily_limit_reached_sent"] = True
+                    app_usage["first_limit_breach_timestamp"] = now_ts
+                    app_usage["first_limit_breach_type"] = "daily"
+                    apps_data_changed_this_cycle = True
+                elif daily_limit_sec - (5 * 60) < app_usage[
+                    "daily_seconds_today"
+                ] < daily_limit_sec and not app_usage.get("notif_daily_5_sent"):
+                    logger.info(
+                        f"App {app_label} approaching daily limit - 5 minute warning."
+                    )
+                    trigger_zenity_for_all_users(
+                        "Daily Time Warning",
+                        f"'{app_name}' has approximately 5 minutes of daily time remaining.",
+                        "--info",
+                    )
+                    app_usage["notif_daily_5_sent"] = True
                     apps_data_changed_this_cycle = True
 
-                def trigger_zenity_for_all_users(
-                    title_suffix, message_body, dialog_type="--warning"
+            if app_usage.get(
+                "first_limit_breach_timestamp"
+            ) is None and weekly_limit_sec != float("inf"):
+                weekly_limit_min_config = app_config.get(
+                    "weekly_limit_minutes", float("inf")
+                )
+                limit_min_str_weekly = (
+                    f"{weekly_limit_min_config:.0f}"
+                    if weekly_limit_min_config != float("inf")
+                    else "unlimited"
+                )
+                if app_usage[
+                    "weekly_seconds_this_week"
+                ] >= weekly_limit_sec and not app_usage.get(
+                    "notif_weekly_limit_reached_sent"
+                ):
+                    logger.info(
+                        f"App {app_label} has reached its weekly limit ({limit_min_str_weekly} min)."
+                    )
+                    trigger_zenity_for_all_users(
+                        "Weekly Limit Reached",
+                        f"'{app_name}' has used its weekly minutes.\nIt will close in {GRACE_PERIOD_SECONDS / 60:.0f} minutes.",
+                        "--warning",
+                    )
+                    app_usage["notif_weekly_limit_reached_sent"] = True
+                    app_usage["first_limit_breach_timestamp"] = now_ts
+                    app_usage["first_limit_breach_type"] = "weekly"
+                    apps_data_changed_this_cycle = True
+                elif weekly_limit_sec - (5 * 60) < app_usage[
+                    "weekly_seconds_this_week"
+                ] < weekly_limit_sec and not app_usage.get(
+                    "notif_weekly_5_sent"
                 ):
-                    if not current_desktop_users:
+                    logger.info(
+                        f"App {app_label} approaching weekly limit - 5 minute warning."
+                    )
+                    trigger_zenity_for_all_users(
+                        "Weekly Time Warning",
+                        f"'{app_name}' has approximately 5 minutes of weekly time remaining.",
+                        "--info",
+                    )
+                    app_usage["notif_weekly_5_sent"] = True
+                    apps_data_changed_this_cycle = True
+
+            if (
+                app_usage.get("first_limit_breach_timestamp") is None
+                and rolling_usage is not None
+            ):
+                for window, limit_seconds in rolling_limits:
+                    used_seconds = rolling_usage.window_seconds(window)
+                    window_str = format_window(window)
+                    if used_seconds >= limit_seconds and not app_usage.get(
+                        "notif_rolling_limit_reached_sent"
+                    ):
                         logger.info(
-                            f"No desktop users to notify for {app_name} - {title_suffix}."
+                            f"App {app_label} has reached its rolling limit ({limit_seconds / 60:.0f} min"
+                            f" per {window_str})."
                         )
-                        return
-                    for user_info_item in current_desktop_users:
-                        send_desktop_notification_zenity(
-                            f"{app_name}: {title_suffix}",
-                            message_body,
-                            user_info_item,
-                            dialog_type=dialog_type,
+                        trigger_zenity_for_all_users(
+                            "Rolling Limit Reached",
+                            f"'{app_name}' has used {limit_seconds / 60:.0f} minutes in the last {window_str}.\nIt will close in {GRACE_PERIOD_SECONDS / 60:.0f} minutes.",
+                            "--warning",
                         )
-
-                if app_usage.get("first_limit_breach_timestamp") is not None:
-                    if (
-                        time.time()
-                        >= app_usage["first_limit_breach_timestamp"]
-                        + GRACE_PERIOD_SECONDS
+                        app_usage["notif_rolling_limit_reached_sent"] = True
+                        app_usage["first_limit_breach_timestamp"] = now_ts
+                        app_usage["first_limit_breach_type"] = "rolling"
+                        apps_data_changed_this_cycle = True
+                        break
+                    elif limit_seconds - (5 * 60) < used_seconds < limit_seconds and not app_usage.get(
+                        "notif_rolling_5_sent"
                     ):
-                        if bool(pids):
-                            limit_type_str = app_usage.get(
-                                "first_limit_breach_type", "Time"
-                            ).capitalize()
-                            logger.info(
-                                f"Grace period expired for app {app_name}. Terminating."
-                            )
-                            trigger_zenity_for_all_users(
-                                f"{limit_type_str} Limit: Terminated",
-                                f"The grace period has ended.\nApplication '{app_name}' has been closed.",
-                                "--error",
-                            )
-                            for pid in pids:
-                                terminate_process(pid, app_name)
-
-                # --- MODIFIED NOTIFICATION LOGIC ---
-                if app_usage.get("first_limit_breach_timestamp") is None:
-                    limit_min_str_daily = (
-                        f"{todays_daily_limit_min:.0f}"
-                        if todays_daily_limit_min != float("inf")
-                        else "unlimited"
-                    )
-                    if daily_limit_sec != float("inf"):
-                        if app_usage[
-                            "daily_seconds_today"
-                        ] >= daily_limit_sec and not app_usage.get(
-                            "notif_daily_limit_reached_sent"
-                        ):
-                            logger.info(
-                                f"App {app_name} has reached its daily limit ({limit_min_str_daily} min)."
-                            )
-                            trigger_zenity_for_all_users(
-                                "Daily Limit Reached",
-                                f"'{app_name}' has used its daily minutes.\nIt will close in {GRACE_PERIOD_SECONDS / 60:.0f} minutes.",
-                                "--warning",
-                            )
-                            app_usage["notif_daily_limit_reached_sent"] = True
-                            app_usage["first_limit_breach_timestamp"] = time.time()
-                            app_usage["first_limit_breach_type"] = "daily"
-                            apps_data_changed_this_cycle = True
-                        elif daily_limit_sec - (5 * 60) < app_usage[
-                            "daily_seconds_today"
-                        ] < daily_limit_sec and not app_usage.get("notif_daily_5_sent"):
-                            logger.info(
-                                f"App {app_name} approaching daily limit - 5 minute warning."
-                            )
-                            trigger_zenity_for_all_users(
-                                "Daily Time Warning",
-                                f"'{app_name}' has approximately 5 minutes of daily time remaining.",
-                                "--info",
-                            )
-                            app_usage["notif_daily_5_sent"] = True
-                            apps_data_changed_this_cycle = True
-
-                    if app_usage.get(
-                        "first_limit_breach_timestamp"
-                    ) is None and weekly_limit_sec != float("inf"):
-                        weekly_limit_min_config = app_config.get(
-                            "weekly_limit_minutes", float("inf")
+                        logger.info(
+                            f"App {app_label} approaching rolling limit - 5 minute warning."
                         )
-                        limit_min_str_weekly = (
-                            f"{weekly_limit_min_config:.0f}"
-                            if weekly_limit_min_config != float("inf")
-                            else "unlimited"
+                        trigger_zenity_for_all_users(
+                            "Rolling Time Warning",
+                            f"'{app_name}' has approximately 5 minutes remaining in the last {window_str}.",
+                            "--info",
                         )
-                        if app_usage[
-                            "weekly_seconds_this_week"
-                        ] >= weekly_limit_sec and not app_usage.get(
-                            "notif_weekly_limit_reached_sent"
-                        ):
-                            logger.info(
-                                f"App {app_name} has reached its weekly limit ({limit_min_str_weekly} min)."
-                            )
-                            trigger_zenity_for_all_users(
-                                "Weekly Limit Reached",
-                                f"'{app_name}' has used its weekly minutes.\nIt will close in {GRACE_PERIOD_SECONDS / 60:.0f} minutes.",
-                                "--warning",
-                            )
-                            app_usage["notif_weekly_limit_reached_sent"] = True
-                            app_usage["first_limit_breach_timestamp"] = time.time()
-                            app_usage["first_limit_breach_type"] = "weekly"
-                            apps_data_changed_this_cycle = True
-                        elif weekly_limit_sec - (5 * 60) < app_usage[
-                            "weekly_seconds_this_week"
-                        ] < weekly_limit_sec and not app_usage.get(
-                            "notif_weekly_5_sent"
-                        ):
-                            logger.info(
-                                f"App {app_name} approaching weekly limit - 5 minute warning."
-                            )
-                            trigger_zenity_for_all_users(
-                                "Weekly Time Warning",
-                                f"'{app_name}' has approximately 5 minutes of weekly time remaining.",
-                                "--info",
-                            )
-                            app_usage["notif_weekly_5_sent"] = True
-                            apps_data_changed_this_cycle = True
-
-                usage_data_all_apps[app_name] = app_usage
-
-            if apps_data_changed_this_cycle:
-                save_json(USAGE_DATA_PATH, usage_data_all_apps)
-
-            time.sleep(check_interval)
+                        app_usage["notif_rolling_5_sent"] = True
+                        apps_data_changed_this_cycle = True
 
-    except KeyboardInterrupt:
-        logger.info("App Limiter daemon stopped by user (KeyboardInterrupt).")
-    except Exception as e:
-        logger.critical(f"A critical error occurred in the main daemon loop: {e}")
-        logger.error(traceback.format_exc())
-    finally:
-        logger.info("App Limiter daemon is shutting down.")
+            if (
+                app_usage.get("first_limit_breach_timestamp") is None
+                and schedule is not None
+                and pids
+            ):
+                if not allowed_now:
+                    logger.info(f"App {app_label} is running outside its allowed hours.")
+                    trigger_zenity_for_all_users(
+                        "Outside Allowed Hours",
+                        f"'{app_name}' is not allowed at this time.\nIt will close in {GRACE_PERIOD_SECONDS / 60:.0f} minutes.",
+                        "--warning",
+                    )
+                    app_usage["first_limit_breach_timestamp"] = now_ts
+                    app_usage["first_limit_breach_type"] = "schedule"
+                    apps_data_changed_this_cycle = True
+                elif (
+                    next_transition is not None
+                    and next_transition - now_ts <= 5 * 60
+                    and app_usage.get("notif_schedule_warning_for") != next_transition
+                ):
+                    logger.info(f"App {app_label} approaching the end of its allowed hours.")
+                    trigger_zenity_for_all_users(
+                        "Allowed Hours Ending",
+                        f"'{app_name}' is only allowed for about {max((next_transition - now_ts) / 60, 1):.0f} more minutes.",
+                        "--info",
+                    )
+                    app_usage["notif_schedule_warning_for"] = next_transition
+                    apps_data_changed_this_cycle = True
+
+        # the countdown runs from the breach until the app is closed
+        breach_timestamp = app_usage.get("first_limit_breach_timestamp")
+        if self.countdowns is not None and pids and breach_timestamp is not None:
+            deadline_ts = breach_timestamp + GRACE_PERIOD_SECONDS
+            if now_ts < deadline_ts:
+                for user_info_item in desktop_users:
+                    self.countdowns.show(
+                        (uid, app_name, user_info_item.get("username"), user_info_item.get("display")),
+                        user_info_item,
+                        app_name,
+                        deadline_ts,
+                        now_ts,
+                    )
+
+        if self.cgroups is not None:
+            try:
+                self._escalate(usage_key, app_config, app_usage, pids, now_ts)
+            except (TypeError, ValueError) as e:
+                logger.error(f"Invalid escalation config for app {app_name}: {e}")
+
+        return apps_data_changed_this_cycle
+
+    def _compiled_schedule(self, app_config):
+        """
+        Return the compiled schedule of an app or group, compiling it when its config changed.
+        :param app_config: the config of the app or group
+        :return: a schedule.CompiledSchedule, or None if it has no valid schedule
+        """
+        schedule_config = app_config.get("schedule")
+        if not schedule_config:
+            return None
+        cached = self._schedules.get(app_config["name"])
+        # a reloaded config is a new object, an unchanged one is the same
+        if cached is not None and cached[0] is schedule_config:
+            return cached[1]
+        try:
+            compiled_schedule = CompiledSchedule(schedule_config)
+        except ValueError as e:
+            logger.error(f"Invalid schedule for app {app_config['name']}: {e}")
+            compiled_schedule = None
+        self._schedules[app_config["name"]] = (schedule_config, compiled_schedule)
+        return compiled_schedule
+
+    def _escalate(self, usage_key, app_config, app_usage, pids, now_ts):
+        """
+        Apply the app's escalation ladder to its cgroup during the grace period,
+        and release the cgroup once the grace period is over or the breach is reset.
+        :param usage_key: the (uid, app name) the usage belongs to, uid None for all users
+        :param app_config: the app's config
+        :param app_usage: the app's usage data
+        :param pids: the pids of the app in this cycle
+        :param now_ts: the unix timestamp of this cycle
+        :return: None
+        """
+        cgroup_name = _cgroup_name(usage_key)
+        breach_timestamp = app_usage.get("first_limit_breach_timestamp")
+        steps = app_config.get("escalation")
+        if (
+            breach_timestamp is None
+            or not steps
+            or now_ts >= breach_timestamp + GRACE_PERIOD_SECONDS
+        ):
+            if self._escalations.pop(usage_key, None) is not None:
+                logger.info(f"Releasing cgroup limits of app {cgroup_name}.")
+                self.cgroups.release(cgroup_name)
+            return
+        if not pids:
+            return
+        target_state = escalation_state(steps, now_ts - breach_timestamp)
+        if not target_state:
+            return
+
+        self.cgroups.move(cgroup_name, pids)
+        current_state = self._escalations.get(usage_key, {})
+        if target_state.get("cpu_percent") != current_state.get("cpu_percent"):
+            logger.info(f"Limiting app {cgroup_name} to {target_state.get('cpu_percent')}% CPU.")
+            self.cgroups.set_cpu_percent(cgroup_name, target_state.get("cpu_percent"))
+        if target_state.get("io_bytes_per_second") != current_state.get(
+            "io_bytes_per_second"
+        ):
+            logger.info(
+                f"Limiting app {cgroup_name} to {target_state.get('io_bytes_per_second')} bytes/s of IO."
+            )
+            self.cgroups.set_io_bytes_per_second(
+                cgroup_name, target_state.get("io_bytes_per_second")
+            )
+        if bool(target_state.get("freeze")) != bool(current_state.get("freeze")):
+            logger.info(f"{'Freezing' if target_state.get('freeze') else 'Thawing'} app {cgroup_name}.")
+            self.cgroups.set_frozen(cgroup_name, bool(target_state.get("freeze")))
+        self._escalations[usage_key] = target_state
+
+    def release_escalations(self):
+        """
+        Lift the cgroup limits of every escalated app.
+        :return: None
+        """
+        for usage_key in list(self._escalations):
+            self.cgroups.release(_cgroup_name(usage_key))
+        self._escalations = {}
+
+    def _terminate_all(self, pids, app_name):
+        """
+        Terminate the processes of an app, children before parents.
+        :param pids: the pids of the app's processes, leaves first
+        :param app_name: the app name
+        :return: None
+        """
+        if self.terminate is None:
+            terminate_processes(pids, app_name)
+            return
+        for pid in pids:
+            self.terminate(pid, app_name)
+
+    def _learn_executables(self, app_name, keywords, pids):
+        """
+        Remember the executables of an app's processes, so its launches can be blocked.
+        An executable is only kept if a keyword is part of its name, so that an app run by
+        an interpreter, e.g. "java -jar game.jar", never gets java blocked for everyone.
+        :param app_name: the app name
+        :param keywords: the app's process keywords
+        :param pids: the pids of the app's processes
+        :return: None
+        """
+        keywords = [keyword.lower() for keyword in keywords]
+        for pid in pids:
+            try:
+                path = os.readlink(f"/proc/{pid}/exe")
+                stat_result = os.stat(f"/proc/{pid}/exe")
+            except OSError:
+                continue
+            executable_name = os.path.basename(path).lower()
+            if any(keyword in executable_name for keyword in keywords):
+                self._app_executables.setdefault(app_name, {})[path] = (
+                    stat_result.st_dev,
+                    stat_result.st_ino,
+                )
+
+    def _update_exec_blocker(self, config):
+        """
+        Hand the executables of the blocked apps to the exec blocker, if they changed.
+        These are the executables seen running the app and those listed in its
+        "executables" config. An app blocked for some users only is only denied to them.
+        :param config: the config dict
+        :return: None
+        """
+        executables = {}
+        # (st_dev, st_ino) -> the uids denied the file, None for everyone
+        blocked_uids = {}
+        if config.get("enable_exec_blocking", False):
+            apps_by_name = {app["name"]: app for app in config.get("applications", [])}
+            for uid, app_name in self.blocked_apps:
+                app_executables = dict(self._app_executables.get(app_name, {}))
+                for path in apps_by_name.get(app_name, {}).get("executables", []):
+                    file_id = executable_file_id(path)
+                    if file_id is not None:
+                        app_executables[path] = file_id
+                executables.update(app_executables)
+                for file_id in app_executables.values():
+                    uids = blocked_uids.get(file_id, frozenset())
+                    if uids is not None:
+                        blocked_uids[file_id] = None if uid is None else uids | {uid}
+        if (executables, blocked_uids) != self._blocked_executables:
+            self._blocked_executables = (executables, blocked_uids)
+            self.exec_blocker.update(executables, blocked_uids)
+
+    def _awake_seconds_since_last_cycle(self):
+        """
+        Measure the time since the previous cycle without the time spent suspended.
+        The monotonic clock stops during suspend and the boot time clock doesn't,
+        so the part of the boot time delta the monotonic delta lacks was suspended.
+        :return: the seconds the machine was awake since the previous cycle
+        """
+        now_monotonic = self.clock.monotonic()
+        now_boottime = self.clock.boottime()
+        if self._last_cycle_monotonic is None:
+            awake_seconds = self.check_interval
+        else:
+            elapsed_seconds = max(now_boottime - self._last_cycle_boottime, 0.0)
+            suspended_seconds = max(
+                elapsed_seconds - (now_monotonic - self._last_cycle_monotonic), 0.0
+            )
+            awake_seconds = elapsed_seconds - suspended_seconds
+            # the clocks are read a moment apart, ignore sub-second differences
+            if suspended_seconds >= 1:
+                self.stats["suspended_seconds"] += suspended_seconds
+                logger.info(
+                    f"System was suspended for {suspended_seconds:.0f} s since the last"
+                    f" cycle, it is not counted as usage."
+                )
+        self._last_cycle_monotonic = now_monotonic
+        self._last_cycle_boottime = now_boottime
+        return awake_seconds
+
+    def _running_seconds(self, usage_key, pids, process_table, now_ts, elapsed_seconds):
+        """
+        Return how long an app ran since the previous cycle.
+        An app running in both cycles ran the whole time in between. An app that started
+        since ran from the create_time of its oldest process. An app that stopped since
+        is credited half the time, the expected value for a stop at an unknown moment.
+        :param usage_key: the (uid, app name) the usage belongs to, uid None for all users
+        :param pids: the pids of the app in this cycle
+        :param process_table: the process table snapshot of this cycle
+        :param now_ts: the unix timestamp of this cycle
+        :param elapsed_seconds: the monotonic seconds since the previous cycle
+        :return: the number of seconds to credit, rounded to milliseconds
+        """
+        was_running = usage_key in self._running_apps
+        if not pids:
+            if not was_running:
+                return 0
+            self._running_apps.discard(usage_key)
+            return round(elapsed_seconds / 2, 3)
+
+        self._running_apps.add(usage_key)
+        if was_running:
+            return round(elapsed_seconds, 3)
+        app_pids = set(pids)
+        create_times = [
+            process.create_time
+            for process in process_table
+            if process.pid in app_pids and process.create_time is not None
+        ]
+        if not create_times:
+            return round(elapsed_seconds, 3)
+        return round(min(max(now_ts - min(create_times), 0.0), elapsed_seconds), 3)
+
+
+def todays_limits(app_config, day_of_week_today):
+    """
+    Read the limits of an app or group that apply today.
+    :param app_config: the config of the app or group
+    :param day_of_week_today: the weekday, 0 is Monday and 6 is Sunday
+    :return: (daily limit in seconds, daily limit in minutes, weekly limit in seconds), inf if unlimited
+    """
+    daily_limits_by_day_config = app_config.get("daily_limits_by_day")
+    todays_daily_limit_min = float("inf")
+    if daily_limits_by_day_config:
+        if 0 <= day_of_week_today <= 4:
+            todays_daily_limit_min = float(
+                daily_limits_by_day_config.get("weekdays", float("inf"))
+            )
+        else:
+            todays_daily_limit_min = float(
+                daily_limits_by_day_config.get("weekends", float("inf"))
+            )
+    daily_limit_sec = (
+        todays_daily_limit_min * 60
+        if todays_daily_limit_min != float("inf")
+        else float("inf")
+    )
+    weekly_limit_sec_val = app_config.get("weekly_limit_minutes", float("inf"))
+    weekly_limit_sec = (
+        float(weekly_limit_sec_val) * 60
+        if weekly_limit_sec_val != float("inf")
+        else float("inf")
+    )
+    return daily_limit_sec, todays_daily_limit_min, weekly_limit_sec
+
+
+def _cgroup_name(usage_key):
+    """
+    :param usage_key: the (uid, app name) the usage belongs to, uid None for all users
+    :return: the name of its cgroup, e.g. "Steam" or "Steam.uid1000"
+    """
+    uid, app_name = usage_key
+    return app_name if uid is None else f"{app_name}.uid{uid}"
+
+
+def escalation_state(steps, seconds_since_breach):
+    """
+    Combine the escalation steps reached since a limit was breached.
+    A step looks like {"after_seconds": 120, "cpu_percent": 25}, with any of
+    "cpu_percent", "io_bytes_per_second" and "freeze". Later steps add to or
+    override earlier ones.
+    :param steps: the "escalation" list of an app's config
+    :param seconds_since_breach: the seconds since the limit was breached
+    :return: a dict with the limits to apply, empty if no step is reached yet
+    """
+    state = {}
+    for step in sorted(steps, key=lambda step: step.get("after_seconds", 0)):
+        if step.get("after_seconds", 0) > seconds_since_breach:
+            break
+        for key in ("cpu_percent", "io_bytes_per_second", "freeze"):
+            if key in step:
+                state[key] = step[key]
+    return state
+
+
+def run_daemon_cycle(check_interval=DAEMON_CHECK_INTERVAL_SECONDS):
+    """
+    Run a single monitoring cycle with the real system collaborators.
+    Caches only pay off across cycles, so this one-off cycle scans without them.
+    :param check_interval: the interval between checks in seconds
+    :return: None
+    """
+    AppLimiterDaemon(
+        check_interval,
+        scan_processes=scan_process_table,
+        get_desktop_users=get_desktop_users_with_display_info,
+    ).run_cycle()
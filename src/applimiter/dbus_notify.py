@@ -0,0 +1,487 @@
+# AppLimiter/src/applimiter/dbus_notify.py
+
+"""
+Desktop notifications over D-Bus, without a D-Bus library.
+
+Only the part of the D-Bus wire protocol that org.freedesktop.Notifications needs is
+implemented: EXTERNAL authentication on a unix socket, method calls, replies and errors,
+with the basic types, strings, arrays, structs, dict entries and variants.
+
+The daemon keeps one connection to each desktop user's session bus, found once at
+/run/user/<uid>/bus, and passes the id of an app's previous notification, so that
+the notification server updates it in place instead of stacking a new one.
+"""
+
+import os
+import socket
+import struct
+import logging
+from collections import namedtuple
+
+from applimiter.constants import DBUS_TIMEOUT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+METHOD_CALL = 1
+METHOD_RETURN = 2
+ERROR = 3
+SIGNAL = 4
+
+# header field codes and their types
+_HEADER_FIELDS = {
+    "path": (1, "o"),
+    "interface": (2, "s"),
+    "member": (3, "s"),
+    "error_name": (4, "s"),
+    "reply_serial": (5, "u"),
+    "destination": (6, "s"),
+    "sender": (7, "s"),
+    "signature": (8, "g"),
+}
+_HEADER_FIELD_NAMES = {code: name for name, (code, _) in _HEADER_FIELDS.items()}
+
+_FIXED_TYPES = {
+    "y": "B",
+    "b": "I",
+    "n": "h",
+    "q": "H",
+    "i": "i",
+    "u": "I",
+    "x": "q",
+    "t": "Q",
+    "d": "d",
+    "h": "I",
+}
+_ALIGNMENT = {"s": 4, "o": 4, "g": 1, "a": 4, "(": 8, "{": 8, "v": 1}
+
+NOTIFICATIONS_BUS_NAME = "org.freedesktop.Notifications"
+NOTIFICATIONS_PATH = "/org/freedesktop/Notifications"
+# zenity dialog type -> (icon, urgency): 1 is normal, 2 critical
+_DIALOG_STYLES = {
+    "--info": ("dialog-information", 1),
+    "--warning": ("dialog-warning", 1),
+    "--error": ("dialog-error", 2),
+}
+NOTIFICATION_EXPIRE_MILLISECONDS = 10_000
+
+
+class DBusError(Exception):
+    """
+    A D-Bus protocol failure, or an error returned by the called method.
+    """
+
+
+# one D-Bus message: METHOD_CALL, METHOD_RETURN, ERROR or SIGNAL, the serial the sender gave it,
+# a dict of the header fields by name, e.g. "member" or "reply_serial", and the list of body values
+Message = namedtuple("Message", ["message_type", "serial", "fields", "body"])
+
+
+class DBusConnection:
+    """
+    An authenticated connection to a bus, sending and receiving whole messages.
+    """
+
+    def __init__(self, address, uid=None, timeout=DBUS_TIMEOUT_SECONDS):
+        """
+        Connect, authenticate and say Hello to the bus.
+        :param address: a bus address like "unix:path=/run/user/1000/bus"
+        :param uid: the user to connect as, root switches its effective uid to it while connecting
+        :param timeout: the seconds to wait for the bus
+        :raise OSError: if the bus cannot be reached
+        :raise DBusError: if the bus refuses the connection
+        """
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._buffer = b""
+        self._serial = 0
+        try:
+            self._connect(address, uid)
+            self.unique_name = self.call(
+                "org.freedesktop.DBus", "/org/freedesktop/DBus", "org.freedesktop.DBus", "Hello"
+            )[0]
+        except Exception:
+            self._socket.close()
+            raise
+
+    def _connect(self, address, uid):
+        """
+        Connect the socket and authenticate with EXTERNAL, the bus checks the uid against the socket's credentials.
+        """
+        socket_address = _parse_unix_address(address)
+        if uid is None:
+            uid = os.geteuid()
+        # the bus reads the credentials of the connecting process, so root connects as the user
+        switch_uid = os.geteuid() == 0 and uid != 0
+        if switch_uid:
+            os.seteuid(uid)
+        try:
+            self._socket.connect(socket_address)
+        finally:
+            if switch_uid:
+                os.seteuid(0)
+
+        self._socket.sendall(b"\0AUTH EXTERNAL " + str(uid).encode().hex().encode() + b"\r\n")
+        reply = self._read_line()
+        if not reply.startswith(b"OK "):
+            raise DBusError(f"Authentication refused: {reply.decode(errors='replace')}")
+        self._socket.sendall(b"BEGIN\r\n")
+
+    def _read_line(self):
+        while b"\r\n" not in self._buffer:
+            self._receive_more()
+        line, self._buffer = self._buffer.split(b"\r\n", 1)
+        return line
+
+    def _receive_more(self):
+        data = self._socket.recv(65536)
+        if not data:
+            raise DBusError("The bus closed the connection.")
+        self._buffer += data
+
+    def send(self, message_type, fields, signature="", args=(), flags=0):
+        """
+        Send one message.
+        :param message_type: METHOD_CALL, METHOD_RETURN, ERROR or SIGNAL
+        :param fields: a dict of the header fields by name, the signature is added from the argument
+        :param signature: the D-Bus signature of the body
+        :param args: the body values, variants are (signature, value) pairs
+        :param flags: the message flags
+        :return: the serial of the message
+        """
+        self._serial += 1
+        body = _Writer()
+        for type_code, value in zip(_split_signature(signature), args):
+            body.write(type_code, value)
+
+        header_fields = [
+            (_HEADER_FIELDS[name][0], (_HEADER_FIELDS[name][1], value))
+            for name, value in fields.items()
+        ]
+        if signature:
+            header_fields.append((_HEADER_FIELDS["signature"][0], ("g", signature)))
+        header = _Writer()
+        header.write("y", ord("l"))
+        header.write("y", message_type)
+        header.write("y", flags)
+        header.write("y", 1)
+        header.write("u", len(body.data))
+        header.write("u", self._serial)
+        header.write("a(yv)", header_fields)
+        header.align(8)
+        self._socket.sendall(bytes(header.data) + bytes(body.data))
+        return self._serial
+
+    def receive(self):
+        """
+        Read the next message from the bus.
+        :return: a Message
+        :raise DBusError: if the message is malformed or the bus closed the connection
+        """
+        while len(self._buffer) < 16:
+            self._receive_more()
+        endian = {ord("l"): "<", ord("B"): ">"}.get(self._buffer[0])
+        if endian is None:
+            raise DBusError("Malformed message from the bus.")
+        body_length, serial, fields_length = struct.unpack_from(f"{endian}III", self._buffer, 4)
+        header_length = 16 + fields_length
+        header_length += -header_length % 8
+        while len(self._buffer) < header_length + body_length:
+            self._receive_more()
+        data = self._buffer[: header_length + body_length]
+        self._buffer = self._buffer[header_length + body_length :]
+
+        reader = _Reader(data, endian, 12)
+        fields = {
+            _HEADER_FIELD_NAMES.get(code, code): value
+            for code, (_, value) in reader.read("a(yv)")
+        }
+        reader = _Reader(data[header_length:], endian)
+        body = [reader.read(type_code) for type_code in _split_signature(fields.get("signature", ""))]
+        return Message(data[1], serial, fields, body)
+
+    def call(self, destination, path, interface, member, signature="", args=()):
+        """
+        Call a method and wait for its reply, ignoring other messages.
+        :return: the list of values returned
+        :raise DBusError: if the method returned an error
+        """
+        serial = self.send(
+            METHOD_CALL,
+            {"path": path, "interface": interface, "member": member, "destination": destination},
+            signature,
+            args,
+        )
+        while True:
+            message = self.receive()
+            if message.fields.get("reply_serial") != serial:
+                continue
+            if message.message_type == ERROR:
+                detail = f": {message.body[0]}" if message.body else ""
+                raise DBusError(f"{message.fields.get('error_name')}{detail}")
+            return message.body
+
+    def reply(self, message, signature="", args=()):
+        """
+        Return values for a method call received from the bus.
+        :param message: the received METHOD_CALL Message
+        :return: None
+        """
+        self.send(
+            METHOD_RETURN,
+            {"reply_serial": message.serial, "destination": message.fields.get("sender")},
+            signature,
+            args,
+        )
+
+    def close(self):
+        self._socket.close()
+
+
+class DBusNotifier:
+    """
+    Sends notifications to org.freedesktop.Notifications on every desktop user's
+    session bus, over one long-lived connection per user, with a fallback for
+    users without a session bus or a notification server.
+    """
+
+    def __init__(self, fallback=None, runtime_dir="/run/user"):
+        """
+        :param fallback: sends a notification another way, like send_desktop_notification_zenity
+        :param runtime_dir: the directory of the users' runtime directories holding their session bus
+        """
+        self.fallback = fallback
+        self.runtime_dir = runtime_dir
+        # uid -> bus address, found once
+        self._addresses = {}
+        # uid -> DBusConnection
+        self._connections = {}
+        # (uid, app or title) -> the id of its last notification, replaced by the next one
+        self._notification_ids = {}
+
+    def send(self, title, message, user_info, dialog_type="--info"):
+        """
+        Show a notification to one desktop user. Has the signature of send_desktop_notification_zenity.
+        :param title: the title, "<app>: <event>" replaces the app's previous notification
+        :param message: the text
+        :param user_info: the desktop user dict with its "uid"
+        :param dialog_type: the zenity dialog type, mapped to an icon and urgency
+        :return: None
+        """
+        uid = user_info.get("uid")
+        connection = None
+        try:
+            connection = self._connection(uid)
+            if connection is not None:
+                replace_key = (uid, title.split(": ", 1)[0])
+                icon, urgency = _DIALOG_STYLES.get(dialog_type, _DIALOG_STYLES["--info"])
+                (notification_id,) = connection.call(
+                    NOTIFICATIONS_BUS_NAME,
+                    NOTIFICATIONS_PATH,
+                    NOTIFICATIONS_BUS_NAME,
+                    "Notify",
+                    "susssasa{sv}i",
+                    [
+                        "AppLimiter",
+                        self._notification_ids.get(replace_key, 0),
+                        icon,
+                        title,
+                        message,
+                        [],
+                        {"urgency": ("y", urgency)},
+                        NOTIFICATION_EXPIRE_MILLISECONDS,
+                    ],
+                )
+                self._notification_ids[replace_key] = notification_id
+                return
+        except (OSError, DBusError) as e:
+            logger.warning(f"Could not send D-Bus notification to user {user_info.get('username')}: {e}")
+            # the session may have ended, connect again next time
+            self._connections.pop(uid, None)
+            if connection is not None:
+                connection.close()
+        if self.fallback is not None:
+            self.fallback(title, message, user_info, dialog_type=dialog_type)
+
+    def _connection(self, uid):
+        """
+        :param uid: the user id
+        :return: the open connection to the user's session bus, None if the user has none
+        :raise OSError, DBusError: if connecting fails
+        """
+        if uid is None:
+            return None
+        connection = self._connections.get(uid)
+        if connection is not None:
+            return connection
+        address = self._addresses.get(uid)
+        if address is None:
+            bus_path = os.path.join(self.runtime_dir, str(uid), "bus")
+            if not os.path.exists(bus_path):
+                return None
+            address = self._addresses[uid] = f"unix:path={bus_path}"
+        connection = self._connections[uid] = DBusConnection(address, uid)
+        logger.info(f"Connected to the session bus of uid {uid}.")
+        return connection
+
+    def close(self):
+        """
+        Close all connections.
+        :return: None
+        """
+        for connection in self._connections.values():
+            connection.close()
+        self._connections = {}
+
+
+def _parse_unix_address(address):
+    """
+    :param address: a D-Bus address, the first unix one of a ";"-separated list is used
+    :return: the socket address, abstract ones start with a NUL byte
+    :raise DBusError: if there is no usable unix address
+    """
+    for entry in address.split(";"):
+        transport, _, options = entry.partition(":")
+        if transport != "unix":
+            continue
+        values = dict(option.partition("=")[::2] for option in options.split(","))
+        if "path" in values:
+            return values["path"]
+        if "abstract" in values:
+            return "\0" + values["abstract"]
+    raise DBusError(f"No unix socket in bus address '{address}'.")
+
+
+def _split_signature(signature):
+    """
+    :param signature: a D-Bus signature, e.g. "susssasa{sv}i"
+    :return: its single complete types, e.g. ["s", "u", "s", "s", "s", "as", "a{sv}", "i"]
+    """
+    types = []
+    index = 0
+    while index < len(signature):
+        end = _complete_type_end(signature, index)
+        types.append(signature[index:end])
+        index = end
+    return types
+
+
+def _complete_type_end(signature, index):
+    """
+    :return: the index after the complete type starting at index
+    """
+    type_code = signature[index]
+    if type_code == "a":
+        return _complete_type_end(signature, index + 1)
+    if type_code in "({":
+        closing = ")" if type_code == "(" else "}"
+        index += 1
+        while signature[index] != closing:
+            index = _complete_type_end(signature, index)
+        return index + 1
+    if type_code not in _FIXED_TYPES and type_code not in "sogv":
+        raise DBusError(f"Unsupported type '{type_code}' in signature '{signature}'.")
+    return index + 1
+
+
+def _alignment(type_code):
+    if type_code[0] in _FIXED_TYPES:
+        return struct.calcsize(_FIXED_TYPES[type_code[0]])
+    return _ALIGNMENT[type_code[0]]
+
+
+class _Writer:
+    """
+    Marshals values in little-endian.
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def align(self, alignment):
+        self.data.extend(bytes(-len(self.data) % alignment))
+
+    def write(self, type_code, value):
+        """
+        :param type_code: a single complete type
+        :param value: a list for arrays, a dict for arrays of dict entries,
+                      a tuple for structs and a (signature, value) pair for variants
+        """
+        first = type_code[0]
+        self.align(_alignment(type_code))
+        if first in _FIXED_TYPES:
+            self.data.extend(struct.pack("<" + _FIXED_TYPES[first], value))
+        elif first in "so":
+            encoded = value.encode()
+            self.data.extend(struct.pack("<I", len(encoded)) + encoded + b"\0")
+        elif first == "g":
+            encoded = value.encode()
+            self.data.extend(struct.pack("<B", len(encoded)) + encoded + b"\0")
+        elif first == "v":
+            signature, inner_value = value
+            self.write("g", signature)
+            self.write(signature, inner_value)
+        elif first == "a":
+            element_type = type_code[1:]
+            length_offset = len(self.data)
+            self.data.extend(bytes(4))
+            # the length excludes the padding before the first element
+            self.align(_alignment(element_type))
+            elements_start = len(self.data)
+            elements = value.items() if element_type[0] == "{" else value
+            for element in elements:
+                self.write(element_type, element)
+            struct.pack_into("<I", self.data, length_offset, len(self.data) - elements_start)
+        else:
+            for field_type, field_value in zip(_split_signature(type_code[1:-1]), value):
+                self.write(field_type, field_value)
+
+
+class _Reader:
+    """
+    Unmarshals values in either byte order.
+    """
+
+    def __init__(self, data, endian, offset=0):
+        self.data = data
+        self.endian = endian
+        self.offset = offset
+
+    def align(self, alignment):
+        self.offset += -self.offset % alignment
+
+    def read(self, type_code):
+        """
+        :param type_code: a single complete type
+        :return: the value, arrays of dict entries as dicts, structs as tuples and variants as (signature, value)
+        """
+        first = type_code[0]
+        self.align(_alignment(type_code))
+        try:
+            if first in _FIXED_TYPES:
+                fmt = self.endian + _FIXED_TYPES[first]
+                (value,) = struct.unpack_from(fmt, self.data, self.offset)
+                self.offset += struct.calcsize(fmt)
+                return bool(value) if first == "b" else value
+            if first in "sog":
+                length_format = self.endian + ("B" if first == "g" else "I")
+                (length,) = struct.unpack_from(length_format, self.data, self.offset)
+                self.offset += struct.calcsize(length_format)
+                value = self.data[self.offset : self.offset + length].decode()
+                self.offset += length + 1
+                return value
+            if first == "v":
+                signature = self.read("g")
+                return signature, self.read(signature)
+            if first == "a":
+                element_type = type_code[1:]
+                (length,) = struct.unpack_from(self.endian + "I", self.data, self.offset)
+                self.offset += 4
+                self.align(_alignment(element_type))
+                end = self.offset + length
+                elements = []
+                while self.offset < end:
+                    elements.append(self.read(element_type))
+                return dict(elements) if element_type[0] == "{" else elements
+            return tuple(self.read(field_type) for field_type in _split_signature(type_code[1:-1]))
+        except (struct.error, UnicodeDecodeError) as e:
+            raise DBusError(f"Malformed message: {e}")
@@ -0,0 +1,240 @@
+# AppLimiter/src/applimiter/exec_blocker.py
+
+"""
+Block launches of apps past their limit at exec time, with fanotify.
+
+The executables of blocked apps are marked with FAN_OPEN_EXEC_PERM, so the
+kernel holds every execve() of them until a listener answers. A thread blocked
+in poll() answers each event at once: FAN_DENY if the file is in the set of
+blocked (st_dev, st_ino) pairs, and blocked for the uid of the launching
+process if it is only blocked for some users, FAN_ALLOW otherwise. The daemon replaces that
+set whenever the breach state of an app changes, nothing is polled on a timer.
+
+This needs root (CAP_SYS_ADMIN) and a kernel built with
+CONFIG_FANOTIFY_ACCESS_PERMISSIONS. Without them the blocker stays inactive and
+the daemon falls back to terminating relaunched apps on its next cycle.
+"""
+
+import os
+import select
+import struct
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# constants from <linux/fanotify.h>
+FAN_CLOEXEC = 0x00000001
+FAN_CLASS_CONTENT = 0x00000004
+FAN_OPEN_EXEC_PERM = 0x00040000
+FAN_MARK_ADD = 0x00000001
+FAN_MARK_REMOVE = 0x00000002
+FAN_ALLOW = 0x01
+FAN_DENY = 0x02
+FAN_NOFD = -1
+FANOTIFY_METADATA_VERSION = 3
+AT_FDCWD = -100
+
+# struct fanotify_event_metadata and struct fanotify_response
+_EVENT_METADATA = struct.Struct("=IBBHQii")
+_RESPONSE = struct.Struct("=iI")
+
+
+class ExecBlocker:
+    """
+    Denies execution of a set of executables, identified by (st_dev, st_ino).
+    """
+
+    def __init__(self):
+        self._fanotify_fd = None
+        self._wake_read_fd = None
+        self._wake_write_fd = None
+        self._thread = None
+        self._libc = None
+        # (st_dev, st_ino) -> frozenset of the uids denied, or None for everyone,
+        # replaced as a whole, so the listener thread never sees a partial update
+        self._blocked_files = {}
+        # path -> (st_dev, st_ino) of the marked executables
+        self._marked = {}
+        self.denied = 0
+
+    @property
+    def active(self):
+        """
+        :return: True if the listener is running
+        """
+        return self._thread is not None
+
+    def start(self):
+        """
+        Create the fanotify group and start the listener thread.
+        :return: True if started, False if fanotify permission events are not available
+        """
+        if self.active:
+            return True
+        try:
+            import ctypes
+
+            libc = ctypes.CDLL(None, use_errno=True)
+            libc.fanotify_init.argtypes = [ctypes.c_uint, ctypes.c_uint]
+            libc.fanotify_mark.argtypes = [
+                ctypes.c_int,
+                ctypes.c_uint,
+                ctypes.c_uint64,
+                ctypes.c_int,
+                ctypes.c_char_p,
+            ]
+            fanotify_fd = libc.fanotify_init(
+                FAN_CLASS_CONTENT | FAN_CLOEXEC,
+                os.O_RDONLY | os.O_LARGEFILE | os.O_CLOEXEC,
+            )
+        except (OSError, AttributeError) as e:
+            logger.warning(f"Launch blocking is not supported here: {e}")
+            return False
+        if fanotify_fd < 0:
+            logger.warning(
+                f"Launch blocking is not available, fanotify_init failed:"
+                f" {os.strerror(ctypes.get_errno())}"
+            )
+            return False
+
+        self._libc = libc
+        self._fanotify_fd = fanotify_fd
+        self._wake_read_fd, self._wake_write_fd = os.pipe2(os.O_CLOEXEC)
+        self._thread = threading.Thread(
+            target=self._serve, name="applimiter-exec-blocker", daemon=True
+        )
+        self._thread.start()
+        logger.info("Launch blocking started.")
+        return True
+
+    def update(self, executables, blocked_uids=None):
+        """
+        Replace the set of blocked executables.
+        :param executables: a dict of path -> (st_dev, st_ino) of the executables to block
+        :param blocked_uids: an optional dict of (st_dev, st_ino) -> the uids the file is denied to,
+                             files not in it, or mapped to None, are denied to everyone
+        :return: None
+        """
+        if executables and not self.start():
+            return
+        if not self.active:
+            return
+        blocked_uids = blocked_uids or {}
+        self._blocked_files = {
+            file_id: None if blocked_uids.get(file_id) is None else frozenset(blocked_uids[file_id])
+            for file_id in executables.values()
+        }
+        for path in list(self._marked):
+            if path not in executables or self._marked[path] != executables[path]:
+                self._mark(FAN_MARK_REMOVE, path)
+                del self._marked[path]
+        for path, file_id in executables.items():
+            if path not in self._marked and self._mark(FAN_MARK_ADD, path):
+                self._marked[path] = file_id
+        logger.info(f"Blocking launches of {len(self._marked)} executables.")
+
+    def close(self):
+        """
+        Stop the listener. Closing the fanotify group allows any launch still waiting.
+        :return: None
+        """
+        if not self.active:
+            return
+        os.write(self._wake_write_fd, b"x")
+        self._thread.join()
+        for fd in (self._fanotify_fd, self._wake_read_fd, self._wake_write_fd):
+            os.close(fd)
+        self._thread = None
+        self._marked = {}
+        self._blocked_files = {}
+
+    def _mark(self, flags, path):
+        """
+        :param flags: FAN_MARK_ADD or FAN_MARK_REMOVE
+        :param path: the executable
+        :return: True on success, False otherwise
+        """
+        import ctypes
+
+        result = self._libc.fanotify_mark(
+            self._fanotify_fd, flags, FAN_OPEN_EXEC_PERM, AT_FDCWD, os.fsencode(path)
+        )
+        if result != 0:
+            logger.warning(
+                f"Could not {'un' if flags == FAN_MARK_REMOVE else ''}mark {path}:"
+                f" {os.strerror(ctypes.get_errno())}"
+            )
+            return False
+        return True
+
+    def _serve(self):
+        """
+        Answer permission events until close() is called.
+        Every event must be answered, or the launching process hangs, so anything
+        unexpected is allowed.
+        """
+        poller = select.poll()
+        poller.register(self._fanotify_fd, select.POLLIN)
+        poller.register(self._wake_read_fd, select.POLLIN)
+        while True:
+            ready_fds = {fd for fd, _ in poller.poll()}
+            if self._wake_read_fd in ready_fds:
+                return
+            try:
+                buffer = os.read(self._fanotify_fd, 4096)
+            except OSError as e:
+                logger.error(f"Reading fanotify events failed: {e}")
+                continue
+            offset = 0
+            while offset + _EVENT_METADATA.size <= len(buffer):
+                event_len, version, _, _, mask, event_fd, pid = _EVENT_METADATA.unpack_from(
+                    buffer, offset
+                )
+                if event_len < _EVENT_METADATA.size:
+                    break
+                offset += event_len
+                if version != FANOTIFY_METADATA_VERSION:
+                    logger.error(f"Unexpected fanotify metadata version {version}.")
+                if event_fd == FAN_NOFD:
+                    continue
+                self._answer(event_fd, mask, pid)
+
+    def _answer(self, event_fd, mask, pid):
+        """
+        Allow or deny one event and close its file descriptor.
+        """
+        response = FAN_ALLOW
+        blocked_files = self._blocked_files
+        try:
+            if mask & FAN_OPEN_EXEC_PERM:
+                stat_result = os.fstat(event_fd)
+                file_id = (stat_result.st_dev, stat_result.st_ino)
+                if file_id in blocked_files:
+                    uids = blocked_files[file_id]
+                    # /proc/<pid> is owned by the effective uid of the launching process
+                    if uids is None or os.stat(f"/proc/{pid}").st_uid in uids:
+                        response = FAN_DENY
+        except OSError:
+            pass
+        try:
+            os.write(self._fanotify_fd, _RESPONSE.pack(event_fd, response))
+        except OSError as e:
+            logger.error(f"Answering fanotify event failed: {e}")
+        finally:
+            os.close(event_fd)
+        if response == FAN_DENY:
+            self.denied += 1
+            logger.info(f"Denied a launch by process {pid}, its app is past its limit.")
+
+
+def executable_file_id(path):
+    """
+    :param path: the path of an executable
+    :return: its (st_dev, st_ino), or None if it doesn't exist
+    """
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return stat_result.st_dev, stat_result.st_ino
@@ -0,0 +1,454 @@
+# AppLimiter/src/applimiter/history.py
+
+"""
+Per-minute usage history, kept for reports long after the daily and weekly totals reset.
+
+Each app has a directory under HISTORY_DIR_PATH, named after the app with
+urllib.parse.quote, holding one file per local calendar month, at one of three resolutions:
+
+    <app>/<YYYY-MM>.minutes    uint8 per minute of the month, the seconds the app ran in it
+    <app>/<YYYY-MM>.hours      uint16 per hour of the month
+    <app>/<YYYY-MM>.days       uint32 per day of the month
+
+The files are fixed-width little-endian arrays, day after day, so a minute is found by its
+offset alone and a month can be read, or memory-mapped, in one piece. The daemon writes the
+minutes of the current month. As months age past the "history_retention" of the config they
+are compacted into hours, then days, and finally deleted, a few files at a time in the
+daemon's idle time. Reports reduce whatever resolution a month has with NumPy when it is
+installed, and with plain slices otherwise.
+"""
+
+import sys
+import array
+import calendar
+import datetime
+import logging
+import os
+import time
+from urllib.parse import quote, unquote
+
+from applimiter.clock import SYSTEM_CLOCK
+from applimiter.constants import (
+    HISTORY_DIR_PATH,
+    HISTORY_MINUTE_RETENTION_DAYS,
+    HISTORY_HOUR_RETENTION_DAYS,
+    HISTORY_COMPACTION_SCAN_INTERVAL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+MINUTE_FILE_SUFFIX = ".minutes"
+WEEKDAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+REPORT_PERIODS = ["day", "week", "weekday", "hour"]
+
+# the resolutions, finest first: file suffix -> (array typecode, values per day)
+_RESOLUTIONS = {
+    MINUTE_FILE_SUFFIX: ("B", MINUTES_PER_DAY),
+    ".hours": ("H", 24),
+    ".days": ("I", 1),
+}
+
+_ZERO_DAY = bytes(MINUTES_PER_DAY)
+
+
+class UsageHistory:
+    """
+    Collects the seconds credited to each app in memory, and adds them to the history files on flush.
+    Old months are compacted by compact(), in steps that fit in a time budget.
+    """
+
+    def __init__(self, directory=HISTORY_DIR_PATH, clock=None):
+        """
+        :param directory: the directory of the history files
+        :param clock: the clock that tells which months are old, defaults to the system clock
+        """
+        self.directory = directory
+        self.clock = clock or SYSTEM_CLOCK
+        # (app name, "YYYY-MM") -> {minute of the month: seconds}
+        self._pending = {}
+        # the compaction work left: app directories to look at, then files to compact
+        self._compaction_work = []
+        self._next_compaction_scan = None
+
+    def record(self, app_name, now_ts, seconds):
+        """
+        Credit the seconds that ended at now_ts, spread over the local minutes they span.
+        :param app_name: the app or group usage name
+        :param now_ts: the unix timestamp of this cycle
+        :param seconds: the seconds to credit
+        :return: None
+        """
+        start_ts = now_ts - seconds
+        while start_ts < now_ts:
+            minute_start_ts = start_ts // 60 * 60
+            minute_end_ts = minute_start_ts + 60
+            part = min(now_ts, minute_end_ts) - start_ts
+            local = datetime.datetime.fromtimestamp(minute_start_ts)
+            minutes = self._pending.setdefault((app_name, f"{local:%Y-%m}"), {})
+            index = (local.day - 1) * MINUTES_PER_DAY + local.hour * 60 + local.minute
+            minutes[index] = minutes.get(index, 0) + part
+            start_ts = minute_end_ts
+
+    def flush(self):
+        """
+        Add the recorded seconds to the history files, at most 60 per minute.
+        Only the changed bytes are written.
+        :return: None
+        """
+        pending, self._pending = self._pending, {}
+        for (app_name, month), minutes in pending.items():
+            app_directory = os.path.join(self.directory, quote(app_name, safe=""))
+            pathname = os.path.join(app_directory, f"{month}{MINUTE_FILE_SUFFIX}")
+            try:
+                os.makedirs(app_directory, exist_ok=True)
+                fd = os.open(pathname, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    # a new month file is a sparse run of zeros
+                    month_size = _days_in_month(month) * MINUTES_PER_DAY
+                    if os.fstat(fd).st_size < month_size:
+                        os.ftruncate(fd, month_size)
+                    for index, seconds in minutes.items():
+                        stored = os.pread(fd, 1, index)[0]
+                        updated = min(stored + round(seconds), 60)
+                        if updated != stored:
+                            os.pwrite(fd, bytes((updated,)), index)
+                finally:
+                    os.close(fd)
+            except OSError as e:
+                logger.error(f"Could not write usage history {pathname}: {e}")
+
+    def compact(self, retention, budget_seconds):
+        """
+        Move months past their retention to a coarser resolution, or delete them, until the
+        time budget is used. Each call does at least one step, the work left is kept for the
+        next call, and the directory is only scanned again every HISTORY_COMPACTION_SCAN_INTERVAL_SECONDS.
+        :param retention: the "history_retention" config dict
+        :param budget_seconds: the time this call may take, in seconds
+        :return: the number of files compacted or deleted
+        """
+        deadline = time.perf_counter() + budget_seconds
+        if not self._compaction_work:
+            now_monotonic = self.clock.monotonic()
+            if self._next_compaction_scan is not None and now_monotonic < self._next_compaction_scan:
+                return 0
+            self._next_compaction_scan = now_monotonic + HISTORY_COMPACTION_SCAN_INTERVAL_SECONDS
+            try:
+                self._compaction_work = [
+                    (os.path.join(self.directory, entry), None)
+                    for entry in os.listdir(self.directory)
+                ]
+            except OSError:
+                return 0
+
+        retention_days = _retention_days(retention)
+        today = self.clock.now().date()
+        compacted_files = 0
+        while self._compaction_work:
+            pathname, target_suffix = self._compaction_work.pop()
+            if target_suffix is None:
+                self._compaction_work.extend(_due_compactions(pathname, retention_days, today))
+            elif _compact_file(pathname, target_suffix):
+                compacted_files += 1
+            if time.perf_counter() >= deadline:
+                break
+        if compacted_files:
+            logger.info(f"Compacted {compacted_files} usage history files.")
+        return compacted_files
+
+
+def _retention_days(retention):
+    """
+    :param retention: the "history_retention" config dict
+    :return: the days to keep (minutes, hours, days) for, days None to keep them forever,
+             each at least the one before so that months only get coarser
+    """
+    minute_days = max(int(retention.get("minute_days", HISTORY_MINUTE_RETENTION_DAYS)), 1)
+    hour_days = max(int(retention.get("hour_days", HISTORY_HOUR_RETENTION_DAYS)), minute_days)
+    day_days = retention.get("day_days")
+    if day_days is not None:
+        day_days = max(int(day_days), hour_days)
+    return minute_days, hour_days, day_days
+
+
+def _due_compactions(app_directory, retention_days, today):
+    """
+    :param app_directory: the history directory of one app
+    :param retention_days: the (minute, hour, day) retention days
+    :param today: the local date
+    :return: a list of (file pathname, suffix of the resolution to compact it to, "" to delete it)
+    """
+    minute_days, hour_days, day_days = retention_days
+    try:
+        entries = os.listdir(app_directory)
+    except OSError:
+        return []
+    due = []
+    for entry in entries:
+        month, suffix = os.path.splitext(entry)
+        if suffix not in _RESOLUTIONS:
+            continue
+        try:
+            month_start = datetime.date.fromisoformat(f"{month}-01")
+        except ValueError:
+            continue
+        age_days = (today - month_start.replace(day=_days_in_month(month))).days
+        if age_days <= minute_days:
+            target_suffix = MINUTE_FILE_SUFFIX
+        elif age_days <= hour_days:
+            target_suffix = ".hours"
+        elif day_days is None or age_days <= day_days:
+            target_suffix = ".days"
+        else:
+            target_suffix = ""
+        resolutions = list(_RESOLUTIONS)
+        # a month is never made finer again
+        if target_suffix and resolutions.index(target_suffix) <= resolutions.index(suffix):
+            continue
+        due.append((os.path.join(app_directory, entry), target_suffix))
+    return due
+
+
+def _compact_file(pathname, target_suffix):
+    """
+    Replace a history file by one at a coarser resolution, or delete it.
+    The new file is complete before the old one is removed, and an existing one is
+    trusted to hold its data, so an interrupted compaction never counts a month twice.
+    :param pathname: the history file
+    :param target_suffix: the suffix of the resolution to compact it to, "" to delete it
+    :return: True if the file was compacted or deleted
+    """
+    base, suffix = os.path.splitext(pathname)
+    try:
+        if target_suffix:
+            target_pathname = f"{base}{target_suffix}"
+            if not os.path.exists(target_pathname):
+                typecode, values_per_day = _RESOLUTIONS[target_suffix]
+                month = os.path.basename(base)
+                rows = _read_values(pathname, suffix, 0, _days_in_month(month), values_per_day)
+                values = array.array(typecode, [value for row in rows for value in row])
+                if sys.byteorder == "big":
+                    values.byteswap()
+                temporary_pathname = f"{target_pathname}.tmp"
+                with open(temporary_pathname, "wb") as f:
+                    f.write(values.tobytes())
+                os.replace(temporary_pathname, target_pathname)
+        os.unlink(pathname)
+    except OSError as e:
+        logger.error(f"Could not compact usage history {pathname}: {e}")
+        return False
+    return True
+
+
+def list_history_apps(directory=HISTORY_DIR_PATH):
+    """
+    :param directory: the directory of the history files
+    :return: the sorted names of the apps and groups that have history
+    """
+    try:
+        entries = os.listdir(directory)
+    except OSError:
+        return []
+    return sorted(unquote(entry) for entry in entries)
+
+
+def read_hourly_seconds(app_name, first_day, last_day, directory=HISTORY_DIR_PATH):
+    """
+    Read the history of an app and reduce it to hours.
+    :param app_name: the app or group usage name
+    :param first_day: the first local date
+    :param last_day: the last local date, included
+    :param directory: the directory of the history files
+    :return: a list with a list of 24 hourly seconds for every day from first_day to last_day,
+             None for days only kept as daily totals
+    """
+    return _read_range(app_name, first_day, last_day, directory, 24)
+
+
+def read_daily_seconds(app_name, first_day, last_day, directory=HISTORY_DIR_PATH):
+    """
+    Read the history of an app and reduce it to days.
+    :param app_name: the app or group usage name
+    :param first_day: the first local date
+    :param last_day: the last local date, included
+    :param directory: the directory of the history files
+    :return: a list with the seconds of every day from first_day to last_day
+    """
+    return [row[0] for row in _read_range(app_name, first_day, last_day, directory, 1)]
+
+
+def _read_range(app_name, first_day, last_day, directory, values_per_day):
+    """
+    :return: a list with a list of values_per_day seconds for every day, None for days kept coarser
+    """
+    app_directory = os.path.join(directory, quote(app_name, safe=""))
+    rows = []
+    month_start = first_day.replace(day=1)
+    while month_start <= last_day:
+        month = f"{month_start:%Y-%m}"
+        first_index = max(first_day, month_start).day - 1
+        last_index = min(last_day, month_start.replace(day=_days_in_month(month))).day - 1
+        day_count = last_index - first_index + 1
+
+        month_rows = [[0] * values_per_day for _ in range(day_count)]
+        # finest first, a month caught between two resolutions is read from the finer one
+        for suffix, (_, file_values_per_day) in _RESOLUTIONS.items():
+            pathname = os.path.join(app_directory, f"{month}{suffix}")
+            if not os.path.exists(pathname):
+                continue
+            if file_values_per_day < values_per_day:
+                month_rows = [None] * day_count
+            else:
+                try:
+                    month_rows = _read_values(pathname, suffix, first_index, day_count, values_per_day)
+                except OSError as e:
+                    logger.error(f"Could not read usage history {pathname}: {e}")
+            break
+        rows.extend(month_rows)
+
+        month_start = (month_start + datetime.timedelta(days=32)).replace(day=1)
+    return rows
+
+
+def _read_values(pathname, suffix, first_index, day_count, values_per_day):
+    """
+    Read some days of a history file, summed to a coarser resolution.
+    :param pathname: the history file
+    :param suffix: its resolution suffix
+    :param first_index: the first day to read, 0 for the first of the month
+    :param day_count: the number of days to read
+    :param values_per_day: the resolution to sum to, at most the file's
+    :return: a list with a list of values_per_day seconds for every day
+    :raise OSError: if the file cannot be read
+    """
+    typecode, file_values_per_day = _RESOLUTIONS[suffix]
+    item_size = array.array(typecode).itemsize
+    day_size = file_values_per_day * item_size
+    with open(pathname, "rb") as f:
+        f.seek(first_index * day_size)
+        data = f.read(day_count * day_size)
+    # a short file has no usage in its missing days
+    data = data.ljust(day_count * day_size, b"\0")
+    group_size = file_values_per_day // values_per_day
+
+    numpy = _numpy()
+    if numpy is not None:
+        values = numpy.frombuffer(data, dtype=numpy.dtype(typecode).newbyteorder("<"))
+        return (
+            values.reshape(day_count, values_per_day, group_size)
+            .sum(axis=2, dtype=numpy.uint32)
+            .tolist()
+        )
+
+    # bytes are summed as they are, slicing them is cheaper than slicing an array
+    values = data
+    if typecode != "B":
+        values = array.array(typecode, data)
+        if sys.byteorder == "big":
+            values.byteswap()
+    rows = []
+    for day in range(day_count):
+        day_start = day * file_values_per_day
+        if typecode == "B" and data[day_start : day_start + MINUTES_PER_DAY] == _ZERO_DAY:
+            rows.append([0] * values_per_day)
+            continue
+        rows.append(
+            [
+                sum(values[start : start + group_size])
+                for start in range(day_start, day_start + file_values_per_day, group_size)
+            ]
+        )
+    return rows
+
+
+def build_report(app_names, first_day, last_day, period, directory=HISTORY_DIR_PATH):
+    """
+    Aggregate the history of apps over a range of days.
+    :param app_names: the app or group usage names
+    :param first_day: the first local date
+    :param last_day: the last local date, included
+    :param period: "day" and "week" for the minutes of each, "weekday" for the average
+                   minutes per weekday and "hour" for the average minutes per weekday and hour
+    :param directory: the directory of the history files
+    :return: a list of rows, (app name, label, minutes) or (app name, weekday, hour, minutes) for "hour"
+    """
+    if period not in REPORT_PERIODS:
+        raise ValueError(f"Unknown report period '{period}'.")
+    rows = []
+    day_count = (last_day - first_day).days + 1
+    # the number of times each weekday occurs in the range, to average over
+    weekday_counts = [0] * 7
+    for day_offset in range(min(day_count, 7)):
+        weekday_counts[(first_day.weekday() + day_offset) % 7] = (day_count - day_offset + 6) // 7
+
+    for app_name in app_names:
+        if period == "hour":
+            heatmap = [[0] * 24 for _ in range(7)]
+            # days only kept as daily totals can't say which hours they were used in
+            hourly_day_counts = [0] * 7
+            hourly_seconds = read_hourly_seconds(app_name, first_day, last_day, directory)
+            for day_offset, hours in enumerate(hourly_seconds):
+                if hours is None:
+                    continue
+                weekday = (first_day.weekday() + day_offset) % 7
+                hourly_day_counts[weekday] += 1
+                weekday_row = heatmap[weekday]
+                for hour, seconds in enumerate(hours):
+                    weekday_row[hour] += seconds
+            for weekday, weekday_row in enumerate(heatmap):
+                if not hourly_day_counts[weekday]:
+                    continue
+                for hour, seconds in enumerate(weekday_row):
+                    rows.append(
+                        (
+                            app_name,
+                            WEEKDAY_NAMES[weekday],
+                            hour,
+                            seconds / 60 / hourly_day_counts[weekday],
+                        )
+                    )
+            continue
+
+        daily_seconds = read_daily_seconds(app_name, first_day, last_day, directory)
+        if period == "day":
+            for day_offset, seconds in enumerate(daily_seconds):
+                day = first_day + datetime.timedelta(days=day_offset)
+                rows.append((app_name, day.isoformat(), seconds / 60))
+        elif period == "week":
+            week_seconds = {}
+            for day_offset, seconds in enumerate(daily_seconds):
+                day = first_day + datetime.timedelta(days=day_offset)
+                week_start = day - datetime.timedelta(days=day.weekday())
+                week_seconds[week_start] = week_seconds.get(week_start, 0) + seconds
+            for week_start, seconds in week_seconds.items():
+                rows.append((app_name, week_start.isoformat(), seconds / 60))
+        else:
+            weekday_seconds = [0] * 7
+            for day_offset, seconds in enumerate(daily_seconds):
+                weekday_seconds[(first_day.weekday() + day_offset) % 7] += seconds
+            for weekday, seconds in enumerate(weekday_seconds):
+                if weekday_counts[weekday]:
+                    rows.append(
+                        (app_name, WEEKDAY_NAMES[weekday], seconds / 60 / weekday_counts[weekday])
+                    )
+    return rows
+
+
+def _days_in_month(month):
+    """
+    :param month: a month "YYYY-MM"
+    :return: the number of days in it
+    """
+    year, month_number = (int(part) for part in month.split("-"))
+    return calendar.monthrange(year, month_number)[1]
+
+
+def _numpy():
+    """
+    :return: the numpy module, or None if it is not installed
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
@@ -1,7 +1,7 @@
 # AppLimiter/src/applimiter/main.py
 import sys
 
-from applimiter import cli, daemon
+from applimiter import cli
 
 def main():
     try:
@@ -9,7 +9,15 @@ def main():
         args = cli.parse_arguments()
 
         if args.command == "daemon":
-            daemon.run_daemon(check_interval=args.interval)
+            recorder = None
+            if args.record_trace:
+                from applimiter.replay import TraceRecorder
+
+                recorder = TraceRecorder(args.record_trace, args.interval)
+            # the daemon pulls in psutil and the notification stack, only import it when needed
+            from applimiter import daemon
+
+            daemon.run_daemon(check_interval=args.interval, recorder=recorder)
         else:
             cli.handle_cli_command(args)
 
@@ -0,0 +1,358 @@
+# AppLimiter/src/applimiter/modifications.py
+
+"""
+Store the logic of configuration modifications, shared by the cli and the daemon.
+"""
+
+import heapq
+
+from applimiter.utils import check_exists_app
+
+
+def modification_needs_delay(config, action_payload, apps_by_name=None):
+    """
+    Check if a modification has to wait for the config modification delay.
+    Increasing a limit and removing an app are delayed, everything else applies at once.
+    :param config: the config dict read from config file
+    :param action_payload: the modification dict with "action" and "payload"
+    :param apps_by_name: an optional index of the config apps by name, built if None
+    :return: True if the modification must be queued, False otherwise
+    """
+    if not config.get("enable_config_modification_delay", False):
+        return False
+    if apps_by_name is None:
+        apps_by_name = {app["name"]: app for app in config.get("applications", [])}
+
+    action = action_payload.get("action")
+    payload = action_payload.get("payload") or {}
+    if action == "remove_app":
+        return True
+    if action == "batch":
+        return any(
+            modification_needs_delay(config, operation, apps_by_name)
+            for operation in payload.get("operations", [])
+        )
+    if action != "update_app":
+        return False
+
+    app_to_update = apps_by_name.get(payload["name"])
+    if not app_to_update:
+        return False
+    current_daily_limits = app_to_update.get("daily_limits_by_day", {})
+    new_daily_limits = payload.get("daily_limits_by_day") or {}
+    # a day type left out keeps its current limit
+    if any(
+        float(new_daily_limits.get(day_type, current_daily_limits.get(day_type, 0)))
+        > float(current_daily_limits.get(day_type, 0))
+        for day_type in ("weekdays", "weekends")
+    ):
+        return True
+    # any change to existing allowed hours may allow more, a new schedule only restricts
+    if (
+        "schedule" in payload
+        and app_to_update.get("schedule")
+        and payload["schedule"] != app_to_update["schedule"]
+    ):
+        return True
+    if "rolling_limits" in payload and _rolling_limits_loosened(
+        app_to_update.get("rolling_limits", []), payload["rolling_limits"] or []
+    ):
+        return True
+    return payload.get("weekly_limit_minutes") is not None and float(
+        payload["weekly_limit_minutes"]
+    ) > float(app_to_update.get("weekly_limit_minutes", 0))
+
+
+def _rolling_limits_loosened(current_limits, new_limits):
+    """
+    Check if new rolling limits allow more usage than the current ones.
+    :param current_limits: the current "rolling_limits" of an app
+    :param new_limits: the new "rolling_limits"
+    :return: True if a current window is dropped or its limit raised, False otherwise
+    """
+    new_limit_by_window = {
+        int(limit["window_minutes"]): float(limit["limit_minutes"]) for limit in new_limits
+    }
+    return any(
+        int(limit["window_minutes"]) not in new_limit_by_window
+        or new_limit_by_window[int(limit["window_minutes"])] > float(limit["limit_minutes"])
+        for limit in current_limits
+    )
+
+
+def audit_entry(pending_item, source, now, error=None):
+    """
+    Build the audit log record of a pending modification that was applied or failed,
+    the same whether the daemon or the cli applied it.
+    :param pending_item: the pending modification dict
+    :param source: what applied it, "daemon" or "cli"
+    :param now: the datetime it was applied at
+    :param error: the error message if it failed, None if it was applied
+    :return: the record dict, one line of the audit log
+    """
+    return {
+        "time": now.isoformat(),
+        "source": source,
+        "id": pending_item.get("id"),
+        "action": pending_item.get("action"),
+        "payload": pending_item.get("payload"),
+        "unlock_timestamp": pending_item.get("unlock_timestamp"),
+        "result": "failed" if error else "applied",
+        "error": error,
+    }
+
+
+def removed_app_names(modification):
+    """
+    Collect the names of the apps a modification removes.
+    :param modification: the modification dict with "action" and "payload"
+    :return: a list of app names
+    """
+    action = modification.get("action")
+    payload = modification.get("payload", {})
+    if action == "remove_app":
+        return [payload["name"]] if payload.get("name") else []
+    if action == "batch":
+        return [
+            name
+            for operation in payload.get("operations", [])
+            for name in removed_app_names(operation)
+        ]
+    return []
+
+
+def apply_config_modification(config, modification_to_apply):
+    """
+    Applies a configuration modification to the config dictionary in memory.
+    :param config: the config dict read from config file
+    :param modification_to_apply: the modification to apply
+    :return: None if the modification is applied, otherwise an error message
+    """
+    action = modification_to_apply["action"]
+    payload = modification_to_apply["payload"]
+    apps = config.get("applications", [])
+
+    # batch
+    if action == "batch":
+        return _apply_batch_modification(config, payload.get("operations", []))
+
+    exists_app = check_exists_app(payload.get("name"), config)
+    # add
+    if action == "add_app":
+        if exists_app:
+            return f"Application '{payload['name']}' already exists."
+        config["applications"] = apps + [payload]
+
+    # remove
+    elif action == "remove_app":
+        if not exists_app:
+            return f"Application '{payload['name']}' not found in config."
+        config["applications"] = [
+            app for app in apps if app["name"] != payload["name"]
+        ]
+
+    # update
+    elif action == "update_app":
+        if not exists_app:
+            return f"Application '{payload['name']}' not found for update."
+
+        for app in apps:
+            if app["name"] == payload["name"]:
+                app.update({k: v for k, v in payload.items() if v is not None})
+                break
+
+    # config delay
+    elif action == "set_config_delay":
+        config["enable_config_modification_delay"] = payload.get("enable", False)
+        config["config_modification_delay_seconds"] = payload.get("delay_seconds", 0)
+
+
+    else:
+        return f"Unknown action '{action}'."
+
+    return None
+
+
+def _apply_batch_modification(config, operations):
+    """
+    Apply many add, update and remove operations as one transaction.
+    All operations are validated against an index of the apps by name first,
+    so a failing batch leaves the config untouched.
+    :param config: the config dict read from config file
+    :param operations: a list of modification dicts with "action" and "payload"
+    :return: None if the whole batch is applied, otherwise an error message
+    """
+    apps_by_name = {app["name"]: app for app in config.get("applications", [])}
+    error = validate_batch_operations(set(apps_by_name), operations)
+    if error:
+        return error
+
+    for operation in operations:
+        action = operation["action"]
+        payload = operation["payload"]
+        if action == "add_app":
+            apps_by_name[payload["name"]] = dict(payload)
+        elif action == "remove_app":
+            apps_by_name.pop(payload["name"])
+        elif action == "update_app":
+            apps_by_name[payload["name"]].update(
+                {k: v for k, v in payload.items() if v is not None}
+            )
+    config["applications"] = list(apps_by_name.values())
+    return None
+
+
+def validate_batch_operations(app_names, operations):
+    """
+    Validate all operations of a batch in order.
+    :param app_names: the set of configured app names, updated in place
+    :param operations: a list of modification dicts with "action" and "payload"
+    :return: None if every operation is valid, otherwise the first error message
+    """
+    for idx, operation in enumerate(operations, start=1):
+        error = _validate_batch_operation(operation, app_names)
+        if error:
+            return f"Operation {idx}: {error}"
+    return None
+
+
+def _validate_batch_operation(operation, known_names):
+    """
+    Validate one operation of a batch and track the app names it adds or removes.
+    :param operation: the modification dict with "action" and "payload"
+    :param known_names: the set of app names that exist at this point of the batch, updated in place
+    :return: an error message, or None if the operation is valid
+    """
+    if not isinstance(operation, dict) or not isinstance(operation.get("payload"), dict):
+        return "Every operation needs an 'action' and a 'payload' object."
+    action = operation.get("action")
+    payload = operation["payload"]
+    name = payload.get("name")
+    if not isinstance(name, str) or not name:
+        return "The payload needs an application 'name'."
+
+    if action == "add_app":
+        if name in known_names:
+            return f"Application '{name}' already exists."
+        if not payload.get("process_keywords"):
+            return f"Application '{name}' needs 'process_keywords'."
+        known_names.add(name)
+    elif action == "update_app":
+        if name not in known_names:
+            return f"Application '{name}' not found for update."
+    elif action == "remove_app":
+        if name not in known_names:
+            return f"Application '{name}' not found in config."
+        known_names.discard(name)
+    else:
+        return f"Unknown action '{action}'."
+
+    daily_limits = payload.get("daily_limits_by_day")
+    if daily_limits is not None and not (
+        isinstance(daily_limits, dict) and {"weekdays", "weekends"} <= set(daily_limits)
+    ):
+        return f"Application '{name}' needs both 'weekdays' and 'weekends' daily limits."
+    if daily_limits is not None and not all(
+        _is_minutes(daily_limits[day_type]) for day_type in ("weekdays", "weekends")
+    ):
+        return f"Application '{name}' has daily limits that are not a number of minutes."
+    weekly_limit = payload.get("weekly_limit_minutes")
+    if weekly_limit is not None and not _is_minutes(weekly_limit):
+        return f"Application '{name}' has a 'weekly_limit_minutes' that is not a number of minutes."
+    rolling_limits = payload.get("rolling_limits")
+    if rolling_limits is not None and not (
+        isinstance(rolling_limits, list)
+        and all(
+            isinstance(limit, dict)
+            and _is_minutes(limit.get("window_minutes"))
+            and _is_minutes(limit.get("limit_minutes"))
+            for limit in rolling_limits
+        )
+    ):
+        return f"Application '{name}' has 'rolling_limits' without a number of minutes."
+    return None
+
+
+def _is_minutes(value):
+    """
+    :param value: a limit read from a payload
+    :return: True if it is a non-negative number, False otherwise
+    """
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+
+
+class PendingScheduler:
+    """
+    Keeps the pending modifications in a min-heap keyed by unlock timestamp,
+    with an index by id, so the daemon finds the next due item in O(1) and
+    applies items in O(log n) each.
+    Removed items are only dropped from the index, their heap entries are
+    skipped when they reach the top.
+    """
+
+    def __init__(self, pending_modifications=()):
+        """
+        :param pending_modifications: the "pending_modifications" list of the config
+        """
+        self._items_by_id = {}
+        self._heap = []
+        self.sync(pending_modifications)
+
+    def sync(self, pending_modifications):
+        """
+        Rebuild the heap and the index from a freshly loaded pending list.
+        :param pending_modifications: the "pending_modifications" list of the config
+        :return: None
+        """
+        for idx, item in enumerate(pending_modifications):
+            # items queued by old versions may lack an id
+            item.setdefault("id", f"pending_{idx}_{item.get('action')}")
+        self._items_by_id = {item["id"]: item for item in pending_modifications}
+        self._heap = [
+            (item.get("unlock_timestamp", 0), item_id)
+            for item_id, item in self._items_by_id.items()
+        ]
+        heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self._items_by_id)
+
+    def get(self, item_id):
+        """
+        :param item_id: the id of a pending item
+        :return: the pending item, or None if there is none with this id
+        """
+        return self._items_by_id.get(item_id)
+
+    def next_unlock_timestamp(self):
+        """
+        :return: the unlock timestamp of the next pending item, or None if there is none
+        """
+        self._drop_removed()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_unlocked(self, now_ts):
+        """
+        Remove and return all items that are unlocked at now_ts, in unlock order.
+        :param now_ts: the current unix timestamp
+        :return: a list of pending items
+        """
+        unlocked = []
+        self._drop_removed()
+        while self._heap and self._heap[0][0] <= now_ts:
+            _, item_id = heapq.heappop(self._heap)
+            unlocked.append(self._items_by_id.pop(item_id))
+            self._drop_removed()
+        return unlocked
+
+    def remove(self, item_id):
+        """
+        Remove an item by id.
+        :param item_id: the id of a pending item
+        :return: the removed item, or None if there is none with this id
+        """
+        return self._items_by_id.pop(item_id, None)
+
+    def _drop_removed(self):
+        while self._heap and self._heap[0][1] not in self._items_by_id:
+            heapq.heappop(self._heap)
@@ -11,10 +11,358 @@ import subprocess
 
 import psutil
 
+from applimiter.clock import SYSTEM_CLOCK
+from applimiter.constants import (
+    UTMP_PATH,
+    SESSION_CACHE_MAX_AGE_SECONDS,
+    NOTIFICATION_MIN_INTERVAL_SECONDS,
+    SESSION_PATH,
+    GRACE_PERIOD_SECONDS,
+)
+from applimiter.utils import file_version
+
 # get a logger
 logger = logging.getLogger(__name__)
 
 
+class DesktopSessionCache:
+    """
+    Caches the desktop users found by get_desktop_users_with_display_info.
+    Users are only looked up again when the login records in utmp change, or
+    when the cached result is older than SESSION_CACHE_MAX_AGE_SECONDS.
+    """
+
+    def __init__(self, discover=None, clock=None, max_age=SESSION_CACHE_MAX_AGE_SECONDS):
+        """
+        :param discover: returns the current desktop users, defaults to get_desktop_users_with_display_info
+        :param clock: the clock used to age the cache, defaults to the system clock
+        :param max_age: the number of seconds a cached result stays valid
+        """
+        self.discover = discover or get_desktop_users_with_display_info
+        self.clock = clock or SYSTEM_CLOCK
+        self.max_age = max_age
+        self._users = None
+        self._utmp_version = None
+        self._refreshed_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def get_users(self):
+        """
+        :return: the list of desktop user info dicts
+        """
+        utmp_version = _utmp_version()
+        now_ts = self.clock.time()
+        if (
+            self._users is not None
+            and utmp_version == self._utmp_version
+            and 0 <= now_ts - self._refreshed_at < self.max_age
+        ):
+            self.hits += 1
+            return self._users
+        self.misses += 1
+        self._users = self.discover()
+        self._utmp_version = utmp_version
+        self._refreshed_at = now_ts
+        return self._users
+
+    def to_snapshot(self):
+        """
+        :return: the cache as a JSON-serializable dict, or None if it is empty
+        """
+        if self._users is None:
+            return None
+        return {
+            "users": self._users,
+            "utmp_version": self._utmp_version,
+            "refreshed_at": self._refreshed_at,
+        }
+
+    def restore(self, snapshot):
+        """
+        Fill the cache from a dict returned by to_snapshot.
+        :param snapshot: the snapshot dict
+        :return: None
+        """
+        self._users = snapshot["users"]
+        self._utmp_version = snapshot["utmp_version"]
+        self._refreshed_at = snapshot["refreshed_at"]
+
+
+# zenity dialog types, least severe first, a combined dialog takes the most severe one
+_DIALOG_SEVERITY = ["--info", "--warning", "--error"]
+
+
+class NotificationAggregator:
+    """
+    Collects the notifications of a cycle, and sends every desktop session one dialog for all of them.
+    A message repeated in the same dialog is shown once, and a session gets at most one dialog
+    every min_interval_seconds: what comes in sooner is held and merged into its next dialog.
+    """
+
+    def __init__(self, send_notification=None):
+        """
+        :param send_notification: sends one dialog to one desktop user, defaults to send_desktop_notification_zenity
+        """
+        self.send_notification = send_notification or send_desktop_notification_zenity
+        # session key -> (user info, {(title, message): dialog type}), in the order they came in
+        self._queued = {}
+        # session key -> the timestamp of its last dialog
+        self._last_sent = {}
+        self.notifications_added = 0
+        self.dialogs_sent = 0
+
+    def add(self, user_info, title, message, dialog_type="--info"):
+        """
+        Queue a notification for a desktop session.
+        :param user_info: the desktop user dict
+        :param title: the title of the notification
+        :param message: the text of the notification
+        :param dialog_type: the zenity dialog type
+        :return: None
+        """
+        self.notifications_added += 1
+        key = (user_info.get("username"), user_info.get("display"))
+        _, messages = self._queued.setdefault(key, (user_info, {}))
+        previous_type = messages.get((title, message), dialog_type)
+        messages[(title, message)] = max(previous_type, dialog_type, key=_dialog_severity)
+
+    def flush(self, now_ts, min_interval_seconds=NOTIFICATION_MIN_INTERVAL_SECONDS):
+        """
+        Send the queued notifications of every session that is not rate limited.
+        :param now_ts: the unix timestamp of this cycle
+        :param min_interval_seconds: the least time between two dialogs of a session
+        :return: the number of dialogs sent
+        """
+        dialogs_sent = 0
+        for key, (user_info, messages) in list(self._queued.items()):
+            last_sent = self._last_sent.get(key)
+            # a clock set back must not hold notifications for good
+            if last_sent is not None and last_sent <= now_ts < last_sent + min_interval_seconds:
+                continue
+            del self._queued[key]
+            self._last_sent[key] = now_ts
+            dialog_type = max(messages.values(), key=_dialog_severity)
+            if len(messages) == 1:
+                ((title, message),) = messages
+            else:
+                title = f"AppLimiter: {len(messages)} notifications"
+                message = "\n\n".join(f"{title}\n{message}" for title, message in messages)
+            self.send_notification(title, message, user_info, dialog_type=dialog_type)
+            dialogs_sent += 1
+        self.dialogs_sent += dialogs_sent
+        return dialogs_sent
+
+
+class CountdownDialogs:
+    """
+    Shows a live countdown during the grace period: one long-lived `zenity --progress` per
+    desktop session and app, started at the breach and updated through its stdin until the app
+    is closed, instead of a new dialog for every remaining time.
+    The pipes are non-blocking, a dialog that is slow to read skips an update, and one that
+    was closed by the user is not started again for the same breach.
+    """
+
+    def __init__(self, spawn=None):
+        """
+        :param spawn: starts the dialog of one app for one desktop user, returns a Popen or None,
+            defaults to spawn_countdown_zenity
+        """
+        self.spawn = spawn or spawn_countdown_zenity
+        # key -> [process or None, app name, deadline timestamp]
+        self._dialogs = {}
+        # the keys shown in the current cycle, the others are closed at its end
+        self._seen = set()
+        # processes told to close, reaped once they exit
+        self._closing = []
+
+    @property
+    def active(self):
+        """
+        :return: True if some countdown dialog is open
+        """
+        return any(dialog[0] is not None for dialog in self._dialogs.values())
+
+    def show(self, key, user_info, app_name, deadline_ts, now_ts):
+        """
+        Start or update the countdown dialog of an app for one desktop session.
+        :param key: identifies the dialog, e.g. (uid, app name, username, display)
+        :param user_info: the desktop user dict
+        :param app_name: the name of the app that will be closed
+        :param deadline_ts: the unix timestamp the app will be closed at
+        :param now_ts: the unix timestamp of this cycle
+        :return: None
+        """
+        self._seen.add(key)
+        dialog = self._dialogs.get(key)
+        if dialog is None:
+            dialog = self._dialogs[key] = [self.spawn(user_info, app_name), app_name, deadline_ts]
+        dialog[2] = deadline_ts
+        self._update(dialog, now_ts)
+
+    def tick(self, now_ts):
+        """
+        Update the remaining time of every open dialog, and reap the closed ones.
+        :param now_ts: the current unix timestamp
+        :return: None
+        """
+        for dialog in self._dialogs.values():
+            self._update(dialog, now_ts)
+        self._reap()
+
+    def close_unseen(self):
+        """
+        Close the dialogs not shown in this cycle: their app was closed, stopped or allowed again.
+        :return: None
+        """
+        for key in list(self._dialogs):
+            if key not in self._seen:
+                self._close(self._dialogs.pop(key)[0])
+        self._seen.clear()
+        self._reap()
+
+    def close_all(self, timeout=1):
+        """
+        Close every dialog, waiting a little for them to exit.
+        :param timeout: how long to wait for each dialog, in seconds
+        :return: None
+        """
+        for dialog in self._dialogs.values():
+            self._close(dialog[0])
+        self._dialogs.clear()
+        self._seen.clear()
+        for process in self._closing:
+            try:
+                process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        self._closing = []
+
+    def _update(self, dialog, now_ts):
+        """
+        Write the remaining time and progress to a dialog.
+        :param dialog: the [process, app name, deadline timestamp] of the dialog
+        :param now_ts: the current unix timestamp
+        :return: None
+        """
+        process, app_name, deadline_ts = dialog
+        if process is None:
+            return
+        remaining = max(int(deadline_ts - now_ts), 0)
+        # 100 closes the dialog, it stays at 99 until the app is closed
+        percentage = min(max(100 * (GRACE_PERIOD_SECONDS - remaining) // GRACE_PERIOD_SECONDS, 0), 99)
+        text = f"#'{app_name}' will close in {remaining // 60}:{remaining % 60:02d}.\n{percentage}\n"
+        if not self._write(process, text):
+            dialog[0] = None
+            self._closing.append(process)
+
+    def _close(self, process):
+        """
+        Let a dialog finish on its own, --auto-close exits at 100%.
+        :param process: the Popen of the dialog, or None
+        :return: None
+        """
+        if process is None:
+            return
+        self._write(process, "100\n")
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        self._closing.append(process)
+
+    @staticmethod
+    def _write(process, text):
+        """
+        Write to the stdin of a dialog without blocking.
+        :param process: the Popen of the dialog
+        :param text: the lines to write
+        :return: False if the dialog is gone, True otherwise
+        """
+        try:
+            os.write(process.stdin.fileno(), text.encode())
+        except BlockingIOError:
+            # zenity is not reading, the next update carries the time anyway
+            pass
+        except (BrokenPipeError, ValueError):
+            # closed by the user, or its stdin already closed
+            return False
+        except OSError as e:
+            logger.warning(f"Cannot update countdown dialog {process.pid}: {e}")
+            return False
+        return True
+
+    def _reap(self):
+        """
+        Forget the dialogs that exited, no zombies left behind.
+        :return: None
+        """
+        self._closing = [process for process in self._closing if process.poll() is None]
+
+
+def spawn_countdown_zenity(user_info, app_name):
+    """
+    Start the countdown dialog of an app in a user's desktop session.
+    :param user_info: the desktop user dict
+    :param app_name: the name of the app that will be closed
+    :return: the subprocess.Popen of the dialog, its stdin non-blocking, or None on failure
+    """
+    username = user_info.get("username")
+    if not username or not user_info.get("display"):
+        return None
+    command = [
+        "zenity",
+        "--progress",
+        "--title",
+        f"{app_name}: Closing",
+        "--text",
+        f"'{app_name}' will close in {GRACE_PERIOD_SECONDS // 60}:00.",
+        "--percentage=0",
+        "--auto-close",
+        "--no-cancel",
+        "--no-markup",
+    ]
+    try:
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=_session_environment(user_info),
+            **_spawn_credentials(username),
+        )
+    except KeyError:
+        logger.warning(f"User {username} not found in password database, cannot show a countdown.")
+        return None
+    except FileNotFoundError:
+        logger.error("'zenity' command not found, cannot show a countdown.")
+        return None
+    except OSError as e:
+        logger.error(f"Cannot start countdown dialog for {username}: {e}")
+        return None
+    # the daemon loop never waits for a dialog to read
+    os.set_blocking(process.stdin.fileno(), False)
+    logger.info(f"Started countdown dialog {process.pid} of {app_name} for user {username}.")
+    return process
+
+
+def _dialog_severity(dialog_type):
+    """
+    :param dialog_type: a zenity dialog type
+    :return: its rank in _DIALOG_SEVERITY, unknown types rank as info
+    """
+    return _DIALOG_SEVERITY.index(dialog_type) if dialog_type in _DIALOG_SEVERITY else 0
+
+
+def _utmp_version():
+    """
+    :return: the file_version of utmp as a list, so it compares equal after a JSON round trip
+    """
+    version = file_version(UTMP_PATH)
+    return list(version) if version is not None else None
+
+
 def get_desktop_users_with_display_info():
     """
     Find all active desktop users and their display information
@@ -186,7 +534,6 @@ def send_desktop_notification_zenity(title, message, user_info, dialog_type="--i
     """
     username = user_info.get("username")
     display = user_info.get("display")
-    xauthority = user_info.get("xauthority")
 
     if not username or not display:
         logger.warning(
@@ -207,36 +554,19 @@ def send_desktop_notification_zenity(title, message, user_info, dialog_type="--i
         "--timeout=10",  # Dialog auto-closes after 10 seconds
     ]
 
-    # Set up the environment for the user's display
-    env = os.environ.copy()
-    env["DISPLAY"] = display
-    if xauthority and os.path.exists(xauthority):
-        env["XAUTHORITY"] = xauthority
-        logger.debug(f"Using XAUTHORITY for Zenity: {xauthority}")
-    else:
-        # If no Xauthority file was found, still try; DISPLAY might be enough on some systems.
-        logger.debug(
-            f"No XAUTHORITY file found or used (checked path: {xauthority}). Relying on DISPLAY."
-        )
-
     try:
-        # If running as root, use sudo to run the command as the target user
-        if os.geteuid() == 0:
-            full_command = ["sudo", "-u", username] + command
-        else:
-            full_command = command
-
-        logger.debug(f"Executing Zenity command: {' '.join(full_command)}")
+        env = _session_environment(user_info)
         logger.debug(
-            f"Zenity environment: DISPLAY={env.get('DISPLAY')}, XAUTHORITY={env.get('XAUTHORITY')}"
+            f"Executing Zenity command as {username}: {' '.join(command)}, "
+            f"DISPLAY={env.get('DISPLAY')}, XAUTHORITY={env.get('XAUTHORITY')}"
         )
-
         result = subprocess.run(
-            full_command,
+            command,
             env=env,
             capture_output=True,
             text=True,
             timeout=15,  # Command execution timeout
+            **_spawn_credentials(username),
         )
 
         # Zenity return codes can vary. 0, 1, or 5 often indicate the dialog was shown.
@@ -257,6 +587,8 @@ def send_desktop_notification_zenity(title, message, user_info, dialog_type="--i
         logger.warning(
             f"Zenity command timed out for user {username}. The dialog might have been displayed."
         )
+    except KeyError:
+        logger.warning(f"User {username} not found in password database, cannot notify.")
     except FileNotFoundError:
         logger.error(
             "'zenity' command not found. Please ensure it is installed (e.g., 'sudo apt install zenity')."
@@ -265,3 +597,78 @@ def send_desktop_notification_zenity(title, message, user_info, dialog_type="--i
         logger.error(
             f"An unexpected error occurred while sending notification to {username}: {e}"
         )
+
+
+# username -> (utmp version, (uid, gid, supplementary group ids)), looked up again after a login
+_credentials_cache = {}
+# (username, display, xauthority) -> the part of the environment that doesn't depend on files
+_environment_cache = {}
+
+
+def _user_credentials(username):
+    """
+    :param username: the name of a user
+    :return: (uid, gid, supplementary group ids) of the user
+    :raise KeyError: if the user does not exist
+    """
+    # new groups only apply to a user's new sessions, which change utmp
+    utmp_version = _utmp_version()
+    cached = _credentials_cache.get(username)
+    if cached is not None and cached[0] == utmp_version:
+        return cached[1]
+    pwnam = pwd.getpwnam(username)
+    groups = os.getgrouplist(username, pwnam.pw_gid)
+    credentials = (pwnam.pw_uid, pwnam.pw_gid, groups)
+    _credentials_cache[username] = (utmp_version, credentials)
+    return credentials
+
+
+def _spawn_credentials(username):
+    """
+    As root, a child drops to the user itself, with no sudo and PAM session in between.
+    :param username: the name of a user
+    :return: the user, group and extra_groups arguments of subprocess, empty if not root
+    :raise KeyError: if the user does not exist
+    """
+    if os.geteuid() != 0:
+        return {}
+    uid, gid, groups = _user_credentials(username)
+    return {"user": uid, "group": gid, "extra_groups": groups}
+
+
+def _session_environment(user_info):
+    """
+    Build the environment of a program shown in a user's desktop session, only what
+    it needs, instead of a copy of the daemon's environment.
+    The session's files are checked every time, a new session may not have created them yet.
+    :param user_info: the desktop user dict
+    :return: a new environment dict
+    """
+    username = user_info.get("username")
+    display = user_info.get("display")
+    xauthority = user_info.get("xauthority")
+    key = (username, display, xauthority)
+    base_env = _environment_cache.get(key)
+    if base_env is None:
+        base_env = _environment_cache[key] = {
+            "PATH": SESSION_PATH,
+            "HOME": user_info.get("home") or "/",
+            "USER": username,
+            "LOGNAME": username,
+            "DISPLAY": display,
+        }
+
+    env = dict(base_env)
+    if xauthority and os.path.exists(xauthority):
+        env["XAUTHORITY"] = xauthority
+    else:
+        # If no Xauthority file was found, still try; DISPLAY might be enough on some systems.
+        logger.debug(
+            f"No XAUTHORITY file found or used (checked path: {xauthority}). Relying on DISPLAY."
+        )
+    runtime_dir = f"/run/user/{user_info.get('uid')}"
+    if os.path.isdir(runtime_dir):
+        env["XDG_RUNTIME_DIR"] = runtime_dir
+        if os.path.exists(f"{runtime_dir}/bus"):
+            env["DBUS_SESSION_BUS_ADDRESS"] = f"unix:path={runtime_dir}/bus"
+    return env
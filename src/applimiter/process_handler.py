@@ -4,7 +4,10 @@
 Store functions to to handle processes
 """
 
+import os
 import logging
+from collections import namedtuple
+
 import psutil
 
 from applimiter.constants import PROCESS_TERMINATING_PATIENCE
@@ -12,35 +15,346 @@ from applimiter.constants import PROCESS_TERMINATING_PATIENCE
 logger = logging.getLogger(__name__)
 
 
-def get_process_pids(keywords):
+# a lowercase snapshot of one process, as used for keyword matching,
+# create_time is the unix timestamp the process started at, ppid the pid of its parent
+# and uid the effective user id it runs as, all None if unknown
+ProcessInfo = namedtuple(
+    "ProcessInfo",
+    ["pid", "name", "cmdline", "create_time", "ppid", "uid"],
+    defaults=[None, None, None],
+)
+
+# never attach these to an app: init, kthreadd and the daemon itself
+_UNTOUCHABLE_PIDS = frozenset({1, 2, os.getpid()})
+
+
+def scan_process_table():
     """
-    Based on the keywords provided, return a list of process pids that match the keywords.
+    Read the process table once, so that all apps can be matched against the same snapshot.
 
-    :param keywords: the keywords used to determine the pids
-    :return: a list of pids
+    :return: a list of ProcessInfo with lowercase name and cmdline
     """
-    pids = set()
-    for process in psutil.process_iter(attrs=["pid", "name", "cmdline"]):
+    process_table = []
+    for process in psutil.process_iter(
+        attrs=["pid", "name", "cmdline", "create_time", "ppid", "uids"]
+    ):
         try:
             # get info
             info = process.info
             # get name
-            name = info.get("name", "")
-            name = name.lower()
+            name = info.get("name") or ""
             # get cmdline
             cmdline = info.get("cmdline")
             cmdline_str = " ".join(cmdline) if cmdline else ""
-            cmdline_str = cmdline_str.lower()
-            # match keywords
-            for keyword in keywords:
-                keyword = keyword.lower()
-                if keyword in cmdline_str or keyword in name:
-                    pids.add(process.pid)
-                    break
+            uids = info.get("uids")
+            process_table.append(
+                ProcessInfo(
+                    process.pid,
+                    name.lower(),
+                    cmdline_str.lower(),
+                    info.get("create_time"),
+                    info.get("ppid"),
+                    uids.effective if uids else None,
+                )
+            )
         except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
             # ignore processes already terminated or not accessible
             pass
-    return list(pids)
+    return process_table
+
+
+class ProcessTableCache:
+    """
+    Scans the process table like scan_process_table, but only reads the name and
+    cmdline of processes it has not seen in the previous scan.
+    A process is identified by its pid and start time, read from /proc/<pid>/stat,
+    so a reused pid is never mistaken for the process that had it before. exec()
+    keeps both, so a changed command name in stat is a miss too: a shell wrapper that
+    exec's the real binary is then seen under the binary's name.
+    The uid is read along with the name, a process that changes its uid without
+    exec'ing keeps the one it had when first seen.
+    """
+
+    def __init__(self, proc_path="/proc"):
+        """
+        :param proc_path: the mount point of procfs
+        """
+        self.proc_path = proc_path
+        # pid -> (start time in clock ticks since boot, ProcessInfo)
+        self._entries = {}
+        self._boot_time = None
+        self.hits = 0
+        self.misses = 0
+
+    def scan(self):
+        """
+        Read the start time of every process, and the name and cmdline of new ones.
+        :return: a list of ProcessInfo with lowercase name and cmdline
+        """
+        return self._scan(verify_known=True)
+
+    def scan_new(self):
+        """
+        Like scan, but trust that a pid seen in the previous scan is still the same process.
+        Only the /proc directory listing is read, plus the files of new pids, so this is
+        cheap enough to run every second between full scans. A pid reused within one
+        interval, or a process reparented since, goes unnoticed until the next full scan.
+        :return: a list of ProcessInfo with lowercase name and cmdline
+        """
+        return self._scan(verify_known=False)
+
+    def _scan(self, verify_known):
+        try:
+            proc_entries = os.listdir(self.proc_path)
+        except OSError:
+            # not a linux /proc, nothing to cache against
+            return scan_process_table()
+
+        entries = {}
+        for proc_entry in proc_entries:
+            if not proc_entry.isdigit():
+                continue
+            pid = int(proc_entry)
+            cached = self._entries.get(pid)
+            if cached is not None and not verify_known:
+                entries[pid] = cached
+                self.hits += 1
+                continue
+            stat = self._read_stat(pid)
+            if stat is None:
+                continue
+            comm, start_time, ppid = stat
+            if (
+                cached is not None
+                and cached[0] == start_time
+                and _same_command_name(cached[1].name, comm)
+            ):
+                # a process is reparented when its parent exits
+                if cached[1].ppid != ppid:
+                    cached = (start_time, cached[1]._replace(ppid=ppid))
+                entries[pid] = cached
+                self.hits += 1
+                continue
+            self.misses += 1
+            process_info = self._read_process_info(pid, comm, start_time, ppid)
+            if process_info is not None:
+                entries[pid] = (start_time, process_info)
+        self._entries = entries
+        return [process_info for _, process_info in entries.values()]
+
+    def _read_stat(self, pid):
+        """
+        :param pid: the process id
+        :return: (command name, start time in clock ticks, ppid) from /proc/<pid>/stat, or None if gone
+        """
+        try:
+            with open(f"{self.proc_path}/{pid}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            return None
+        # the command name in parentheses may contain spaces, the fields after it don't
+        comm_end = stat.rfind(b")")
+        fields = stat[comm_end + 2 :].split()
+        try:
+            start_time = int(fields[19])
+            ppid = int(fields[1])
+        except (IndexError, ValueError):
+            return None
+        comm = stat[stat.find(b"(") + 1 : comm_end].decode("utf-8", "replace")
+        return comm, start_time, ppid
+
+    def _read_process_info(self, pid, comm, start_time, ppid):
+        """
+        :param pid: the process id
+        :param comm: the command name from /proc/<pid>/stat
+        :param start_time: the start time from /proc/<pid>/stat
+        :param ppid: the parent pid from /proc/<pid>/stat
+        :return: a ProcessInfo named like psutil names it, or None if it cannot be read
+        """
+        try:
+            with open(f"{self.proc_path}/{pid}/cmdline", "rb") as f:
+                cmdline = f.read().decode("utf-8", "replace")
+            # /proc/<pid> is owned by the effective uid of the process
+            uid = os.stat(f"{self.proc_path}/{pid}").st_uid
+        except OSError:
+            return None
+        if cmdline.endswith("\0"):
+            cmdline = cmdline[:-1]
+        arguments = cmdline.split("\0")
+        name = comm
+        # the kernel truncates the command name to 15 characters, psutil then uses argv[0]
+        if len(comm) >= 15 and arguments[0]:
+            extended_name = os.path.basename(arguments[0])
+            if extended_name.startswith(comm):
+                name = extended_name
+        return ProcessInfo(
+            pid,
+            name.lower(),
+            " ".join(arguments).lower(),
+            self._get_boot_time() + start_time / _CLOCK_TICKS_PER_SECOND,
+            ppid,
+            uid,
+        )
+
+    def _get_boot_time(self):
+        """
+        :return: the unix timestamp of the boot, from the btime line of /proc/stat
+        """
+        if self._boot_time is None:
+            try:
+                with open(f"{self.proc_path}/stat", "rb") as f:
+                    for line in f:
+                        if line.startswith(b"btime "):
+                            self._boot_time = float(line.split()[1])
+                            break
+            except OSError:
+                pass
+            if self._boot_time is None:
+                self._boot_time = psutil.boot_time()
+        return self._boot_time
+
+    def to_snapshot(self):
+        """
+        :return: the cache as a JSON-serializable list
+        """
+        return [
+            [pid, start_time, *process_info[1:]]
+            for pid, (start_time, process_info) in self._entries.items()
+        ]
+
+    def restore(self, snapshot):
+        """
+        Fill the cache from a list returned by to_snapshot.
+        :param snapshot: the snapshot list
+        :return: None
+        """
+        self._entries = {
+            pid: (start_time, ProcessInfo(pid, *fields))
+            for pid, start_time, *fields in snapshot
+        }
+
+
+_CLOCK_TICKS_PER_SECOND = os.sysconf("SC_CLK_TCK")
+
+
+def _same_command_name(name, comm):
+    """
+    :param name: the lowercase name of a cached ProcessInfo
+    :param comm: the command name read from /proc/<pid>/stat
+    :return: True if the name was built from this command name, False if the process exec'd since
+    """
+    comm = comm.lower()
+    # a truncated command name was extended from argv[0]
+    return name == comm or (len(comm) >= 15 and name.startswith(comm))
+
+
+def match_process_table(process_table, keywords):
+    """
+    Return the pids in a process table snapshot that match the keywords.
+
+    :param process_table: a list of ProcessInfo returned by scan_process_table
+    :param keywords: the keywords used to determine the pids
+    :return: a list of pids
+    """
+    keywords = [keyword.lower() for keyword in keywords]
+    pids = []
+    if not keywords:
+        return pids
+    # plain loops, this runs once per app for every process in the table
+    for process in process_table:
+        for keyword in keywords:
+            if keyword in process.cmdline or keyword in process.name:
+                pids.append(process.pid)
+                break
+    return pids
+
+
+def build_children_index(process_table):
+    """
+    Index a process table snapshot by parent, once per cycle.
+
+    :param process_table: a list of ProcessInfo
+    :return: a dict of ppid -> list of child pids
+    """
+    children_by_ppid = {}
+    for process in process_table:
+        if process.ppid is not None:
+            children_by_ppid.setdefault(process.ppid, []).append(process.pid)
+    return children_by_ppid
+
+
+def collect_process_subtrees(root_pids, children_by_ppid):
+    """
+    Return the given processes and all their descendants, walking only their subtrees.
+
+    :param root_pids: the pids of the matched processes
+    :param children_by_ppid: the index returned by build_children_index
+    :return: a list of pids, every child before its parent so they can be terminated leaves first
+    """
+    ordered_pids = []
+    seen = set(_UNTOUCHABLE_PIDS)
+    for root_pid in root_pids:
+        # iterative post-order walk, a deep tree must not hit the recursion limit
+        stack = [(root_pid, False)]
+        while stack:
+            pid, children_done = stack.pop()
+            if children_done:
+                ordered_pids.append(pid)
+                continue
+            if pid in seen:
+                continue
+            seen.add(pid)
+            stack.append((pid, True))
+            for child_pid in children_by_ppid.get(pid, ()):
+                if child_pid not in seen:
+                    stack.append((child_pid, False))
+    return ordered_pids
+
+
+def get_process_pids(keywords):
+    """
+    Based on the keywords provided, return a list of process pids that match the keywords.
+
+    :param keywords: the keywords used to determine the pids
+    :return: a list of pids
+    """
+    return match_process_table(scan_process_table(), keywords)
+
+
+def terminate_processes(pids, app_name):
+    """
+    Terminate processes in one batch: SIGTERM to all of them in the given order,
+    a single wait for all of them, and SIGKILL for those still alive after it.
+
+    :param pids: the process ids, children before parents
+    :param app_name: the app name
+    :return: None
+    """
+    processes = []
+    for pid in pids:
+        try:
+            process = psutil.Process(pid)
+            process.terminate()
+            processes.append(process)
+        except psutil.NoSuchProcess:
+            logger.info(f"Process {pid} no longer exists.")
+        except psutil.AccessDenied:
+            logger.warning(f"Process {pid} is not accessible.")
+    if not processes:
+        return
+    logger.info(f"Terminating {len(processes)} processes for app {app_name}.")
+
+    _, alive = psutil.wait_procs(processes, timeout=PROCESS_TERMINATING_PATIENCE)
+    for process in alive:
+        logger.warning(
+            f"Process {process.pid} did not terminate within {PROCESS_TERMINATING_PATIENCE} seconds, forcing killing."
+        )
+        try:
+            process.kill()
+        except psutil.NoSuchProcess:
+            pass
+        except psutil.AccessDenied:
+            logger.warning(f"Process {process.pid} is not accessible.")
 
 
 def terminate_process(pid, app_name):
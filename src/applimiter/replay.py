@@ -0,0 +1,231 @@
+# AppLimiter/src/applimiter/replay.py
+
+"""
+Record the daemon's inputs into a trace file and replay them offline.
+
+A trace is a gzip-compressed JSON-lines file. The first line is a header with the
+check interval, the config and the usage data at the start of the recording.
+Every following line is one daemon cycle:
+
+    {"t": <unix time>, "m": <monotonic time>, "b": <boot time>,
+     "add": [[pid, name, cmdline, create_time, ppid, uid], ...],
+     "del": [pid, ...], "users": [...], "config": {...}}
+
+The monotonic and boot times let a replay tell time spent suspended from time awake,
+like the daemon does. Traces recorded by older versions have shorter entries and
+frames, the missing fields are None.
+Process tables are delta-encoded against the previous cycle, and "users" and
+"config" are only present when they changed, so a whole day stays small.
+"""
+
+import copy
+import gzip
+import json
+import logging
+import time
+from collections import namedtuple
+
+from applimiter.clock import VirtualClock
+from applimiter.constants import DAEMON_CHECK_INTERVAL_SECONDS
+from applimiter.daemon import AppLimiterDaemon
+from applimiter.process_handler import ProcessInfo
+
+logger = logging.getLogger(__name__)
+
+TRACE_FORMAT_NAME = "applimiter-trace"
+TRACE_FORMAT_VERSION = 1
+
+# the full inputs of one recorded cycle, monotonic and boottime are None in old traces
+TraceFrame = namedtuple(
+    "TraceFrame",
+    ["timestamp", "process_table", "desktop_users", "config", "monotonic", "boottime"],
+)
+
+
+class TraceRecorder:
+    """
+    Writes one trace frame per daemon cycle.
+    """
+
+    def __init__(self, pathname, check_interval):
+        """
+        :param pathname: the trace file to write
+        :param check_interval: the daemon check interval in seconds
+        """
+        self.pathname = pathname
+        self.check_interval = check_interval
+        self._file = gzip.open(pathname, "wt", encoding="utf-8")
+        self._header_written = False
+        self._previous_table = {}
+        self._previous_users = None
+        self._previous_config = None
+
+    def record(
+        self, now, process_table, desktop_users, config, usage_data, monotonic=None, boottime=None
+    ):
+        """
+        Append one cycle to the trace.
+        :param now: the datetime of the cycle
+        :param process_table: the list of ProcessInfo scanned in the cycle
+        :param desktop_users: the desktop users found in the cycle
+        :param config: the config used in the cycle
+        :param usage_data: the usage data before the cycle, only written to the header
+        :param monotonic: the monotonic time of the cycle
+        :param boottime: the boot time of the cycle, it also counts the time spent suspended
+        :return: None
+        """
+        if not self._header_written:
+            self._write_line(
+                {
+                    "format": TRACE_FORMAT_NAME,
+                    "version": TRACE_FORMAT_VERSION,
+                    "check_interval": self.check_interval,
+                    "config": config,
+                    "usage_data": usage_data,
+                }
+            )
+            self._header_written = True
+            self._previous_config = copy.deepcopy(config)
+
+        current_table = {process.pid: process for process in process_table}
+        frame = {
+            "t": now.timestamp(),
+            "m": monotonic,
+            "b": boottime,
+            "add": [
+                list(process)
+                for pid, process in current_table.items()
+                if self._previous_table.get(pid) != process
+            ],
+            "del": [pid for pid in self._previous_table if pid not in current_table],
+        }
+        if desktop_users != self._previous_users:
+            frame["users"] = desktop_users
+            self._previous_users = copy.deepcopy(desktop_users)
+        if config != self._previous_config:
+            frame["config"] = config
+            self._previous_config = copy.deepcopy(config)
+        self._previous_table = current_table
+        self._write_line(frame)
+
+    def close(self):
+        """
+        Flush and close the trace file.
+        :return: None
+        """
+        self._file.close()
+        logger.info(f"Trace saved to {self.pathname}")
+
+    def _write_line(self, data):
+        self._file.write(json.dumps(data, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+
+def read_trace(pathname):
+    """
+    Read a trace file and rebuild the full inputs of each cycle.
+    :param pathname: the trace file to read
+    :return: (header dict, generator of TraceFrame)
+    """
+    trace_file = gzip.open(pathname, "rt", encoding="utf-8")
+    header = json.loads(trace_file.readline())
+    if header.get("format") != TRACE_FORMAT_NAME:
+        trace_file.close()
+        raise ValueError(f"{pathname} is not an AppLimiter trace file.")
+
+    def frames():
+        process_table = {}
+        desktop_users = []
+        config = header.get("config", {})
+        with trace_file:
+            for line in trace_file:
+                frame = json.loads(line)
+                for pid in frame.get("del", []):
+                    process_table.pop(pid, None)
+                for entry in frame.get("add", []):
+                    process_table[entry[0]] = ProcessInfo(*entry)
+                desktop_users = frame.get("users", desktop_users)
+                config = frame.get("config", config)
+                yield TraceFrame(
+                    frame["t"],
+                    list(process_table.values()),
+                    desktop_users,
+                    config,
+                    frame.get("m"),
+                    frame.get("b"),
+                )
+
+    return header, frames()
+
+
+class ActionRecorder:
+    """
+    Stand-in for notifications and termination that records what the daemon did.
+    """
+
+    def __init__(self, clock):
+        """
+        :param clock: the clock used to timestamp the recorded actions
+        """
+        self.clock = clock
+        self.notifications = []
+        self.terminations = []
+
+    def send_notification(self, title, message, user_info, dialog_type="--info"):
+        self.notifications.append(
+            {
+                "t": self.clock.time(),
+                "user": user_info.get("username"),
+                "title": title,
+                "message": message,
+                "dialog_type": dialog_type,
+            }
+        )
+
+    def terminate(self, pid, app_name):
+        self.terminations.append({"t": self.clock.time(), "pid": pid, "app": app_name})
+
+
+def replay_trace(pathname, config=None, usage_data=None):
+    """
+    Replay a trace through the daemon accounting logic as fast as possible.
+    :param pathname: the trace file to replay
+    :param config: a config dict that overrides the recorded one, to compare changes on identical input
+    :param usage_data: a usage data dict that overrides the recorded starting usage
+    :return: a dict with the final usage data, notifications, terminations and timing
+    """
+    header, frames = read_trace(pathname)
+    clock = VirtualClock()
+    stand_in = ActionRecorder(clock)
+    app_limiter_daemon = AppLimiterDaemon(
+        header.get("check_interval", DAEMON_CHECK_INTERVAL_SECONDS),
+        send_notification=stand_in.send_notification,
+        terminate=stand_in.terminate,
+        clock=clock,
+    )
+    usage_data_all_apps = copy.deepcopy(
+        usage_data if usage_data is not None else header.get("usage_data", {})
+    )
+
+    cycles = 0
+    started = time.perf_counter()
+    for frame in frames:
+        # suspended time is only left out of the accounting if the trace recorded it
+        clock.set_time(frame.timestamp, frame.monotonic, frame.boottime)
+        app_limiter_daemon.process_cycle(
+            config if config is not None else frame.config,
+            usage_data_all_apps,
+            clock.now(),
+            frame.process_table,
+            frame.desktop_users,
+        )
+        cycles += 1
+    elapsed = time.perf_counter() - started
+
+    return {
+        "cycles": cycles,
+        "elapsed_seconds": elapsed,
+        "usage_data": usage_data_all_apps,
+        "notifications": stand_in.notifications,
+        "terminations": stand_in.terminations,
+    }
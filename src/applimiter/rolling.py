@@ -0,0 +1,178 @@
+# AppLimiter/src/applimiter/rolling.py
+
+"""
+Track usage over rolling windows, e.g. "at most 90 minutes in any 24 hours".
+
+The usage of the last ROLLING_WINDOW_MAX_MINUTES minutes is kept per minute in the
+app's usage data, only for the minutes the app was used in, so an idle app costs a
+few bytes of the usage file instead of a full day of zeros:
+
+    {"head_minute": <unix time // 60 of the newest minute>,
+     "minutes": {"<unix time // 60>": seconds, ...},
+     "window_sums": {"<window minutes>": seconds, ...}}
+
+The sum of every configured window is kept up to date incrementally: moving the
+head one minute forward subtracts the bucket that leaves each window, and crediting
+seconds adds them to every window that covers their minute, so a cycle costs
+O(number of windows) however long the windows are.
+"""
+
+import logging
+
+from applimiter.constants import ROLLING_WINDOW_MAX_MINUTES
+
+logger = logging.getLogger(__name__)
+
+
+class RollingUsage:
+    """
+    A view of the rolling usage state of one app, modified in place.
+    """
+
+    def __init__(self, state, window_minutes):
+        """
+        :param state: the rolling usage dict kept in the app's usage data, filled if empty
+        :param window_minutes: the window lengths in minutes to keep sums for, at most ROLLING_WINDOW_MAX_MINUTES
+        """
+        self.state = state
+        if "minutes" not in state:
+            state["minutes"] = _sparse_minutes(state.get("head_minute"), state.pop("buckets", None))
+            if not state["minutes"]:
+                state["head_minute"] = None
+                state["window_sums"] = {}
+        self.window_minutes = sorted(set(window_minutes))
+        window_sums = state.setdefault("window_sums", {})
+        # the sums of windows no longer configured would go stale, forget them
+        for key in list(window_sums):
+            if int(key) not in self.window_minutes:
+                del window_sums[key]
+        # a newly configured window is summed once, then kept up to date
+        for window in self.window_minutes:
+            if str(window) not in window_sums:
+                window_sums[str(window)] = self._sum_buckets(window)
+
+    def advance(self, now_ts):
+        """
+        Move the newest bucket to the minute of now_ts, dropping the minutes that left each window.
+        :param now_ts: the unix timestamp of this cycle
+        :return: None
+        """
+        minute = int(now_ts // 60)
+        head_minute = self.state["head_minute"]
+        if head_minute is None or minute - head_minute >= ROLLING_WINDOW_MAX_MINUTES:
+            # first use, or nothing in the buffer is recent enough to count
+            self.state["head_minute"] = minute
+            self.state["minutes"] = {}
+            self.state["window_sums"] = {str(window): 0 for window in self.window_minutes}
+            return
+        minutes = self.state["minutes"]
+        window_sums = self.state["window_sums"]
+        for new_minute in range(head_minute + 1, minute + 1):
+            for window in self.window_minutes:
+                window_sums[str(window)] -= minutes.get(str(new_minute - window), 0)
+            # the minute that left the longest window is forgotten
+            minutes.pop(str(new_minute - ROLLING_WINDOW_MAX_MINUTES), None)
+        if minute > head_minute:
+            self.state["head_minute"] = minute
+            # float subtraction may leave dust below zero
+            for key, seconds in window_sums.items():
+                window_sums[key] = max(round(seconds, 3), 0)
+
+    def add(self, now_ts, seconds):
+        """
+        Credit the seconds that ended at now_ts, spread over the minutes they span.
+        :param now_ts: the unix timestamp of this cycle, advance() must have been called with it
+        :param seconds: the seconds to credit
+        :return: None
+        """
+        minutes = self.state["minutes"]
+        window_sums = self.state["window_sums"]
+        head_minute = self.state["head_minute"]
+        # time older than the buffer is seen by no window
+        start_ts = max(now_ts - seconds, (head_minute - ROLLING_WINDOW_MAX_MINUTES + 1) * 60)
+        minute = int(start_ts // 60)
+        while start_ts < now_ts:
+            minute_end_ts = (minute + 1) * 60
+            part = min(now_ts, minute_end_ts) - start_ts
+            minutes[str(minute)] = round(minutes.get(str(minute), 0) + part, 3)
+            for window in self.window_minutes:
+                if minute > head_minute - window:
+                    window_sums[str(window)] = round(window_sums[str(window)] + part, 3)
+            start_ts = minute_end_ts
+            minute += 1
+
+    def window_seconds(self, window):
+        """
+        :param window: a configured window length in minutes
+        :return: the seconds used in the last `window` minutes
+        """
+        return self.state["window_sums"][str(window)]
+
+    def _sum_buckets(self, window):
+        """
+        :param window: a window length in minutes
+        :return: the seconds in the newest `window` minutes, summed from scratch
+        """
+        head_minute = self.state.get("head_minute")
+        if head_minute is None:
+            return 0
+        return round(
+            sum(
+                seconds
+                for minute, seconds in self.state["minutes"].items()
+                if head_minute - window < int(minute) <= head_minute
+            ),
+            3,
+        )
+
+
+def _sparse_minutes(head_minute, buckets):
+    """
+    Convert the dense ring buffer saved by older versions to the used minutes.
+    :param head_minute: the newest minute of the buffer
+    :param buckets: the list of ROLLING_WINDOW_MAX_MINUTES seconds indexed by minute modulo its length
+    :return: a dict of minute string -> seconds, empty if there is no valid buffer
+    """
+    if head_minute is None or not buckets or len(buckets) != ROLLING_WINDOW_MAX_MINUTES:
+        return {}
+    return {
+        str(head_minute - (head_minute - index) % ROLLING_WINDOW_MAX_MINUTES): seconds
+        for index, seconds in enumerate(buckets)
+        if seconds
+    }
+
+
+def parse_rolling_limits(app_config):
+    """
+    Read the rolling limits of an app or group.
+    A limit looks like {"window_minutes": 1440, "limit_minutes": 90}.
+    :param app_config: the config of the app or group
+    :return: a list of (window minutes, limit in seconds), invalid limits are logged and skipped
+    """
+    rolling_limits = []
+    for limit in app_config.get("rolling_limits", []):
+        try:
+            window = int(limit["window_minutes"])
+            limit_seconds = float(limit["limit_minutes"]) * 60
+        except (KeyError, TypeError, ValueError):
+            logger.error(f"Invalid rolling limit for {app_config.get('name')}: {limit}")
+            continue
+        if not 0 < window <= ROLLING_WINDOW_MAX_MINUTES:
+            logger.error(
+                f"Rolling window of {window} minutes for {app_config.get('name')} is not"
+                f" between 1 and {ROLLING_WINDOW_MAX_MINUTES} minutes."
+            )
+            continue
+        rolling_limits.append((window, limit_seconds))
+    return rolling_limits
+
+
+def format_window(window):
+    """
+    :param window: a window length in minutes
+    :return: a readable length, e.g. "24 hours" or "90 minutes"
+    """
+    if window % 60 == 0:
+        hours = window // 60
+        return f"{hours} hour{'s' if hours != 1 else ''}"
+    return f"{window} minute{'s' if window != 1 else ''}"
@@ -0,0 +1,228 @@
+# AppLimiter/src/applimiter/schedule.py
+
+"""
+Allowed-hours schedules, e.g. "only 16:00-20:00 on weekdays".
+
+An app's "schedule" config lists the hours it may run, in a timezone:
+
+    {"timezone": "Europe/Berlin",
+     "allowed": [{"days": "weekdays", "start": "16:00", "end": "20:00"},
+                 {"days": ["sat", "sun"], "start": "10:00", "end": "22:00"}]}
+
+The rules are compiled once into a sorted list of transition timestamps covering the
+next SCHEDULE_HORIZON_DAYS days: allowed from transitions[0] to transitions[1], from
+transitions[2] to transitions[3] and so on. Each wall-clock time is converted with
+zoneinfo on its own date, so the transitions stay right across DST changes. The state
+at any time, and the next change, is then a bisect away.
+"""
+
+import bisect
+import datetime
+import logging
+
+from applimiter.constants import SCHEDULE_HORIZON_DAYS
+
+logger = logging.getLogger(__name__)
+
+WEEKDAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+DAY_GROUPS = {
+    "daily": range(7),
+    "weekdays": range(5),
+    "weekends": range(5, 7),
+}
+
+
+class CompiledSchedule:
+    """
+    The allow/deny transitions of one schedule, recompiled when they run out.
+    """
+
+    def __init__(self, schedule_config):
+        """
+        :param schedule_config: the "schedule" dict of an app
+        :raise ValueError: if the schedule is invalid
+        """
+        self.timezone = _load_timezone(schedule_config.get("timezone"))
+        self.rules = [_parse_rule(rule) for rule in schedule_config.get("allowed", [])]
+        self.transitions = []
+        # the transitions are complete from transitions_start to valid_until
+        self.transitions_start = None
+        self.valid_until = None
+
+    def is_allowed(self, now_ts):
+        """
+        :param now_ts: a unix timestamp
+        :return: True if the app may run at that time
+        """
+        self._ensure_compiled(now_ts)
+        # an odd number of transitions before now_ts means inside an allowed interval
+        return bisect.bisect_right(self.transitions, now_ts) % 2 == 1
+
+    def next_transition(self, now_ts):
+        """
+        :param now_ts: a unix timestamp
+        :return: the timestamp of the next state change after now_ts, or None if there is none ahead
+        """
+        self._ensure_compiled(now_ts)
+        index = bisect.bisect_right(self.transitions, now_ts)
+        if index < len(self.transitions):
+            return self.transitions[index]
+        return None
+
+    def _ensure_compiled(self, now_ts):
+        """
+        Compile the transitions from the day before now_ts, if they don't reach a day past it.
+        """
+        if (
+            self.valid_until is not None
+            and self.transitions_start <= now_ts
+            and now_ts + 86400 < self.valid_until
+        ):
+            return
+        local_today = datetime.datetime.fromtimestamp(now_ts, self.timezone).date()
+        # yesterday's rules may reach past midnight
+        first_day = local_today - datetime.timedelta(days=1)
+        intervals = []
+        for day_offset in range(SCHEDULE_HORIZON_DAYS + 1):
+            day = first_day + datetime.timedelta(days=day_offset)
+            for weekdays, start_minute, end_minute in self.rules:
+                if day.weekday() not in weekdays:
+                    continue
+                intervals.append(
+                    (
+                        self._timestamp(day, start_minute),
+                        self._timestamp(day, end_minute),
+                    )
+                )
+        intervals.sort()
+
+        # merge touching and overlapping intervals into alternating transitions
+        transitions = []
+        for start_ts, end_ts in intervals:
+            if transitions and start_ts <= transitions[-1]:
+                transitions[-1] = max(transitions[-1], end_ts)
+            else:
+                transitions.extend([start_ts, end_ts])
+        self.transitions = transitions
+        self.transitions_start = self._timestamp(first_day, 0)
+        self.valid_until = self._timestamp(
+            first_day + datetime.timedelta(days=SCHEDULE_HORIZON_DAYS + 1), 0
+        )
+
+    def _timestamp(self, day, minute_of_day):
+        """
+        :param day: a local date
+        :param minute_of_day: minutes since local midnight, may exceed a day
+        :return: the unix timestamp of that local wall-clock time
+        """
+        day = day + datetime.timedelta(days=minute_of_day // 1440)
+        minute_of_day %= 1440
+        return datetime.datetime(
+            day.year,
+            day.month,
+            day.day,
+            minute_of_day // 60,
+            minute_of_day % 60,
+            tzinfo=self.timezone,
+        ).timestamp()
+
+    def describe(self):
+        """
+        :return: the rules as text, e.g. "weekdays 16:00-20:00; sat, sun 10:00-22:00"
+        """
+        rule_texts = []
+        for weekdays, start_minute, end_minute in self.rules:
+            days = next(
+                (name for name, group in DAY_GROUPS.items() if list(group) == weekdays),
+                ", ".join(WEEKDAY_NAMES[weekday] for weekday in weekdays),
+            )
+            rule_texts.append(
+                f"{days} {_format_minute(start_minute)}-{_format_minute(end_minute)}"
+            )
+        return "; ".join(rule_texts)
+
+
+def _load_timezone(name):
+    """
+    :param name: an IANA timezone name, or None for the local timezone
+    :return: a tzinfo, None for the local timezone
+    :raise ValueError: if the timezone is unknown
+    """
+    if not name:
+        return None
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        raise ValueError(f"Unknown timezone '{name}'.") from e
+
+
+def _parse_rule(rule):
+    """
+    :param rule: a dict with "days", "start" and "end"
+    :return: (sorted weekdays, start minute, end minute), the end is past 1440 if it is on the next day
+    :raise ValueError: if the rule is invalid
+    """
+    days = rule.get("days", "daily")
+    if isinstance(days, str):
+        days = [days]
+    weekdays = set()
+    for day in days:
+        day = str(day).lower()
+        if day in DAY_GROUPS:
+            weekdays.update(DAY_GROUPS[day])
+        elif day[:3] in WEEKDAY_NAMES:
+            weekdays.add(WEEKDAY_NAMES.index(day[:3]))
+        else:
+            raise ValueError(f"Unknown day '{day}' in schedule.")
+    start_minute = _parse_minute(rule.get("start", "00:00"))
+    end_minute = _parse_minute(rule.get("end", "24:00"))
+    # an end at or before the start, like 22:00-02:00, is on the next day
+    if end_minute <= start_minute:
+        end_minute += 1440
+    return sorted(weekdays), start_minute, end_minute
+
+
+def _parse_minute(value):
+    """
+    :param value: a time of day "HH:MM", "24:00" for the end of the day
+    :return: the minutes since midnight
+    :raise ValueError: if the time is invalid
+    """
+    try:
+        hours, minutes = (int(part) for part in str(value).split(":"))
+    except ValueError:
+        raise ValueError(f"Invalid time '{value}' in schedule, expected HH:MM.")
+    if not (0 <= hours <= 24 and 0 <= minutes < 60) or (hours == 24 and minutes):
+        raise ValueError(f"Invalid time '{value}' in schedule.")
+    return hours * 60 + minutes
+
+
+def _format_minute(minute_of_day):
+    """
+    :param minute_of_day: minutes since midnight, past 1440 on the next day
+    :return: the time of day "HH:MM", "24:00" for the end of the day
+    """
+    if minute_of_day == 1440:
+        return "24:00"
+    return f"{minute_of_day // 60 % 24:02d}:{minute_of_day % 60:02d}"
+
+
+def parse_schedule_argument(values):
+    """
+    Build a schedule config from command line rules.
+    :param values: rules like "weekdays=16:00-20:00" or "sat,sun=10:00-22:00"
+    :return: the list of "allowed" rule dicts
+    :raise ValueError: if a rule is invalid
+    """
+    allowed = []
+    for value in values:
+        days, _, hours = value.partition("=")
+        start, _, end = hours.partition("-")
+        if not days or not start or not end:
+            raise ValueError(f"'{value}' is not DAYS=HH:MM-HH:MM, e.g. weekdays=16:00-20:00.")
+        rule = {"days": days.split(","), "start": start, "end": end}
+        _parse_rule(rule)
+        allowed.append(rule)
+    return allowed
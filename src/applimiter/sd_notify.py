@@ -0,0 +1,126 @@
+# AppLimiter/src/applimiter/sd_notify.py
+
+"""
+Speak the systemd notify protocol, without libsystemd.
+
+A service started with Type=notify gets the path of a datagram socket in
+NOTIFY_SOCKET. Each datagram is a list of "KEY=value" lines, e.g. "READY=1"
+once started, "WATCHDOG=1" to pet the watchdog and "STATUS=..." for the
+text shown by `systemctl status`. When WatchdogSec= is set, systemd also
+passes WATCHDOG_USEC and restarts the service if it isn't pet in time.
+"""
+
+import os
+import socket
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SystemdNotifier:
+    """
+    Sends notifications to systemd, or does nothing if not started by systemd.
+    """
+
+    def __init__(self, environ=None):
+        """
+        :param environ: the environment to read NOTIFY_SOCKET and WATCHDOG_USEC from, defaults to os.environ
+        """
+        if environ is None:
+            environ = os.environ
+        self.address = environ.get("NOTIFY_SOCKET") or None
+        if self.address and self.address.startswith("@"):
+            # a socket in the abstract namespace
+            self.address = "\0" + self.address[1:]
+        self.watchdog_interval = _read_watchdog_interval(environ)
+        self._socket = None
+
+    @property
+    def enabled(self):
+        """
+        :return: True if there is a notify socket to send to
+        """
+        return self.address is not None
+
+    def notify(self, *assignments):
+        """
+        Send one datagram of "KEY=value" assignments.
+        :param assignments: the assignments, e.g. "READY=1", "STATUS=Running"
+        :return: True if it was sent, False otherwise
+        """
+        if not self.enabled:
+            return False
+        message = "\n".join(assignments).encode("utf-8")
+        try:
+            if self._socket is None:
+                self._socket = socket.socket(
+                    socket.AF_UNIX, socket.SOCK_DGRAM | socket.SOCK_CLOEXEC
+                )
+            self._socket.sendto(message, self.address)
+        except OSError as e:
+            logger.warning(f"Could not notify systemd: {e}")
+            return False
+        return True
+
+    def ready(self, status=None):
+        """
+        Tell systemd that startup is finished.
+        :param status: an optional status text
+        :return: True if it was sent, False otherwise
+        """
+        return self.notify("READY=1", *_status_assignment(status))
+
+    def watchdog(self, status=None):
+        """
+        Pet the watchdog.
+        :param status: an optional status text
+        :return: True if it was sent, False otherwise
+        """
+        return self.notify("WATCHDOG=1", *_status_assignment(status))
+
+    def reloading(self):
+        """
+        Tell systemd that the config is being reloaded, send ready() when done.
+        :return: True if it was sent, False otherwise
+        """
+        return self.notify("RELOADING=1")
+
+    def stopping(self):
+        """
+        Tell systemd that the service is shutting down.
+        :return: True if it was sent, False otherwise
+        """
+        return self.notify("STOPPING=1")
+
+    def close(self):
+        """
+        Close the socket.
+        :return: None
+        """
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+def _status_assignment(status):
+    return [f"STATUS={status}"] if status else []
+
+
+def _read_watchdog_interval(environ):
+    """
+    :param environ: the environment of the service
+    :return: the watchdog interval in seconds, or None if this process has no watchdog
+    """
+    watchdog_usec = environ.get("WATCHDOG_USEC")
+    if not watchdog_usec:
+        return None
+    # the watchdog may be meant for another process of the service
+    watchdog_pid = environ.get("WATCHDOG_PID")
+    if watchdog_pid and watchdog_pid != str(os.getpid()):
+        return None
+    try:
+        interval = int(watchdog_usec) / 1_000_000
+    except ValueError:
+        logger.warning(f"Ignoring invalid WATCHDOG_USEC={watchdog_usec}")
+        return None
+    return interval if interval > 0 else None
@@ -0,0 +1,150 @@
+# AppLimiter/src/applimiter/simulation.py
+
+"""
+Run the daemon on a virtual clock against a scripted process timeline.
+
+A scenario is a JSON document:
+
+    {
+        "start": "2024-06-24T00:00:00",
+        "days": 14,
+        "check_interval": 60,
+        "config": {"applications": [...]},
+        "usage_data": {},
+        "users": [{"username": "val", "uid": 1000, "display": ":0"}],
+        "processes": [
+            {"name": "steam", "cmdline": "/usr/bin/steam.sh",
+             "start": "2024-06-24T18:00:00", "end": "2024-06-24T21:00:00",
+             "repeat_days": 1}
+        ]
+    }
+
+Each process runs from "start" to "end", and again every "repeat_days" days if
+set. A process terminated by the daemon stays dead until its next repetition.
+"""
+
+import copy
+import datetime
+import time
+
+from applimiter.clock import VirtualClock
+from applimiter.constants import DAEMON_CHECK_INTERVAL_SECONDS
+from applimiter.daemon import AppLimiterDaemon
+from applimiter.process_handler import ProcessInfo
+from applimiter.replay import ActionRecorder
+
+# scripted processes get pids from here on, well above the pids of a real system
+_FIRST_SCRIPTED_PID = 1_000_000
+_PIDS_PER_PROCESS = 1_000_000
+
+DEFAULT_SIMULATION_USERS = [
+    {"username": "user", "uid": 1000, "display": ":0", "xauthority": None}
+]
+
+
+class ScriptedProcessTimeline:
+    """
+    Answers which scripted processes are running at a given time.
+    """
+
+    def __init__(self, process_specs):
+        """
+        :param process_specs: the "processes" list of a scenario
+        """
+        self._specs = []
+        for spec in process_specs:
+            start = _parse_timestamp(spec["start"])
+            end = _parse_timestamp(spec["end"])
+            if end <= start:
+                raise ValueError(f"Process '{spec['name']}' must end after it starts.")
+            repeat_days = spec.get("repeat_days")
+            period = repeat_days * 86400 if repeat_days else None
+            self._specs.append(
+                (start, end, period, spec["name"].lower(), spec.get("cmdline", spec["name"]).lower())
+            )
+        self._terminated = set()
+
+    def process_table(self, timestamp):
+        """
+        :param timestamp: the unix timestamp to look at
+        :return: the list of ProcessInfo running at that time
+        """
+        process_table = []
+        for spec_index, (start, end, period, name, cmdline) in enumerate(self._specs):
+            if timestamp < start:
+                continue
+            occurrence = int((timestamp - start) // period) if period else 0
+            offset = occurrence * period if period else 0
+            if start + offset <= timestamp < end + offset:
+                pid = _FIRST_SCRIPTED_PID + spec_index * _PIDS_PER_PROCESS + occurrence
+                if pid not in self._terminated:
+                    process_table.append(ProcessInfo(pid, name, cmdline, start + offset))
+        return process_table
+
+    def terminate(self, pid):
+        """
+        Stop a scripted process until its next repetition.
+        :param pid: the pid of the process
+        :return: None
+        """
+        self._terminated.add(pid)
+
+
+def _parse_timestamp(value):
+    """
+    :param value: an ISO 8601 datetime string, local time if it has no offset
+    :return: the unix timestamp
+    """
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def run_simulation(scenario):
+    """
+    Fast-forward the daemon through a scenario.
+    :param scenario: the scenario dict
+    :return: a dict with the final usage data, notifications, terminations and timing
+    """
+    check_interval = scenario.get("check_interval", DAEMON_CHECK_INTERVAL_SECONDS)
+    start = _parse_timestamp(scenario["start"])
+    end = start + scenario.get("days", 7) * 86400
+    config = scenario.get("config", {})
+    desktop_users = scenario.get("users", DEFAULT_SIMULATION_USERS)
+    usage_data_all_apps = copy.deepcopy(scenario.get("usage_data", {}))
+
+    clock = VirtualClock(start)
+    timeline = ScriptedProcessTimeline(scenario.get("processes", []))
+    stand_in = ActionRecorder(clock)
+
+    def terminate(pid, app_name):
+        stand_in.terminate(pid, app_name)
+        timeline.terminate(pid)
+
+    app_limiter_daemon = AppLimiterDaemon(
+        check_interval,
+        send_notification=stand_in.send_notification,
+        terminate=terminate,
+        clock=clock,
+    )
+
+    cycles = 0
+    started = time.perf_counter()
+    while clock.time() < end:
+        app_limiter_daemon.process_cycle(
+            config,
+            usage_data_all_apps,
+            clock.now(),
+            timeline.process_table(clock.time()),
+            desktop_users,
+        )
+        cycles += 1
+        clock.sleep(check_interval)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "cycles": cycles,
+        "elapsed_seconds": elapsed,
+        "simulated_seconds": end - start,
+        "usage_data": usage_data_all_apps,
+        "notifications": stand_in.notifications,
+        "terminations": stand_in.terminations,
+    }
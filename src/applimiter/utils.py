@@ -8,12 +8,109 @@ Store JSON processing functions and some check functions
 import logging
 import json
 import os
-import time
-import subprocess
+import fcntl
+from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
 
+# locks held by this process: pathname -> [lock file descriptor, exclusive, depth]
+_held_locks = {}
+
+
+@contextmanager
+def locked_file(pathname, exclusive=False):
+    """
+    Hold an flock on the sidecar lock file of a JSON file.
+    Writers replace the JSON file by renaming, so the lock lives in "<pathname>.lock".
+    The lock is reentrant within a process, and a held shared lock is upgraded if
+    an exclusive one is requested. If the lock file cannot be opened (e.g. a
+    non-root user and no lock file yet), the block runs without a lock.
+    :param pathname: the pathname of the JSON file
+    :param exclusive: take an exclusive lock for writing instead of a shared one
+    :return: a context manager
+    """
+    held = _held_locks.get(pathname)
+    if held is not None:
+        fd, held_exclusive, _ = held
+        if exclusive and not held_exclusive:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            held[1] = True
+        held[2] += 1
+        try:
+            yield
+        finally:
+            held[2] -= 1
+            if exclusive and not held_exclusive:
+                fcntl.flock(fd, fcntl.LOCK_SH)
+                held[1] = False
+        return
+
+    lock_pathname = pathname + ".lock"
+    if exclusive:
+        try:
+            os.makedirs(os.path.dirname(pathname), exist_ok=True)
+        except OSError:
+            pass
+    try:
+        fd = os.open(lock_pathname, os.O_RDWR | os.O_CREAT, 0o644)
+    except OSError:
+        try:
+            fd = os.open(lock_pathname, os.O_RDONLY)
+        except OSError as e:
+            logger.debug(f"Could not open lock file {lock_pathname}, running unlocked: {e}")
+            yield
+            return
+
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        _held_locks[pathname] = [fd, exclusive, 1]
+        yield
+    finally:
+        _held_locks.pop(pathname, None)
+        os.close(fd)
+
+
+def file_version(pathname):
+    """
+    Return a token that changes every time a JSON file is saved.
+    save_json always writes a new file and renames it, so the inode changes on every save.
+    :param pathname: the pathname of the JSON file
+    :return: a (inode, mtime_ns, size) tuple, or None if the file doesn't exist
+    """
+    try:
+        stat_result = os.stat(pathname)
+    except FileNotFoundError:
+        return None
+    return stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size
+
+
+def _write_json(pathname, data):
+    """
+    Write data to a temporary file and rename it over pathname, the caller holds the lock.
+    """
+    # mkdir if needed
+    os.makedirs(os.path.dirname(pathname), exist_ok=True)
+    tmp_pathname = pathname + ".tmp"
+
+    # dump json file
+    with open(tmp_pathname, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+
+    # change permissions if the user is root
+    if os.getuid() == 0:
+        try:
+            os.chmod(tmp_pathname, 0o644)
+        except OSError as e_chmod:
+            logger.warning(
+                f"Could not change permissions to {tmp_pathname}: {e_chmod}"
+            )
+
+    # rename the file
+    os.rename(tmp_pathname, pathname)
+    logger.debug(f"JSON data successfully saved to {pathname}")
+
+
 def save_json(pathname, data):
     """
     Save data to a json file and change the permissions if current user is the root user
@@ -23,26 +120,8 @@ def save_json(pathname, data):
     :return: None
     """
     try:
-        # mkdir if needed
-        os.makedirs(os.path.dirname(pathname), exist_ok=True)
-        tmp_pathname = pathname + ".tmp"
-
-        # dump json file
-        with open(tmp_pathname, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-
-        # change permissions if the user is root
-        if os.getuid() == 0:
-            try:
-                os.chmod(tmp_pathname, 0o644)
-            except OSError as e_chmod:
-                logger.warning(
-                    f"Could not change permissions to {tmp_pathname}: {e_chmod}"
-                )
-
-        # rename the file
-        os.rename(tmp_pathname, pathname)
-        logger.debug(f"JSON data successfully saved to {pathname}")
+        with locked_file(pathname, exclusive=True):
+            _write_json(pathname, data)
     except IOError as io_err:
         logger.error(f"Failed to save JSON data to {pathname}: {io_err}")
     except Exception as global_err:
@@ -60,39 +139,170 @@ def load_json(pathname, default_data=None, read_only=False):
     :param read_only: create a new json file with default data if False
     :return: the loaded data or default_data
     """
+    return load_json_versioned(pathname, default_data, read_only)[0]
+
+
+def load_json_versioned(pathname, default_data=None, read_only=False):
+    """
+    Load data from a JSON file together with its file_version, read under a shared lock.
+    Writers rename complete files under an exclusive lock, so a read never sees a torn file.
+    A file that still fails to parse is corrupt: it is kept as "<pathname>.corrupt" and,
+    unless read_only, replaced by the default data.
+
+    :param pathname: the pathname to load json data
+    :param default_data: the default data to load if the file doesn't exist
+    :param read_only: create a new json file with default data if False
+    :return: (the loaded data or default_data, the file version the data was read from)
+    """
     if default_data is None:
         default_data = {}
 
-    try:
-        # if file not exists, create json file and use default data
-        if not os.path.exists(pathname):
+    with locked_file(pathname):
+        version = file_version(pathname)
+        if version is None and read_only:
+            logger.info(f"File {pathname} not found, returning default data.")
+            return default_data, None
+        try:
+            # if file exists, load data
+            if version is not None:
+                with open(pathname, "r", encoding="utf-8") as f:
+                    return json.load(f), version
+        except (IOError, json.JSONDecodeError) as e:
+            logger.error(f"Failed to read JSON file {pathname}: {e}")
             if read_only:
-                logger.info(f"File {pathname} not found, returning default data.")
-                return default_data
+                logger.warning("Returning default data")
+                return default_data, version
 
+    with locked_file(pathname, exclusive=True):
+        # the file may have been fixed or created while we waited for the lock
+        if file_version(pathname) != version:
+            return load_json_versioned(pathname, default_data, read_only)
+        if version is None:
+            # if file not exists, create json file and use default data
             logger.info(f"File {pathname} not found, creating a default one.")
-            save_json(pathname, default_data)
-            return default_data
-        # if file exists, load data
-        with open(pathname, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (IOError, json.JSONDecodeError) as e:
-        # try to load the data again
-        logger.warning(f"Failed to read JSON file {pathname} (retrying): {e}")
-        time.sleep(0.1)
-        if os.path.exists(pathname) and os.path.getsize(pathname) > 0:
+        else:
+            logger.warning(
+                f"Keeping corrupt file as {pathname}.corrupt, create and use default data."
+            )
             try:
-                with open(pathname, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except (IOError, json.JSONDecodeError) as e2:
-                logger.error(f"Failed to read JSON file {pathname} again: {e2}")
-        # if fails again, use the default data
-        if read_only:
-            logger.warning("Returning default data")
-            return default_data
-        logger.warning("Create and use default data.")
+                os.replace(pathname, pathname + ".corrupt")
+            except OSError as e:
+                logger.error(f"Could not keep corrupt file {pathname}: {e}")
         save_json(pathname, default_data)
-        return default_data
+        return default_data, file_version(pathname)
+
+
+def update_json(pathname, mutate, default_data=None):
+    """
+    Read-modify-write a JSON file under an exclusive lock, so concurrent writers never
+    clobber each other.
+    :param pathname: the pathname of the JSON file
+    :param mutate: a function that modifies the loaded data in place
+    :param default_data: the data to start from if the file doesn't exist
+    :return: the saved data
+    """
+    with locked_file(pathname, exclusive=True):
+        data = load_json(pathname, default_data)
+        mutate(data)
+        save_json(pathname, data)
+        return data
+
+
+def save_json_versioned(pathname, data, base_data, base_version, counter_keys=()):
+    """
+    Compare-and-swap save: write data if the file is still at base_version, otherwise
+    three-way merge our changes (base_data -> data) into the file's current content.
+    :param pathname: the pathname of the JSON file
+    :param data: our modified data
+    :param base_data: the data as it was loaded, before our changes
+    :param base_version: the file_version the base data was loaded from
+    :param counter_keys: the keys whose values are counters, see merge_json_changes
+    :return: the data that was saved
+    """
+    with locked_file(pathname, exclusive=True):
+        if file_version(pathname) != base_version:
+            logger.info(f"{pathname} changed since it was loaded, merging changes.")
+            current_data = load_json(pathname, {}, read_only=True)
+            data = merge_json_changes(base_data, data, current_data, counter_keys)
+        save_json(pathname, data)
+        return data
+
+
+def append_json_line(pathname, data):
+    """
+    Append one JSON document as a line to a log file, with a single write so that
+    concurrent appenders never interleave.
+    :param pathname: the pathname of the log file
+    :param data: the data to append
+    :return: None
+    """
+    line = json.dumps(data, ensure_ascii=False) + "\n"
+    try:
+        os.makedirs(os.path.dirname(pathname), exist_ok=True)
+        fd = os.open(pathname, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+    except OSError as e:
+        logger.error(f"Failed to append to {pathname}: {e}")
+
+
+_MISSING = object()
+
+
+def merge_json_changes(base, mine, theirs, counter_keys=(), is_counter=False):
+    """
+    Three-way merge of JSON values that were both changed from a common base.
+    Dicts are merged key by key, a key deleted on either side stays deleted unless the
+    other side changed it. Counters that both sides changed get both deltas, for other
+    values, timestamps included, our change wins.
+    :param base: the common ancestor value
+    :param mine: our value
+    :param theirs: their value
+    :param counter_keys: the dict keys whose numbers are counters, at any depth and with everything below them
+    :param is_counter: True if the values are below a counter key
+    :return: the merged value
+    """
+    if isinstance(mine, dict) and isinstance(theirs, dict):
+        if not isinstance(base, dict):
+            base = {}
+        merged = {}
+        for key in {**theirs, **mine}:
+            base_value = base.get(key, _MISSING)
+            my_value = mine.get(key, _MISSING)
+            their_value = theirs.get(key, _MISSING)
+            if my_value is _MISSING:
+                # we deleted it, keep it only if they changed it
+                if base_value is _MISSING or their_value != base_value:
+                    merged[key] = their_value
+            elif their_value is _MISSING:
+                # they deleted it, keep it only if we added it
+                if base_value is _MISSING:
+                    merged[key] = my_value
+            else:
+                merged[key] = merge_json_changes(
+                    None if base_value is _MISSING else base_value,
+                    my_value,
+                    their_value,
+                    counter_keys,
+                    is_counter or key in counter_keys,
+                )
+        return merged
+
+    if mine == base:
+        return theirs
+    if theirs == base:
+        return mine
+    if not is_counter:
+        return mine
+    if all(_is_number(value) for value in (base, mine, theirs)):
+        return theirs + (mine - base)
+    return mine
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
 
 
 def check_dependencies():
@@ -101,6 +311,8 @@ def check_dependencies():
 
     :return: True if all dependencies are installed, False otherwise
     """
+    import subprocess
+
     dependencies = ["zenity"]
     missing_dependencies = []
     # check dependencies
@@ -133,21 +345,40 @@ def check_exists_app(app_name: str, config: dict) -> bool:
     return any(app["name"] == app_name for app in config.get("applications", []))
 
 
-def check_privilege(args):
+def group_usage_name(group_name: str) -> str:
     """
-    Check if has the permission to execute the command
+    Return the name a group's usage is kept under, next to the apps' usage
+    :param group_name: the group name from config
+    :return: the name of the group's usage data entry
+    """
+    return f"{group_name} (group)"
+
+
+def is_modifying_command(args):
+    """
+    Check if a command modifies the config or usage data
     :param args: argparse namespace
-    :return: True if the permission is satisfied, False otherwise
+    :return: True if the command writes to the config or usage data file, False otherwise
     """
-    is_root = os.getuid() == 0
-    # check if needs root
-    needs_root = args.command in [
+    return args.command in [
         "add",
         "remove",
         "update",
         "config-delay",
         "update-usage",
+        "import",
     ] or (args.command == "pending" and args.pending_action in ["clear", "apply"])
+
+
+def check_privilege(args):
+    """
+    Check if has the permission to execute the command
+    :param args: argparse namespace
+    :return: True if the permission is satisfied, False otherwise
+    """
+    is_root = os.getuid() == 0
+    # check if needs root
+    needs_root = is_modifying_command(args)
     if needs_root and not is_root:
         return False
-    return True
\ No newline at end of file
+    return True
@@ -0,0 +1,80 @@
+# AppLimiter/tests/test_accounting.py
+
+import pytest
+
+from applimiter.clock import VirtualClock, get_timer_slack, set_timer_slack
+from applimiter.daemon import AppLimiterDaemon
+from applimiter.process_handler import ProcessInfo
+
+START = 1_700_000_000
+CONFIG = {"applications": [{"name": "Steam", "process_keywords": ["steam"]}]}
+
+
+class Cycles:
+    """Drives process_cycle on a virtual clock."""
+
+    def __init__(self, check_interval=60):
+        self.clock = VirtualClock(START)
+        self.terminated = []
+        self.daemon = AppLimiterDaemon(
+            check_interval,
+            scan_processes=lambda: [],
+            get_desktop_users=lambda: [],
+            send_notification=lambda *args, **kwargs: None,
+            terminate=lambda pid, app_name: self.terminated.append(pid),
+            clock=self.clock,
+        )
+        self.usage_data = {}
+
+    def run(self, process_table, after_seconds=0):
+        self.clock.advance(after_seconds)
+        self.daemon.process_cycle(CONFIG, self.usage_data, self.clock.now(), process_table, [])
+        return self.usage_data["Steam"]["daily_seconds_today"]
+
+
+def _steam(create_time=None):
+    return [ProcessInfo(4242, "steam", "/usr/bin/steam", create_time)]
+
+
+def test_running_app_is_credited_the_measured_interval():
+    cycles = Cycles(check_interval=60)
+
+    assert cycles.run(_steam(START - 3600)) == 60
+    # a slow cycle or a longer interval: the real time counts, not check_interval
+    assert cycles.run(_steam(START - 3600), after_seconds=300) == 360
+
+
+def test_app_started_between_scans_is_credited_from_its_create_time():
+    cycles = Cycles()
+    cycles.run([])
+
+    assert cycles.run(_steam(START + 45), after_seconds=60) == 15
+
+
+def test_app_stopped_between_scans_is_credited_half_the_interval():
+    cycles = Cycles()
+    cycles.run(_steam(START - 3600))
+
+    assert cycles.run([], after_seconds=60) == 90
+    assert cycles.run([], after_seconds=60) == 90
+
+
+def test_suspended_time_is_not_credited():
+    cycles = Cycles()
+    cycles.run(_steam(START - 3600))
+
+    cycles.clock.advance(20)
+    cycles.clock.suspend(3600)
+    assert cycles.run(_steam(START - 3600), after_seconds=40) == 120
+    assert cycles.daemon.stats["suspended_seconds"] == 3600
+
+
+def test_timer_slack_is_set_for_the_calling_thread():
+    original_slack = get_timer_slack()
+    if original_slack is None:
+        pytest.skip("prctl is not available")
+    try:
+        assert set_timer_slack(0.25)
+        assert get_timer_slack() == 0.25
+    finally:
+        set_timer_slack(original_slack)
@@ -0,0 +1,126 @@
+# AppLimiter/tests/test_cgroups.py
+
+import os
+
+from applimiter import daemon
+from applimiter.cgroups import CgroupManager
+from applimiter.clock import VirtualClock
+from applimiter.daemon import AppLimiterDaemon, escalation_state
+from applimiter.process_handler import ProcessInfo
+from applimiter.utils import save_json
+
+START = 1_700_000_000
+ESCALATION = [
+    {"after_seconds": 0, "cpu_percent": 25},
+    {"after_seconds": 120, "io_bytes_per_second": 1048576},
+    {"after_seconds": 240, "freeze": True},
+]
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_manager_writes_cgroup_control_files(tmp_path):
+    service_path = tmp_path / "system.slice" / "applimiter.service"
+    service_path.mkdir(parents=True)
+    (service_path / "cgroup.procs").write_text("1234\n")
+    cgroups = CgroupManager(
+        root=str(tmp_path), block_devices=["8:0"], service_cgroup="/system.slice/applimiter.service"
+    )
+    app_path = cgroups.app_path("Steam / Proton")
+
+    assert cgroups.move("Steam / Proton", [os.getpid()]) == 1
+    assert cgroups.move("Steam / Proton", [os.getpid()]) == 0
+    cgroups.set_cpu_percent("Steam / Proton", 25)
+    cgroups.set_io_bytes_per_second("Steam / Proton", 1048576)
+    cgroups.set_frozen("Steam / Proton", True)
+
+    # below the delegated service cgroup, which the daemon left for a leaf of its own
+    assert os.path.dirname(app_path) == str(service_path / "apps")
+    assert _read(service_path / "daemon" / "cgroup.procs") == "1234"
+    assert _read(service_path / "cgroup.subtree_control") == "+cpu +io"
+    assert _read(service_path / "apps" / "cgroup.subtree_control") == "+cpu +io"
+    assert _read(os.path.join(app_path, "cgroup.procs")) == str(os.getpid())
+    assert _read(os.path.join(app_path, "cpu.max")) == "25000 100000"
+    assert _read(os.path.join(app_path, "io.max")) == "8:0 rbps=1048576 wbps=1048576"
+    assert _read(os.path.join(app_path, "cgroup.freeze")) == "1"
+
+    cgroups.release("Steam / Proton")
+    assert _read(os.path.join(app_path, "cgroup.freeze")) == "0"
+    assert _read(os.path.join(app_path, "cpu.max")) == "max 100000"
+    assert _read(os.path.join(app_path, "io.max")) == "8:0 rbps=max wbps=max"
+
+
+def test_escalation_state_combines_reached_steps():
+    assert escalation_state(ESCALATION, -1) == {}
+    assert escalation_state(ESCALATION, 130) == {
+        "cpu_percent": 25,
+        "io_bytes_per_second": 1048576,
+    }
+    assert escalation_state(ESCALATION, 300)["freeze"] is True
+
+
+class RecordingCgroups:
+    def __init__(self):
+        self.calls = []
+
+    def move(self, app_name, pids):
+        self.calls.append(("move", tuple(pids)))
+
+    def set_cpu_percent(self, app_name, percent):
+        self.calls.append(("cpu", percent))
+
+    def set_io_bytes_per_second(self, app_name, bytes_per_second):
+        self.calls.append(("io", bytes_per_second))
+
+    def set_frozen(self, app_name, frozen):
+        self.calls.append(("freeze", frozen))
+
+    def release(self, app_name):
+        self.calls.append(("release",))
+
+
+def test_daemon_climbs_the_ladder_before_terminating(tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon, "CONFIG_FILE_PATH", str(tmp_path / "config.json"))
+    monkeypatch.setattr(daemon, "USAGE_DATA_PATH", str(tmp_path / "usage_data.json"))
+    save_json(
+        str(tmp_path / "config.json"),
+        {
+            "applications": [
+                {
+                    "name": "Steam",
+                    "process_keywords": ["steam"],
+                    "daily_limits_by_day": {"weekdays": 1, "weekends": 1},
+                    "escalation": ESCALATION,
+                }
+            ]
+        },
+    )
+    cgroups = RecordingCgroups()
+    terminated = []
+    clock = VirtualClock(START)
+    app_limiter_daemon = AppLimiterDaemon(
+        60,
+        scan_processes=lambda: [ProcessInfo(4242, "steam", "steam", START - 60)],
+        get_desktop_users=lambda: [],
+        send_notification=lambda *args, **kwargs: None,
+        terminate=lambda pid, app_name: terminated.append((pid, list(cgroups.calls))),
+        clock=clock,
+        cgroups=cgroups,
+    )
+
+    for _ in range(8):
+        app_limiter_daemon.run_cycle()
+        clock.advance(60)
+
+    steps = [call for call in cgroups.calls if call[0] != "move"]
+    assert steps == [("cpu", 25), ("io", 1048576), ("freeze", True), ("release",)]
+    # released right before the termination at the end of the grace period,
+    # the process still found afterwards is terminated again, not moved and frozen
+    (pid, calls_before_termination), *later_terminations = terminated
+    assert pid == 4242
+    assert calls_before_termination[-1] == ("release",)
+    assert later_terminations
+    assert cgroups.calls[-1] == ("release",)
@@ -4,6 +4,7 @@ import pytest
 import argparse
 import sys
 import copy
+import json
 import time
 
 # MODIFIED: 更新导入语句以匹配新的 'src/applimiter' 结构
@@ -49,9 +50,10 @@ def mock_env(mocker):
     # 新的、修正后的 mocker 设置
     mock_load_json = mocker.patch("applimiter.cli.load_json")
     mock_save_json = mocker.patch("applimiter.cli.save_json")
+    mock_append_json_line = mocker.patch("applimiter.cli.append_json_line")
     mock_check_privilege = mocker.patch("applimiter.cli.check_privilege")
-    mock_get_pids = mocker.patch("applimiter.cli.get_process_pids")
-    mock_time = mocker.patch("applimiter.cli.time.time")
+    mock_get_pids = mocker.patch("applimiter.process_handler.get_process_pids")
+    mock_time = mocker.patch("applimiter.clock.time.time")
 
     # --- 新增的代码 ---
     # 导入真正的 datetime 模块，以便我们能创建一个真实的 datetime 对象
@@ -64,7 +66,7 @@ def mock_env(mocker):
     # 2024年6月26日是一个周三 (工作日)
     mock_datetime.now.return_value = datetime(2024, 6, 26, 10, 30, 0)
     # 将 cli 模块中的 datetime.datetime 替换为我们这个“假的”类
-    mocker.patch("applimiter.cli.datetime.datetime", mock_datetime)
+    mocker.patch("applimiter.clock.datetime.datetime", mock_datetime)
 
     # 3. 定义模拟 load_json 的行为
     def _mocked_load_json(pathname, default_data=None, **kwargs):
@@ -87,6 +89,7 @@ def mock_env(mocker):
     yield {
         "load_json": mock_load_json,
         "save_json": mock_save_json,
+        "append_json_line": mock_append_json_line,
         "check_privilege": mock_check_privilege,
         "get_pids": mock_get_pids,
         "time": mock_time,
@@ -160,6 +163,35 @@ def test_status_command(mock_env, capsys):
     assert "Running (PIDs: [1234, 5678])" in output
     assert "Today (Weekday): 10.0 / 60 min" in output
 
+def test_status_shows_groups(mock_env, capsys):
+    """测试：status 命令是否显示应用组及其共享预算。"""
+    args = argparse.Namespace(command="status")
+    mock_env["get_pids"].return_value = [1234]
+    config_to_check = mock_env["load_json"](CONFIG_FILE_PATH)
+    config_to_check["groups"] = [
+        {"name": "Games", "apps": ["Steam"], "daily_limits_by_day": {"weekdays": 120}}
+    ]
+
+    cli._handle_status_command(args, config_to_check)
+
+    output = capsys.readouterr().out
+    assert "Group: Games (Running: Steam)" in output
+    assert "  Apps: Steam" in output
+    assert "Today (Weekday): 0.0 / 120 min" in output
+
+def test_status_shows_rolling_windows(mock_env, capsys):
+    """测试：status 命令是否显示滚动窗口的用量。"""
+    args = argparse.Namespace(command="status")
+    mock_env["get_pids"].return_value = []
+    config_to_check = mock_env["load_json"](CONFIG_FILE_PATH)
+    config_to_check["applications"][0]["rolling_limits"] = [
+        {"window_minutes": 120, "limit_minutes": 30}
+    ]
+
+    cli._handle_status_command(args, config_to_check)
+
+    assert "Last 2 hours: 0.0 / 30 min" in capsys.readouterr().out
+
 def test_pending_apply_when_locked(mock_env, capsys):
     """测试：当一个待定任务尚未解锁时，尝试应用它会失败。"""
     config_to_modify = mock_env["load_json"](CONFIG_FILE_PATH)
@@ -197,4 +229,102 @@ def test_pending_apply_when_unlocked(mock_env):
     call_args, _ = mock_env["save_json"].call_args
     saved_config = call_args[1]
     assert len(saved_config["pending_modifications"]) == 0
-    assert len(saved_config["applications"]) == 0
\ No newline at end of file
+    assert len(saved_config["applications"]) == 0
+    # 与守护进程一样写入审计日志
+    (audit_call,) = mock_env["append_json_line"].call_args_list
+    assert audit_call.args[0] == cli.AUDIT_LOG_PATH
+    assert audit_call.args[1]["source"] == "cli"
+    assert (audit_call.args[1]["id"], audit_call.args[1]["result"]) == ("test_id_123", "applied")
+
+def _write_import_file(tmp_path, document):
+    import_file = tmp_path / "apps.json"
+    import_file.write_text(json.dumps(document))
+    return str(import_file)
+
+
+def test_import_applies_batch_with_one_write(mock_env, tmp_path, capsys):
+    """测试：import 在一次事务中完成添加、更新和删除，只写一次 config。"""
+    import_file = _write_import_file(tmp_path, {
+        "applications": [
+            {"name": "Steam", "process_keywords": ["steam.sh"], "weekly_limit_minutes": 400},
+            {"name": "NewGame", "process_keywords": ["newgame"],
+             "daily_limits_by_day": {"weekdays": 30, "weekends": 60}},
+        ],
+        "operations": [{"action": "add_app", "payload": {"name": "Other", "process_keywords": ["other"]}}],
+    })
+    args = argparse.Namespace(command="import", file=import_file, replace=False)
+    config_to_modify = mock_env["load_json"](CONFIG_FILE_PATH)
+
+    cli._handle_import_command(args, config_to_modify)
+
+    config_saves = [c for c in mock_env["save_json"].call_args_list if c.args[0] == CONFIG_FILE_PATH]
+    assert len(config_saves) == 1
+    saved_apps = {app["name"]: app for app in config_saves[0].args[1]["applications"]}
+    assert set(saved_apps) == {"Steam", "NewGame", "Other"}
+    assert saved_apps["Steam"]["weekly_limit_minutes"] == 400
+    assert "Imported 3 operations" in capsys.readouterr().out
+
+
+def test_import_invalid_batch_changes_nothing(mock_env, tmp_path, capsys):
+    """测试：批量中任何一个操作无效时，整个批量都不生效。"""
+    import_file = _write_import_file(tmp_path, {
+        "operations": [
+            {"action": "add_app", "payload": {"name": "NewGame", "process_keywords": ["newgame"]}},
+            {"action": "remove_app", "payload": {"name": "Missing"}},
+        ],
+    })
+    args = argparse.Namespace(command="import", file=import_file, replace=False)
+    config_to_modify = mock_env["load_json"](CONFIG_FILE_PATH)
+
+    cli._handle_import_command(args, config_to_modify)
+
+    mock_env["save_json"].assert_not_called()
+    assert "Operation 2" in capsys.readouterr().err
+
+
+def test_import_with_delay_queues_single_batch(mock_env, tmp_path):
+    """测试：启用延迟时，需要延迟的批量作为一个待定项进入队列。"""
+    import_file = _write_import_file(tmp_path, {"applications": [], "operations": []})
+    args = argparse.Namespace(command="import", file=import_file, replace=True)
+    config_to_modify = mock_env["load_json"](CONFIG_FILE_PATH)
+    config_to_modify["enable_config_modification_delay"] = True
+
+    cli._handle_import_command(args, config_to_modify)
+
+    mock_env["save_json"].assert_called_once()
+    saved_config = mock_env["save_json"].call_args.args[1]
+    assert len(saved_config["applications"]) == 1
+    (pending_item,) = saved_config["pending_modifications"]
+    assert pending_item["action"] == "batch"
+    assert pending_item["payload"]["operations"] == [
+        {"action": "remove_app", "payload": {"name": "Steam"}}
+    ]
+    assert pending_item["unlock_timestamp"] == mock_env["time"].return_value + 300
+
+
+@pytest.mark.parametrize("operation", [
+    {"action": "update_app", "payload": {"name": "Steam", "weekly_limit_minutes": "abc"}},
+    {"action": "update_app", "payload": {"name": "Steam", "daily_limits_by_day": {"weekends": 10}}},
+    {"payload": {"name": "Steam", "weekly_limit_minutes": 999}},
+])
+def test_import_malformed_batch_with_delay_is_rejected(mock_env, tmp_path, capsys, operation):
+    """测试：启用延迟时，格式错误的批量被拒绝并给出错误信息，而不是崩溃。"""
+    import_file = _write_import_file(tmp_path, {"operations": [operation]})
+    args = argparse.Namespace(command="import", file=import_file, replace=False)
+    config_to_modify = mock_env["load_json"](CONFIG_FILE_PATH)
+    config_to_modify["enable_config_modification_delay"] = True
+
+    cli._handle_import_command(args, config_to_modify)
+
+    mock_env["save_json"].assert_not_called()
+    assert "Error: Operation 1" in capsys.readouterr().err
+
+
+def test_export_prints_applications(mock_env, capsys):
+    """测试：export 以 JSON 输出所有应用配置。"""
+    args = argparse.Namespace(command="export", output=None)
+    config_to_check = mock_env["load_json"](CONFIG_FILE_PATH)
+
+    cli._handle_export_command(args, config_to_check)
+
+    assert json.loads(capsys.readouterr().out) == {"applications": mock_env["config"]["applications"]}
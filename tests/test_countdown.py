@@ -0,0 +1,136 @@
+# AppLimiter/tests/test_countdown.py
+
+import os
+import subprocess
+
+from applimiter.clock import VirtualClock
+from applimiter.daemon import AppLimiterDaemon
+from applimiter.notification_manager import CountdownDialogs
+from applimiter.process_handler import ProcessInfo
+
+ALICE = {"username": "alice", "display": ":0", "uid": 1000}
+BOB = {"username": "bob", "display": ":1", "uid": 1001}
+
+
+def _spawner(shell_command):
+    """
+    Stand-in for zenity: each dialog is a shell command reading the updates from stdin.
+    """
+    spawned = []
+
+    def spawn(user_info, app_name):
+        process = subprocess.Popen(
+            ["sh", "-c", shell_command.format(username=user_info["username"])],
+            stdin=subprocess.PIPE,
+        )
+        os.set_blocking(process.stdin.fileno(), False)
+        spawned.append(process)
+        return process
+
+    return spawn, spawned
+
+
+def test_countdown_is_one_dialog_updated_through_its_pipe(tmp_path):
+    spawn, spawned = _spawner(f"cat > {tmp_path}/{{username}}")
+    countdowns = CountdownDialogs(spawn)
+
+    countdowns.show(("Steam", "alice"), ALICE, "Steam", 1300, 1000)
+    countdowns.tick(1060)
+    countdowns.show(("Steam", "alice"), ALICE, "Steam", 1300, 1120)
+    countdowns.close_unseen()
+    assert countdowns.active
+    countdowns.tick(1299.5)
+    # the app was closed, the next cycle does not show it
+    countdowns.close_unseen()
+    assert not countdowns.active
+    countdowns.close_all()
+
+    assert len(spawned) == 1
+    assert spawned[0].returncode == 0
+    assert (tmp_path / "alice").read_text() == (
+        "#'Steam' will close in 5:00.\n0\n"
+        "#'Steam' will close in 4:00.\n20\n"
+        "#'Steam' will close in 3:00.\n40\n"
+        "#'Steam' will close in 0:00.\n99\n"
+        "100\n"
+    )
+
+
+def test_dialog_not_reading_does_not_block_the_daemon(tmp_path):
+    spawn, spawned = _spawner("exec sleep 30")
+    countdowns = CountdownDialogs(spawn)
+    countdowns.show(("Steam", "alice"), ALICE, "Steam", 1300, 1000)
+
+    # far more than a pipe buffer holds
+    for tick in range(5000):
+        countdowns.tick(1000 + tick / 100)
+
+    assert countdowns.active
+    countdowns.close_all(timeout=0.1)
+    assert spawned[0].poll() is not None
+
+
+def test_dialog_closed_by_the_user_is_not_started_again():
+    spawn, spawned = _spawner("exit 0")
+    countdowns = CountdownDialogs(spawn)
+    countdowns.show(("Steam", "alice"), ALICE, "Steam", 1300, 1000)
+    spawned[0].wait()
+
+    for now_ts in (1060, 1120):
+        countdowns.tick(now_ts)
+        countdowns.show(("Steam", "alice"), ALICE, "Steam", 1300, now_ts)
+        countdowns.close_unseen()
+
+    assert len(spawned) == 1
+    assert not countdowns.active
+    countdowns.close_all()
+
+
+def test_daemon_counts_down_from_the_breach_to_termination(tmp_path):
+    clock = VirtualClock(1_700_000_000)
+    spawn, spawned = _spawner(f"cat > {tmp_path}/{{username}}")
+    config = {
+        "applications": [
+            {
+                "name": "Game",
+                "process_keywords": ["game"],
+                "daily_limits_by_day": {"weekdays": 0, "weekends": 0},
+            }
+        ]
+    }
+    processes = [ProcessInfo(100, "game", "/opt/game", 1_699_999_000, 1)]
+    terminated = []
+    app_limiter_daemon = AppLimiterDaemon(
+        60,
+        scan_processes=lambda: processes,
+        get_desktop_users=lambda: [ALICE, BOB],
+        send_notification=lambda title, message, user_info, dialog_type: None,
+        terminate=lambda pid, app_name: terminated.append(pid),
+        clock=clock,
+        countdowns=CountdownDialogs(spawn),
+    )
+    usage_data = {}
+
+    def cycle():
+        app_limiter_daemon.process_cycle(config, usage_data, clock.now(), processes, [ALICE, BOB])
+
+    cycle()
+    assert len(spawned) == 2
+    # updated between cycles without a rescan
+    clock.advance(5)
+    app_limiter_daemon.countdowns.tick(clock.time())
+    clock.advance(55)
+    cycle()
+    assert len(spawned) == 2
+    clock.advance(240)
+    cycle()
+    app_limiter_daemon.countdowns.close_all()
+
+    assert terminated == [100]
+    assert not app_limiter_daemon.countdowns.active
+    assert (tmp_path / "bob").read_text() == (
+        "#'Game' will close in 5:00.\n0\n"
+        "#'Game' will close in 4:55.\n1\n"
+        "#'Game' will close in 4:00.\n20\n"
+        "100\n"
+    )
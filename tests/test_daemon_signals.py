@@ -0,0 +1,139 @@
+# AppLimiter/tests/test_daemon_signals.py
+
+import os
+import time
+import signal
+import threading
+
+import pytest
+
+from applimiter import daemon, notification_manager
+from applimiter.clock import VirtualClock
+from applimiter.daemon import AppLimiterDaemon
+from applimiter.notification_manager import DesktopSessionCache
+from applimiter.process_handler import ProcessTableCache
+from applimiter.utils import save_json
+
+START = 1_700_000_000
+
+
+@pytest.fixture
+def data_paths(tmp_path, monkeypatch):
+    config_path = str(tmp_path / "config.json")
+    monkeypatch.setattr(daemon, "CONFIG_FILE_PATH", config_path)
+    monkeypatch.setattr(daemon, "USAGE_DATA_PATH", str(tmp_path / "usage_data.json"))
+    save_json(config_path, {"applications": [], "pending_modifications": []})
+    return config_path
+
+
+@pytest.fixture
+def restore_signal_handlers():
+    signums = (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGUSR1)
+    saved = {signum: signal.getsignal(signum) for signum in signums}
+    saved_wakeup_fd = signal.set_wakeup_fd(-1)
+    signal.set_wakeup_fd(saved_wakeup_fd)
+    yield
+    signal.set_wakeup_fd(saved_wakeup_fd)
+    for signum, handler in saved.items():
+        signal.signal(signum, handler)
+
+
+def _daemon_sending(signals_by_cycle):
+    """A daemon whose process scan raises the given signals at the given cycles."""
+    cycles = []
+
+    def scan_processes():
+        cycles.append(len(cycles))
+        for signum in signals_by_cycle.get(len(cycles), []):
+            os.kill(os.getpid(), signum)
+        return []
+
+    app_limiter_daemon = AppLimiterDaemon(
+        60,
+        scan_processes=scan_processes,
+        get_desktop_users=lambda: [],
+        clock=VirtualClock(START),
+    )
+    app_limiter_daemon.install_signal_handlers()
+    return app_limiter_daemon, cycles
+
+
+def test_sigterm_stops_after_the_current_cycle(data_paths, restore_signal_handlers):
+    app_limiter_daemon, cycles = _daemon_sending({3: [signal.SIGTERM]})
+
+    app_limiter_daemon.run_forever()
+
+    assert len(cycles) == 3
+    assert app_limiter_daemon.stats["cycles"] == 3
+
+
+def test_sighup_reloads_config_without_an_extra_cycle(
+    data_paths, restore_signal_handlers, mocker
+):
+    app_limiter_daemon, cycles = _daemon_sending(
+        {1: [signal.SIGHUP, signal.SIGUSR1], 2: [signal.SIGTERM]}
+    )
+    refresh_config = mocker.spy(app_limiter_daemon, "refresh_config")
+    log_stats = mocker.spy(app_limiter_daemon, "log_stats")
+
+    app_limiter_daemon.run_forever()
+
+    assert len(cycles) == 2
+    refresh_config.assert_any_call(force=True)
+    log_stats.assert_called_once()
+    # the cycle after the reload still waited a whole interval
+    assert app_limiter_daemon.clock.time() == START + 60
+
+
+def test_signal_wakes_a_real_wait_without_touching_a_lock(data_paths, restore_signal_handlers):
+    app_limiter_daemon = AppLimiterDaemon(
+        60, scan_processes=lambda: [], get_desktop_users=lambda: [], send_notification=lambda *args, **kwargs: None
+    )
+    app_limiter_daemon.install_signal_handlers()
+    threading.Timer(0.1, os.kill, (os.getpid(), signal.SIGTERM)).start()
+
+    started = time.monotonic()
+    app_limiter_daemon._wait_for_next_cycle()
+
+    assert app_limiter_daemon._stop_requested
+    assert time.monotonic() - started < 5
+    app_limiter_daemon._wake_event.close()
+
+
+def test_process_cache_reuses_known_processes():
+    process_cache = ProcessTableCache()
+    own_process = [p for p in process_cache.scan() if p.pid == os.getpid()]
+    assert own_process and "python" in own_process[0].name
+
+    restored_cache = ProcessTableCache()
+    restored_cache.restore(process_cache.to_snapshot())
+    process_table = restored_cache.scan()
+
+    assert own_process[0] in process_table
+    assert restored_cache.hits > 0
+
+
+def test_session_cache_refreshes_when_utmp_changes(tmp_path, monkeypatch):
+    utmp_path = tmp_path / "utmp"
+    utmp_path.write_bytes(b"a")
+    monkeypatch.setattr(notification_manager, "UTMP_PATH", str(utmp_path))
+    discover = []
+    clock = VirtualClock(START)
+    session_cache = DesktopSessionCache(
+        lambda: discover.append(1) or [{"username": "user"}], clock=clock
+    )
+
+    session_cache.get_users()
+    session_cache.get_users()
+    assert len(discover) == 1
+
+    utmp_path.write_bytes(b"ab")
+    session_cache.get_users()
+    assert len(discover) == 2
+
+    restored_cache = DesktopSessionCache(lambda: discover.append(1) or [], clock=clock)
+    restored_cache.restore(session_cache.to_snapshot())
+    assert restored_cache.get_users() == [{"username": "user"}]
+    clock.advance(session_cache.max_age)
+    restored_cache.get_users()
+    assert len(discover) == 3
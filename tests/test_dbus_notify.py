@@ -0,0 +1,108 @@
+# AppLimiter/tests/test_dbus_notify.py
+
+import os
+import shutil
+import subprocess
+import threading
+
+import pytest
+
+from applimiter.dbus_notify import (
+    METHOD_CALL,
+    NOTIFICATIONS_BUS_NAME,
+    DBusConnection,
+    DBusError,
+    DBusNotifier,
+    _Reader,
+    _Writer,
+    _split_signature,
+)
+
+
+def test_marshalling_round_trip():
+    signature = "susssasa{sv}i(yb)"
+    values = ["AppLimiter", 7, "dialog-error", "Steam", "Closed.", ["a", "b"], {"urgency": ("y", 2)}, -1, (3, True)]
+    writer = _Writer()
+    for type_code, value in zip(_split_signature(signature), values):
+        writer.write(type_code, value)
+
+    reader = _Reader(bytes(writer.data), "<")
+
+    assert [reader.read(type_code) for type_code in _split_signature(signature)] == values
+    assert reader.offset == len(writer.data)
+
+
+@pytest.fixture
+def session_bus(tmp_path):
+    """A private dbus-daemon with a notification server stand-in, at <tmp_path>/<uid>/bus."""
+    if shutil.which("dbus-daemon") is None:
+        pytest.skip("dbus-daemon is not installed")
+    bus_dir = tmp_path / str(os.getuid())
+    bus_dir.mkdir()
+    bus_process = subprocess.Popen(
+        ["dbus-daemon", "--session", "--nofork", "--print-address=1", f"--address=unix:path={bus_dir}/bus"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    address = bus_process.stdout.readline().strip()
+    received = []
+    server = DBusConnection(address)
+    server.call(
+        "org.freedesktop.DBus", "/org/freedesktop/DBus", "org.freedesktop.DBus",
+        "RequestName", "su", [NOTIFICATIONS_BUS_NAME, 0],
+    )
+
+    def serve():
+        next_id = 1
+        while True:
+            try:
+                message = server.receive()
+            except (OSError, DBusError):
+                return
+            if message.message_type == METHOD_CALL and message.fields.get("member") == "Notify":
+                received.append(message.body)
+                notification_id = message.body[1]
+                if not notification_id:
+                    notification_id, next_id = next_id, next_id + 1
+                server.reply(message, "u", [notification_id])
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield tmp_path, received
+    bus_process.terminate()
+    bus_process.wait()
+    server.close()
+
+
+def test_notifications_replace_the_previous_one_of_the_app(session_bus):
+    runtime_dir, received = session_bus
+    fallback = []
+    notifier = DBusNotifier(fallback=lambda *args, **kwargs: fallback.append(args), runtime_dir=str(runtime_dir))
+    user_info = {"username": "alice", "uid": os.getuid()}
+
+    notifier.send("Steam: 5 Minutes Left", "Hurry.", user_info, dialog_type="--info")
+    notifier.send("Minecraft: Daily Limit Reached", "Closing soon.", user_info, dialog_type="--warning")
+    notifier.send("Steam: Daily Limit: Terminated", "Closed.", user_info, dialog_type="--error")
+
+    assert [(body[1], body[3], body[6]["urgency"]) for body in received] == [
+        (0, "Steam: 5 Minutes Left", ("y", 1)),
+        (0, "Minecraft: Daily Limit Reached", ("y", 1)),
+        (1, "Steam: Daily Limit: Terminated", ("y", 2)),
+    ]
+    # one connection for the user, kept open
+    assert len(notifier._connections) == 1
+    assert fallback == []
+    notifier.close()
+
+
+def test_falls_back_without_a_session_bus(tmp_path):
+    fallback = []
+    notifier = DBusNotifier(
+        fallback=lambda title, message, user_info, dialog_type: fallback.append((title, dialog_type)),
+        runtime_dir=str(tmp_path),
+    )
+
+    notifier.send("Steam: 5 Minutes Left", "Hurry.", {"username": "bob", "uid": 4242}, dialog_type="--info")
+
+    assert fallback == [("Steam: 5 Minutes Left", "--info")]
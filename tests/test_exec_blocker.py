@@ -0,0 +1,128 @@
+# AppLimiter/tests/test_exec_blocker.py
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from applimiter import daemon
+from applimiter.clock import VirtualClock
+from applimiter.constants import GRACE_PERIOD_SECONDS
+from applimiter.daemon import AppLimiterDaemon
+from applimiter.exec_blocker import ExecBlocker, executable_file_id
+from applimiter.process_handler import ProcessInfo
+from applimiter.utils import save_json
+
+START = 1_700_000_000
+
+
+@pytest.fixture
+def blocked_copy_of_true(tmp_path):
+    path = str(tmp_path / "game")
+    shutil.copy(shutil.which("true"), path)
+    exec_blocker = ExecBlocker()
+    if not exec_blocker.start():
+        pytest.skip("fanotify permission events are not available")
+    yield exec_blocker, path
+    exec_blocker.close()
+
+
+def test_blocked_executable_is_denied_until_unblocked(blocked_copy_of_true):
+    exec_blocker, path = blocked_copy_of_true
+
+    exec_blocker.update({path: executable_file_id(path)})
+    with pytest.raises(PermissionError):
+        subprocess.run([path], timeout=10)
+    # other executables are not affected
+    assert subprocess.run([shutil.which("true")], timeout=10).returncode == 0
+
+    exec_blocker.update({})
+    assert subprocess.run([path], timeout=10).returncode == 0
+    assert exec_blocker.denied == 1
+
+
+def test_executable_blocked_for_some_users_only(blocked_copy_of_true):
+    exec_blocker, path = blocked_copy_of_true
+    file_id = executable_file_id(path)
+
+    # another user is past the limit, this one is not
+    exec_blocker.update({path: file_id}, {file_id: {os.geteuid() + 1}})
+    assert subprocess.run([path], timeout=10).returncode == 0
+
+    exec_blocker.update({path: file_id}, {file_id: {os.geteuid()}})
+    with pytest.raises(PermissionError):
+        subprocess.run([path], timeout=10)
+
+
+class RecordingBlocker:
+    def __init__(self):
+        self.updates = []
+
+    def update(self, executables, blocked_uids=None):
+        self.updates.append(executables)
+
+
+def test_daemon_blocks_apps_past_their_grace_period(tmp_path, monkeypatch):
+    executable = tmp_path / "steam"
+    executable.write_text("")
+    config = {
+        "enable_exec_blocking": True,
+        "applications": [
+            {
+                "name": "Steam",
+                "process_keywords": ["steam"],
+                "daily_limits_by_day": {"weekdays": 1, "weekends": 1},
+                "executables": [str(executable)],
+            }
+        ],
+    }
+    monkeypatch.setattr(daemon, "CONFIG_FILE_PATH", str(tmp_path / "config.json"))
+    monkeypatch.setattr(daemon, "USAGE_DATA_PATH", str(tmp_path / "usage_data.json"))
+    save_json(str(tmp_path / "config.json"), config)
+    exec_blocker = RecordingBlocker()
+    clock = VirtualClock(START)
+    app_limiter_daemon = AppLimiterDaemon(
+        60,
+        scan_processes=lambda: [ProcessInfo(4242, "steam", "steam", START - 60)],
+        get_desktop_users=lambda: [],
+        send_notification=lambda *args, **kwargs: None,
+        terminate=lambda pid, app_name: None,
+        clock=clock,
+        exec_blocker=exec_blocker,
+    )
+
+    # the limit is reached in the first cycle, the grace period ends later
+    app_limiter_daemon.run_cycle()
+    assert exec_blocker.updates == []
+
+    clock.advance(GRACE_PERIOD_SECONDS)
+    app_limiter_daemon.run_cycle()
+    assert app_limiter_daemon.blocked_apps == {(None, "Steam")}
+    assert exec_blocker.updates == [{str(executable): executable_file_id(str(executable))}]
+
+
+def test_interpreter_running_an_app_is_not_learned(tmp_path):
+    processes = []
+    for name in ("java", "mygame"):
+        path = tmp_path / name
+        shutil.copy(shutil.which("sleep"), path)
+        processes.append(subprocess.Popen([str(path), "30"]))
+    app_limiter_daemon = AppLimiterDaemon(
+        60,
+        scan_processes=lambda: [],
+        get_desktop_users=lambda: [],
+        send_notification=lambda *args, **kwargs: None,
+        terminate=lambda pid, app_name: None,
+    )
+    try:
+        app_limiter_daemon._learn_executables(
+            "Game", ["java -jar game.jar", "game"], [process.pid for process in processes]
+        )
+    finally:
+        for process in processes:
+            process.kill()
+            process.wait()
+
+    # java is in a keyword, but it is shared by every java app
+    assert list(app_limiter_daemon._app_executables["Game"]) == [str(tmp_path / "mygame")]
@@ -0,0 +1,82 @@
+# AppLimiter/tests/test_groups.py
+
+from applimiter.clock import VirtualClock
+from applimiter.constants import GRACE_PERIOD_SECONDS
+from applimiter.daemon import AppLimiterDaemon
+from applimiter.process_handler import ProcessInfo
+
+START = 1_700_000_000
+CONFIG = {
+    "applications": [
+        {"name": "Steam", "process_keywords": ["steam"]},
+        {"name": "Minecraft", "process_keywords": ["minecraft"]},
+        {"name": "Firefox", "process_keywords": ["firefox"]},
+    ],
+    "groups": [
+        {
+            "name": "Games",
+            "apps": ["Steam", "Minecraft"],
+            "daily_limits_by_day": {"weekdays": 30, "weekends": 30},
+        }
+    ],
+}
+GAMES = "Games (group)"
+
+
+class Cycles:
+    def __init__(self):
+        self.clock = VirtualClock(START)
+        self.notifications = []
+        self.terminated = []
+        self.daemon = AppLimiterDaemon(
+            60,
+            scan_processes=lambda: [],
+            get_desktop_users=lambda: [],
+            send_notification=lambda title, *args, **kwargs: self.notifications.append(title),
+            terminate=lambda pid, app_name: self.terminated.append(pid),
+            clock=self.clock,
+        )
+        self.usage_data = {}
+
+    def run(self, process_table, after_seconds=0):
+        self.clock.advance(after_seconds)
+        self.daemon.process_cycle(
+            CONFIG, self.usage_data, self.clock.now(), process_table, [{"username": "alice"}]
+        )
+
+    def seconds(self, name):
+        return self.usage_data[name]["daily_seconds_today"]
+
+
+def _process(pid, name):
+    return ProcessInfo(pid, name, f"/usr/bin/{name}", START - 3600, 1)
+
+
+def test_group_is_credited_once_while_any_member_runs():
+    cycles = Cycles()
+    both_games = [_process(100, "steam"), _process(200, "minecraft")]
+    cycles.run(both_games)
+    cycles.run(both_games, after_seconds=60)
+    cycles.run([_process(300, "firefox")], after_seconds=60)
+    cycles.run([_process(300, "firefox")], after_seconds=60)
+
+    assert cycles.seconds("Steam") == 150
+    assert cycles.seconds("Minecraft") == 150
+    # credited once per interval, not once per running member
+    assert cycles.seconds(GAMES) == 150
+    assert cycles.seconds("Firefox") == 120
+
+
+def test_group_budget_closes_every_member():
+    cycles = Cycles()
+    table = [_process(100, "steam"), _process(200, "minecraft"), _process(300, "firefox")]
+    cycles.run(table)
+    cycles.usage_data[GAMES]["daily_seconds_today"] = 29 * 60
+    cycles.run(table, after_seconds=60)
+
+    assert cycles.notifications == [f"{GAMES}: Daily Limit Reached"]
+
+    cycles.run(table, after_seconds=GRACE_PERIOD_SECONDS)
+
+    assert sorted(cycles.terminated) == [100, 200]
+    assert cycles.daemon.blocked_apps == {(None, GAMES), (None, "Steam"), (None, "Minecraft")}
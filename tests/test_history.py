@@ -0,0 +1,201 @@
+# AppLimiter/tests/test_history.py
+
+import argparse
+import datetime
+import os
+
+from applimiter import cli
+from applimiter.clock import VirtualClock
+from applimiter.daemon import AppLimiterDaemon
+from applimiter.history import (
+    UsageHistory,
+    build_report,
+    list_history_apps,
+    read_daily_seconds,
+    read_hourly_seconds,
+)
+from applimiter.process_handler import ProcessInfo
+
+
+def _ts(*args):
+    return datetime.datetime(*args).timestamp()
+
+
+def test_record_spreads_seconds_over_minutes_and_caps_them(tmp_path):
+    history = UsageHistory(str(tmp_path))
+
+    history.record("Steam", _ts(2024, 6, 26, 18, 1, 30), 90)
+    history.flush()
+    history.record("Steam", _ts(2024, 6, 26, 18, 1, 30), 90)
+    history.flush()
+
+    with open(tmp_path / "Steam" / "2024-06.minutes", "rb") as f:
+        data = f.read()
+    assert len(data) == 30 * 1440
+    minute = 25 * 1440 + 18 * 60
+    assert list(data[minute : minute + 3]) == [60, 60, 0]
+    assert read_hourly_seconds("Steam", datetime.date(2024, 6, 26), datetime.date(2024, 6, 26), str(tmp_path)) == [
+        [0] * 18 + [120] + [0] * 5
+    ]
+
+
+def test_usage_crossing_a_month_goes_to_both_files(tmp_path):
+    history = UsageHistory(str(tmp_path))
+
+    history.record("Games (group)", _ts(2024, 7, 1, 0, 0, 30), 60)
+    history.flush()
+
+    assert list_history_apps(str(tmp_path)) == ["Games (group)"]
+    hours = read_hourly_seconds(
+        "Games (group)", datetime.date(2024, 6, 30), datetime.date(2024, 7, 1), str(tmp_path)
+    )
+    assert [sum(day) for day in hours] == [30, 30]
+
+
+def test_build_report_periods(tmp_path):
+    history = UsageHistory(str(tmp_path))
+    # 30 minutes at 18:00 on Monday 24 and Monday 1, 60 on Tuesday 25
+    for day, minutes in [(24, 30), (25, 60)]:
+        history.record("Steam", _ts(2024, 6, day, 18, 0) + minutes * 60, minutes * 60)
+    history.record("Steam", _ts(2024, 7, 1, 18, 30), 30 * 60)
+    history.flush()
+    first_day, last_day = datetime.date(2024, 6, 24), datetime.date(2024, 7, 7)
+
+    days = build_report(["Steam"], first_day, last_day, "day", str(tmp_path))
+    weeks = build_report(["Steam"], first_day, last_day, "week", str(tmp_path))
+    weekdays = build_report(["Steam"], first_day, last_day, "weekday", str(tmp_path))
+    heatmap = build_report(["Steam"], first_day, last_day, "hour", str(tmp_path))
+
+    assert len(days) == 14 and days[1] == ("Steam", "2024-06-25", 60)
+    assert weeks == [("Steam", "2024-06-24", 90), ("Steam", "2024-07-01", 30)]
+    assert weekdays[:2] == [("Steam", "Mon", 30), ("Steam", "Tue", 30)]
+    assert ("Steam", "Mon", 18, 30) in heatmap and len(heatmap) == 7 * 24
+
+
+def test_daemon_records_history_on_full_cycles(tmp_path):
+    start = _ts(2024, 6, 26, 18, 0)
+    clock = VirtualClock(start)
+    history = UsageHistory(str(tmp_path))
+    app_limiter_daemon = AppLimiterDaemon(
+        60,
+        scan_processes=lambda: [ProcessInfo(4242, "steam", "/usr/bin/steam", start - 600, 1)],
+        get_desktop_users=lambda: [],
+        send_notification=lambda *args, **kwargs: None,
+        terminate=lambda pid, app_name: None,
+        clock=clock,
+        history=history,
+    )
+    config = {"applications": [{"name": "Steam", "process_keywords": ["steam"]}]}
+    usage_data = {}
+    for _ in range(3):
+        app_limiter_daemon.process_cycle(config, usage_data, clock.now(), app_limiter_daemon.scan_processes(), [])
+        clock.advance(60)
+    history.flush()
+
+    hours = read_hourly_seconds("Steam", datetime.date(2024, 6, 26), datetime.date(2024, 6, 26), str(tmp_path))
+    assert hours[0][17] + hours[0][18] == usage_data["Steam"]["daily_seconds_today"]
+
+
+def test_report_command_prints_csv(tmp_path, monkeypatch, capsys):
+    history = UsageHistory(str(tmp_path))
+    history.record("Steam", _ts(2024, 6, 26, 18, 45), 45 * 60)
+    history.flush()
+    monkeypatch.setattr(cli, "HISTORY_DIR_PATH", str(tmp_path))
+    args = argparse.Namespace(
+        command="report",
+        apps=[],
+        since=datetime.date(2024, 6, 26),
+        until=None,
+        by="week",
+        csv=True,
+    )
+
+    cli.handle_cli_command(args, clock=VirtualClock(_ts(2024, 6, 27, 12, 0)))
+
+    assert capsys.readouterr().out.splitlines() == [
+        "app,week,minutes",
+        "Steam,2024-06-24,45.0",
+    ]
+
+
+def test_report_command_prints_heatmap(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(cli, "HISTORY_DIR_PATH", str(tmp_path))
+    os.makedirs(tmp_path / "Steam")
+    args = argparse.Namespace(
+        command="report", apps=["Steam"], since=None, until=None, by="hour", csv=False
+    )
+
+    cli.handle_cli_command(args, clock=VirtualClock(_ts(2024, 6, 27, 12, 0)))
+
+    output = capsys.readouterr().out
+    assert "Usage Report 2024-05-29 to 2024-06-27" in output
+    assert "  Mon  " + " " * 48 in output
+
+
+def _write_usage(history, day, hour, minutes):
+    history.record("Steam", _ts(day.year, day.month, day.day, hour, 0) + minutes * 60, minutes * 60)
+
+
+def test_compaction_keeps_totals_at_coarser_resolutions(tmp_path):
+    clock = VirtualClock(_ts(2024, 6, 15, 12, 0))
+    history = UsageHistory(str(tmp_path), clock=clock)
+    for month in range(1, 7):
+        _write_usage(history, datetime.date(2024, month, 3), 18, 30)
+    history.flush()
+    first_day, last_day = datetime.date(2024, 1, 1), datetime.date(2024, 6, 30)
+    daily_before = build_report(["Steam"], first_day, last_day, "day", str(tmp_path))
+
+    assert history.compact({"minute_days": 40, "hour_days": 100}, 10) == 4
+
+    assert sorted(os.listdir(tmp_path / "Steam")) == [
+        "2024-01.days",
+        "2024-02.days",
+        "2024-03.hours",
+        "2024-04.hours",
+        "2024-05.minutes",
+        "2024-06.minutes",
+    ]
+    assert os.path.getsize(tmp_path / "Steam" / "2024-03.hours") == 31 * 24 * 2
+    assert build_report(["Steam"], first_day, last_day, "day", str(tmp_path)) == daily_before
+    hours = read_hourly_seconds("Steam", datetime.date(2024, 2, 3), datetime.date(2024, 3, 3), str(tmp_path))
+    assert hours[0] is None and hours[-1][18] == 30 * 60
+    # the heatmap averages over the days that still have hours, 18 Sundays from March on
+    heatmap = build_report(["Steam"], first_day, last_day, "hour", str(tmp_path))
+    assert ("Steam", "Sun", 18, 30 / 18) in heatmap
+
+
+def test_compaction_is_incremental_and_deletes_expired_months(tmp_path):
+    clock = VirtualClock(_ts(2024, 6, 15, 12, 0))
+    history = UsageHistory(str(tmp_path), clock=clock)
+    for month in range(1, 4):
+        _write_usage(history, datetime.date(2024, month, 3), 18, 30)
+    history.flush()
+    retention = {"minute_days": 1, "hour_days": 1, "day_days": 100}
+
+    # a budget of zero still does one step: the directory, then one file at a time
+    compacted = [history.compact(retention, 0) for _ in range(5)]
+
+    assert compacted == [0, 1, 1, 1, 0]
+    assert sorted(os.listdir(tmp_path / "Steam")) == ["2024-03.days"]
+    # the directory is looked at again only after the scan interval
+    _write_usage(history, datetime.date(2024, 4, 3), 18, 30)
+    history.flush()
+    assert history.compact(retention, 10) == 0
+    clock.advance(3600)
+    assert history.compact(retention, 10) == 1
+
+
+def test_interrupted_compaction_does_not_count_twice(tmp_path):
+    clock = VirtualClock(_ts(2024, 6, 15, 12, 0))
+    history = UsageHistory(str(tmp_path), clock=clock)
+    _write_usage(history, datetime.date(2024, 1, 3), 18, 30)
+    history.flush()
+    history.compact({"minute_days": 1, "hour_days": 365}, 10)
+    # as if the daemon stopped after writing the hours but before removing the minutes
+    with open(tmp_path / "Steam" / "2024-01.minutes", "wb") as f:
+        f.write(bytes(31 * 1440))
+    clock.advance(3600)
+    history.compact({"minute_days": 1, "hour_days": 365}, 10)
+
+    assert sorted(os.listdir(tmp_path / "Steam")) == ["2024-01.hours"]
+    assert sum(read_daily_seconds("Steam", datetime.date(2024, 1, 1), datetime.date(2024, 1, 31), str(tmp_path))) == 30 * 60
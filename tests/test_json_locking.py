@@ -0,0 +1,121 @@
+# AppLimiter/tests/test_json_locking.py
+
+import json
+import multiprocessing
+
+from applimiter.constants import USAGE_COUNTER_KEYS
+from applimiter.utils import (
+    file_version,
+    load_json,
+    load_json_versioned,
+    merge_json_changes,
+    save_json,
+    save_json_versioned,
+    update_json,
+)
+
+
+def _increment_many_times(pathname, times):
+    def increment(data):
+        data["counter"] = data.get("counter", 0) + 1
+
+    for _ in range(times):
+        update_json(pathname, increment)
+
+
+def test_concurrent_writers_do_not_lose_updates(tmp_path):
+    pathname = str(tmp_path / "usage_data.json")
+    save_json(pathname, {"counter": 0})
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=_increment_many_times, args=(pathname, 50))
+        for _ in range(4)
+    ]
+
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert load_json(pathname, read_only=True) == {"counter": 200}
+
+
+def test_versioned_save_merges_concurrent_change(tmp_path):
+    """The daemon counts a cycle while the cli adds extra minutes: both are kept."""
+    pathname = str(tmp_path / "usage_data.json")
+    save_json(pathname, {"Steam": {"daily_seconds_today": 600, "notif_daily_5_sent": False}})
+    daemon_data, version = load_json_versioned(pathname)
+    base = json.loads(json.dumps(daemon_data))
+
+    update_json(pathname, lambda data: data["Steam"].update(daily_seconds_today=1200))
+    daemon_data["Steam"]["daily_seconds_today"] += 60
+    daemon_data["Steam"]["notif_daily_5_sent"] = True
+    saved = save_json_versioned(pathname, daemon_data, base, version, USAGE_COUNTER_KEYS)
+
+    assert saved == {"Steam": {"daily_seconds_today": 1260, "notif_daily_5_sent": True}}
+    assert load_json(pathname, read_only=True) == saved
+
+
+def test_versioned_save_without_conflict_writes_data(tmp_path):
+    pathname = str(tmp_path / "usage_data.json")
+    save_json(pathname, {"a": 1})
+    data, version = load_json_versioned(pathname)
+
+    save_json_versioned(pathname, {"a": 2}, data, version)
+
+    assert load_json(pathname, read_only=True) == {"a": 2}
+    assert file_version(pathname) != version
+
+
+def test_merge_keeps_deletions():
+    base = {"Steam": {"daily_seconds_today": 10}, "Game": {"daily_seconds_today": 5}}
+    mine = {"Steam": {"daily_seconds_today": 70}, "Game": {"daily_seconds_today": 65}}
+    # the cli removed Game meanwhile
+    theirs = {"Steam": {"daily_seconds_today": 10}}
+
+    assert merge_json_changes(base, mine, theirs) == {"Steam": {"daily_seconds_today": 70}}
+
+
+def test_merge_adds_counters_but_not_timestamps():
+    base = {
+        "Steam": {
+            "daily_seconds_today": 600,
+            "first_limit_breach_timestamp": 1000,
+            "rolling_usage": {"head_minute": 100, "minutes": {"100": 10}, "window_sums": {"60": 10}},
+        }
+    }
+    mine = {
+        "Steam": {
+            "daily_seconds_today": 660,
+            "first_limit_breach_timestamp": 1060,
+            "rolling_usage": {"head_minute": 101, "minutes": {"100": 10, "101": 60}, "window_sums": {"60": 70}},
+        }
+    }
+    theirs = {
+        "Steam": {
+            "daily_seconds_today": 620,
+            "first_limit_breach_timestamp": 1060,
+            "rolling_usage": {"head_minute": 101, "minutes": {"100": 30}, "window_sums": {"60": 30}},
+        }
+    }
+
+    assert merge_json_changes(base, mine, theirs, USAGE_COUNTER_KEYS) == {
+        "Steam": {
+            "daily_seconds_today": 680,
+            "first_limit_breach_timestamp": 1060,
+            "rolling_usage": {"head_minute": 101, "minutes": {"100": 30, "101": 60}, "window_sums": {"60": 90}},
+        }
+    }
+    # without counter keys our change wins
+    assert merge_json_changes(base, mine, theirs)["Steam"]["daily_seconds_today"] == 660
+
+
+def test_corrupt_file_is_kept_and_replaced(tmp_path):
+    pathname = str(tmp_path / "config.json")
+    with open(pathname, "w") as f:
+        f.write('{"key": "value", }')
+
+    assert load_json(pathname, default_data={"status": "default"}) == {"status": "default"}
+    assert load_json(pathname, read_only=True) == {"status": "default"}
+    with open(pathname + ".corrupt") as f:
+        assert f.read() == '{"key": "value", }'
@@ -0,0 +1,157 @@
+# AppLimiter/tests/test_modifications.py
+
+import json
+
+import pytest
+
+from applimiter import daemon
+from applimiter.clock import VirtualClock
+from applimiter.daemon import AppLimiterDaemon
+from applimiter.modifications import PendingScheduler, modification_needs_delay
+from applimiter.utils import load_json, save_json
+
+START = 1_700_000_000
+
+
+def _pending(item_id, unlock_timestamp, action="remove_app", payload=None):
+    return {
+        "id": item_id,
+        "action": action,
+        "payload": payload if payload is not None else {"name": "Steam"},
+        "unlock_timestamp": unlock_timestamp,
+    }
+
+
+def test_scheduler_pops_items_in_unlock_order():
+    scheduler = PendingScheduler(
+        [_pending("c", 30), _pending("a", 10), _pending("b", 20)]
+    )
+
+    assert scheduler.next_unlock_timestamp() == 10
+    assert [item["id"] for item in scheduler.pop_unlocked(25)] == ["a", "b"]
+    assert len(scheduler) == 1
+    assert scheduler.next_unlock_timestamp() == 30
+
+
+def test_scheduler_skips_removed_items():
+    scheduler = PendingScheduler([_pending("a", 10), _pending("b", 20)])
+
+    assert scheduler.remove("a")["id"] == "a"
+    assert scheduler.next_unlock_timestamp() == 20
+    assert [item["id"] for item in scheduler.pop_unlocked(100)] == ["b"]
+    assert scheduler.next_unlock_timestamp() is None
+
+
+def test_partial_daily_limits_keep_the_other_day_type():
+    config = {
+        "enable_config_modification_delay": True,
+        "applications": [
+            {"name": "Steam", "daily_limits_by_day": {"weekdays": 60, "weekends": 120}}
+        ],
+    }
+
+    def update(daily_limits):
+        return {"action": "update_app", "payload": {"name": "Steam", "daily_limits_by_day": daily_limits}}
+
+    assert not modification_needs_delay(config, update({"weekends": 10}))
+    assert modification_needs_delay(config, update({"weekdays": 90}))
+
+
+def test_only_raising_a_limit_needs_delay():
+    config = {
+        "enable_config_modification_delay": True,
+        "applications": [
+            {"name": "Steam", "daily_limits_by_day": {"weekdays": 60, "weekends": 120}}
+        ],
+    }
+
+    def update(weekdays):
+        return {
+            "action": "update_app",
+            "payload": {
+                "name": "Steam",
+                "daily_limits_by_day": {"weekdays": weekdays, "weekends": 120},
+            },
+        }
+
+    assert modification_needs_delay(config, update(90))
+    assert not modification_needs_delay(config, update(30))
+
+
+@pytest.fixture
+def data_paths(tmp_path, monkeypatch):
+    config_path = str(tmp_path / "config.json")
+    usage_path = str(tmp_path / "usage_data.json")
+    audit_path = str(tmp_path / "audit.log")
+    monkeypatch.setattr(daemon, "CONFIG_FILE_PATH", config_path)
+    monkeypatch.setattr(daemon, "USAGE_DATA_PATH", usage_path)
+    monkeypatch.setattr(daemon, "AUDIT_LOG_PATH", audit_path)
+    return config_path, usage_path, audit_path
+
+
+def _daemon(clock):
+    return AppLimiterDaemon(
+        60,
+        scan_processes=lambda: [],
+        get_desktop_users=lambda: [],
+        send_notification=lambda *args, **kwargs: None,
+        terminate=lambda pid, app_name: None,
+        clock=clock,
+    )
+
+
+def test_daemon_applies_pending_modification_when_it_unlocks(data_paths):
+    config_path, usage_path, audit_path = data_paths
+    save_json(
+        config_path,
+        {
+            "applications": [
+                {
+                    "name": "Steam",
+                    "process_keywords": ["steam"],
+                    "daily_limits_by_day": {"weekdays": 60, "weekends": 60},
+                }
+            ],
+            "pending_modifications": [_pending("remove_steam", START + 120)],
+        },
+    )
+    save_json(usage_path, {"Steam": {"daily_seconds_today": 600}})
+    clock = VirtualClock(START)
+    app_limiter_daemon = _daemon(clock)
+
+    app_limiter_daemon.run_cycle()
+    assert load_json(config_path)["pending_modifications"]
+
+    clock.advance(120)
+    app_limiter_daemon.run_cycle()
+
+    config = load_json(config_path)
+    assert config["applications"] == []
+    assert config["pending_modifications"] == []
+    assert "Steam" not in load_json(usage_path)
+    with open(audit_path, encoding="utf-8") as f:
+        audit_entries = [json.loads(line) for line in f]
+    assert [(entry["id"], entry["result"]) for entry in audit_entries] == [
+        ("remove_steam", "applied")
+    ]
+
+
+def test_daemon_picks_up_items_queued_after_start(data_paths):
+    config_path, _, audit_path = data_paths
+    save_json(config_path, {"applications": [], "pending_modifications": []})
+    clock = VirtualClock(START)
+    app_limiter_daemon = _daemon(clock)
+    app_limiter_daemon.run_cycle()
+
+    # the cli queues a change that cannot apply, it is dropped and audited as failed
+    save_json(
+        config_path,
+        {"applications": [], "pending_modifications": [_pending("remove_missing", START)]},
+    )
+    app_limiter_daemon.run_cycle()
+
+    assert load_json(config_path)["pending_modifications"] == []
+    with open(audit_path, encoding="utf-8") as f:
+        audit_entry = json.loads(f.readline())
+    assert audit_entry["result"] == "failed"
+    assert audit_entry["error"]
@@ -0,0 +1,93 @@
+# AppLimiter/tests/test_notification_aggregator.py
+
+from applimiter.clock import VirtualClock
+from applimiter.daemon import AppLimiterDaemon
+from applimiter.notification_manager import NotificationAggregator
+from applimiter.process_handler import ProcessInfo
+
+ALICE = {"username": "alice", "display": ":0", "uid": 1000}
+BOB = {"username": "bob", "display": ":1", "uid": 1001}
+
+
+def _aggregator():
+    sent = []
+    aggregator = NotificationAggregator(
+        lambda title, message, user_info, dialog_type: sent.append(
+            (user_info["username"], title, message, dialog_type)
+        )
+    )
+    return aggregator, sent
+
+
+def test_one_dialog_per_session_with_duplicates_merged():
+    aggregator, sent = _aggregator()
+    aggregator.add(ALICE, "Steam: Daily Limit Reached", "Closing soon.", "--warning")
+    aggregator.add(ALICE, "Minecraft: Terminated", "Closed.", "--error")
+    aggregator.add(ALICE, "Steam: Daily Limit Reached", "Closing soon.", "--warning")
+    aggregator.add(BOB, "Steam: 5 Minutes Left", "Hurry.", "--info")
+
+    assert aggregator.flush(1000) == 2
+
+    assert sent == [
+        (
+            "alice",
+            "AppLimiter: 2 notifications",
+            "Steam: Daily Limit Reached\nClosing soon.\n\nMinecraft: Terminated\nClosed.",
+            "--error",
+        ),
+        ("bob", "Steam: 5 Minutes Left", "Hurry.", "--info"),
+    ]
+    assert (aggregator.notifications_added, aggregator.dialogs_sent) == (4, 2)
+
+
+def test_rate_limit_holds_notifications_until_the_interval_passed():
+    aggregator, sent = _aggregator()
+    aggregator.add(ALICE, "Steam: 5 Minutes Left", "Hurry.", "--info")
+    aggregator.flush(1000, 60)
+    aggregator.add(ALICE, "Steam: Daily Limit Reached", "Closing soon.", "--warning")
+
+    assert aggregator.flush(1030, 60) == 0
+    aggregator.add(ALICE, "Steam: Daily Limit Reached", "Closing soon.", "--warning")
+    assert aggregator.flush(1060, 60) == 1
+    assert sent[-1] == ("alice", "Steam: Daily Limit Reached", "Closing soon.", "--warning")
+    # a clock set back does not hold them forever
+    aggregator.add(ALICE, "Steam: Terminated", "Closed.", "--error")
+    assert aggregator.flush(500, 60) == 1
+
+
+def test_daemon_spawns_one_dialog_per_user_for_many_apps():
+    clock = VirtualClock(1_700_000_000)
+    sent = []
+    app_count = 20
+    config = {
+        "applications": [
+            {
+                "name": f"Game {idx}",
+                "process_keywords": [f"game{idx}"],
+                "daily_limits_by_day": {"weekdays": 0, "weekends": 0},
+            }
+            for idx in range(app_count)
+        ]
+    }
+    app_limiter_daemon = AppLimiterDaemon(
+        60,
+        scan_processes=lambda: [
+            ProcessInfo(100 + idx, f"game{idx}", f"/opt/game{idx}", 1_699_999_000, 1)
+            for idx in range(app_count)
+        ],
+        get_desktop_users=lambda: [ALICE, BOB],
+        send_notification=lambda title, message, user_info, dialog_type: sent.append(
+            (user_info["username"], title)
+        ),
+        terminate=lambda pid, app_name: None,
+        clock=clock,
+    )
+
+    app_limiter_daemon.process_cycle(
+        config, {}, clock.now(), app_limiter_daemon.scan_processes(), [ALICE, BOB]
+    )
+
+    assert sent == [
+        ("alice", f"AppLimiter: {app_count} notifications"),
+        ("bob", f"AppLimiter: {app_count} notifications"),
+    ]
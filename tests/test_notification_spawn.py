@@ -0,0 +1,89 @@
+# AppLimiter/tests/test_notification_spawn.py
+
+from types import SimpleNamespace
+
+import pytest
+
+from applimiter import notification_manager
+from applimiter.notification_manager import send_desktop_notification_zenity
+
+USER_INFO = {
+    "username": "alice",
+    "uid": 1000,
+    "display": ":1",
+    "xauthority": "/nonexistent/.Xauthority",
+    "home": "/home/alice",
+}
+
+
+@pytest.fixture
+def spawn(mocker):
+    mocker.patch.dict(notification_manager._credentials_cache, clear=True)
+    mocker.patch.dict(notification_manager._environment_cache, clear=True)
+    mocker.patch("applimiter.notification_manager.os.geteuid", return_value=0)
+    getpwnam = mocker.patch(
+        "applimiter.notification_manager.pwd.getpwnam",
+        return_value=SimpleNamespace(pw_uid=1000, pw_gid=1000, pw_dir="/home/alice"),
+    )
+    mocker.patch("applimiter.notification_manager.os.getgrouplist", return_value=[1000, 27, 44])
+    run = mocker.patch(
+        "applimiter.notification_manager.subprocess.run",
+        return_value=SimpleNamespace(returncode=0, stdout="", stderr=""),
+    )
+    return run, getpwnam
+
+
+def test_dialog_drops_to_the_user_without_sudo(spawn):
+    run, _ = spawn
+
+    send_desktop_notification_zenity("Steam: Closed", "Bye.", USER_INFO, dialog_type="--error")
+
+    command = run.call_args.args[0]
+    kwargs = run.call_args.kwargs
+    assert command[:2] == ["zenity", "--error"]
+    assert (kwargs["user"], kwargs["group"], kwargs["extra_groups"]) == (1000, 1000, [1000, 27, 44])
+    assert kwargs["env"] == {
+        "PATH": notification_manager.SESSION_PATH,
+        "HOME": "/home/alice",
+        "USER": "alice",
+        "LOGNAME": "alice",
+        "DISPLAY": ":1",
+    }
+
+
+def test_credentials_are_looked_up_again_after_a_login(spawn, tmp_path, mocker):
+    run, getpwnam = spawn
+    utmp_path = tmp_path / "utmp"
+    utmp_path.write_bytes(b"a")
+    mocker.patch("applimiter.notification_manager.UTMP_PATH", str(utmp_path))
+
+    for _ in range(3):
+        send_desktop_notification_zenity("Steam: Closed", "Bye.", USER_INFO)
+    assert getpwnam.call_count == 1
+
+    utmp_path.write_bytes(b"ab")
+    send_desktop_notification_zenity("Steam: Closed", "Bye.", USER_INFO)
+    assert getpwnam.call_count == 2
+
+
+def test_session_files_created_later_are_used(spawn, tmp_path):
+    run, _ = spawn
+    xauthority = tmp_path / ".Xauthority"
+    user_info = {**USER_INFO, "xauthority": str(xauthority)}
+
+    send_desktop_notification_zenity("Steam: Closed", "Bye.", user_info)
+    xauthority.write_bytes(b"cookie")
+    send_desktop_notification_zenity("Steam: Closed", "Bye.", user_info)
+
+    first_env, second_env = [call.kwargs["env"] for call in run.call_args_list]
+    assert "XAUTHORITY" not in first_env
+    assert second_env["XAUTHORITY"] == str(xauthority)
+
+
+def test_unknown_user_is_not_notified(spawn):
+    run, getpwnam = spawn
+    getpwnam.side_effect = KeyError("bob")
+
+    send_desktop_notification_zenity("Steam: Closed", "Bye.", {**USER_INFO, "username": "bob"})
+
+    assert not run.called
@@ -0,0 +1,117 @@
+# AppLimiter/tests/test_per_user.py
+
+import os
+
+from applimiter.clock import VirtualClock
+from applimiter.constants import GRACE_PERIOD_SECONDS
+from applimiter.daemon import AppLimiterDaemon
+from applimiter.process_handler import ProcessInfo, ProcessTableCache
+
+START = 1_700_000_000
+CONFIG = {
+    "enable_per_user_limits": True,
+    "applications": [
+        {
+            "name": "Steam",
+            "process_keywords": ["steam"],
+            "daily_limits_by_day": {"weekdays": 30, "weekends": 30},
+        }
+    ],
+}
+
+
+class Lab:
+    """A shared machine with one desktop session per user."""
+
+    def __init__(self, uids):
+        self.clock = VirtualClock(START)
+        self.scans = 0
+        self.notifications = []
+        self.terminated = []
+        self.desktop_users = [{"username": f"student{uid}", "uid": uid} for uid in uids]
+        self.daemon = AppLimiterDaemon(
+            60,
+            scan_processes=self._scan,
+            get_desktop_users=lambda: self.desktop_users,
+            send_notification=lambda title, message, user_info, dialog_type: (
+                self.notifications.append((user_info["uid"], title))
+            ),
+            terminate=lambda pid, app_name: self.terminated.append(pid),
+            clock=self.clock,
+        )
+        self.usage_data = {}
+        self.process_table = []
+
+    def _scan(self):
+        self.scans += 1
+        return self.process_table
+
+    def run(self, after_seconds=0):
+        self.clock.advance(after_seconds)
+        self.daemon.process_cycle(
+            CONFIG, self.usage_data, self.clock.now(), self.daemon.scan_processes(), self.desktop_users
+        )
+
+    def user_seconds(self, uid):
+        return self.usage_data["Steam"]["users"][str(uid)]["daily_seconds_today"]
+
+
+def _steam(pid, uid):
+    return ProcessInfo(pid, "steam", "/usr/bin/steam", START - 3600, 1, uid)
+
+
+def test_each_user_has_own_counter():
+    lab = Lab([1000, 1001])
+    lab.process_table = [_steam(100, 1000), _steam(200, 1001)]
+    lab.run()
+    lab.process_table = [_steam(100, 1000)]
+    lab.run(after_seconds=60)
+
+    assert lab.user_seconds(1000) == 120
+    # stopped between the scans, half the interval
+    assert lab.user_seconds(1001) == 90
+
+
+def test_limit_only_closes_and_notifies_that_user():
+    lab = Lab([1000, 1001])
+    lab.process_table = [_steam(100, 1000), _steam(200, 1001)]
+    lab.run()
+    lab.usage_data["Steam"]["users"]["1000"]["daily_seconds_today"] = 29 * 60
+    lab.run(after_seconds=60)
+
+    assert lab.notifications == [(1000, "Steam: Daily Limit Reached")]
+
+    lab.run(after_seconds=GRACE_PERIOD_SECONDS)
+
+    assert lab.terminated == [100]
+    assert lab.notifications[-1] == (1000, "Steam: Daily Limit: Terminated")
+    assert (1000, "Steam") in lab.daemon.blocked_apps
+    assert (1001, "Steam") not in lab.daemon.blocked_apps
+
+
+def test_hundreds_of_users_share_one_scan():
+    uids = range(1000, 1300)
+    lab = Lab(uids)
+    lab.process_table = [_steam(10_000 + uid, uid) for uid in uids]
+
+    lab.run()
+    lab.run(after_seconds=60)
+
+    assert lab.scans == 2
+    assert len(lab.usage_data["Steam"]["users"]) == 300
+    assert all(lab.user_seconds(uid) == 120 for uid in uids)
+
+
+def test_process_cache_reads_the_uid(tmp_path):
+    proc_path = tmp_path / "proc"
+    process_path = proc_path / "4242"
+    process_path.mkdir(parents=True)
+    (proc_path / "stat").write_text(f"btime {START}\n")
+    (process_path / "stat").write_text(
+        "4242 (steam) S 1 1 1 0 -1 4194560 0 0 0 0 0 0 0 0 20 0 1 0 100 0 0\n"
+    )
+    (process_path / "cmdline").write_bytes(b"/usr/bin/steam\0")
+
+    (process_info,) = ProcessTableCache(str(proc_path)).scan()
+
+    assert process_info.uid == os.stat(process_path).st_uid
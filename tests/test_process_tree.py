@@ -0,0 +1,116 @@
+# AppLimiter/tests/test_process_tree.py
+
+import subprocess
+import time
+
+import psutil
+
+from applimiter.constants import GRACE_PERIOD_SECONDS
+
+from applimiter.clock import VirtualClock
+from applimiter.daemon import AppLimiterDaemon
+from applimiter.process_handler import (
+    ProcessInfo,
+    ProcessTableCache,
+    build_children_index,
+    collect_process_subtrees,
+    match_process_table,
+    terminate_processes,
+)
+
+START = 1_700_000_000
+
+
+def _table(*parent_pairs):
+    return [ProcessInfo(pid, f"proc{pid}", f"proc{pid}", None, ppid) for pid, ppid in parent_pairs]
+
+
+def test_subtrees_are_collected_leaves_first():
+    # 10 -> 11 -> 12, 10 -> 13, and an unrelated 20 -> 21
+    process_table = _table((10, 1), (11, 10), (12, 11), (13, 10), (20, 1), (21, 20))
+    children_by_ppid = build_children_index(process_table)
+
+    pids = collect_process_subtrees([10], children_by_ppid)
+
+    assert sorted(pids) == [10, 11, 12, 13]
+    assert pids.index(12) < pids.index(11) < pids.index(10)
+    assert pids.index(13) < pids.index(10)
+
+
+def test_nested_matches_are_collected_once():
+    process_table = _table((10, 1), (11, 10), (12, 11))
+    children_by_ppid = build_children_index(process_table)
+
+    pids = collect_process_subtrees([11, 10], children_by_ppid)
+
+    assert pids == [12, 11, 10]
+
+
+def test_init_is_never_attached():
+    process_table = _table((1, 0), (10, 1))
+
+    assert collect_process_subtrees([1], build_children_index(process_table)) == []
+
+
+def test_children_with_generic_names_count_for_the_app_and_die_first():
+    config = {
+        "applications": [
+            {
+                "name": "Steam",
+                "process_keywords": ["steam"],
+                "daily_limits_by_day": {"weekdays": 1, "weekends": 1},
+            }
+        ]
+    }
+    clock = VirtualClock(START)
+    terminated = []
+    app_limiter_daemon = AppLimiterDaemon(
+        60,
+        scan_processes=lambda: [],
+        get_desktop_users=lambda: [],
+        send_notification=lambda *args, **kwargs: None,
+        terminate=lambda pid, app_name: terminated.append(pid),
+        clock=clock,
+    )
+    process_table = [
+        ProcessInfo(100, "steam", "/usr/bin/steam", START - 600, 1),
+        ProcessInfo(101, "python3", "python3 game.py", START - 500, 100),
+        ProcessInfo(102, "wine64", "wine64 setup.exe", START - 400, 101),
+        ProcessInfo(200, "python3", "python3 unrelated.py", START - 300, 1),
+    ]
+    usage_data = {}
+
+    app_limiter_daemon.process_cycle(config, usage_data, clock.now(), process_table, [])
+    clock.advance(GRACE_PERIOD_SECONDS + 60)
+    app_limiter_daemon.process_cycle(config, usage_data, clock.now(), process_table, [])
+
+    assert terminated == [102, 101, 100]
+
+
+def test_subtree_of_a_real_process_is_terminated_in_one_batch():
+    launcher = subprocess.Popen(
+        ["sh", "-c", "sleep 60 & sleep 60 & exec sleep 60"],
+    )
+    try:
+        # wait for the children to start
+        deadline = time.monotonic() + 5
+        while len(psutil.Process(launcher.pid).children()) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        process_table = ProcessTableCache().scan()
+        children_by_ppid = build_children_index(process_table)
+        roots = [
+            pid
+            for pid in match_process_table(process_table, ["sleep 60"])
+            if pid == launcher.pid
+        ]
+
+        pids = collect_process_subtrees(roots, children_by_ppid)
+        assert len(pids) == 3 and pids[-1] == launcher.pid
+
+        started = time.monotonic()
+        terminate_processes(pids, "Sleep")
+        assert time.monotonic() - started < 5
+        assert not any(psutil.pid_exists(pid) and psutil.Process(pid).status() != "zombie" for pid in pids)
+    finally:
+        launcher.kill()
+        launcher.wait()
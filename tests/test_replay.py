@@ -0,0 +1,92 @@
+# AppLimiter/tests/test_replay.py
+
+import datetime
+
+from applimiter.process_handler import ProcessInfo
+from applimiter.replay import TraceRecorder, read_trace, replay_trace
+
+START = datetime.datetime(2024, 6, 26, 12, 0, 0)
+CONFIG = {
+    "applications": [
+        {
+            "name": "Steam",
+            "process_keywords": ["steam.sh"],
+            "daily_limits_by_day": {"weekdays": 1, "weekends": 1},
+            "weekly_limit_minutes": 500,
+        }
+    ],
+    "pending_modifications": [],
+}
+USERS = [{"username": "val", "uid": 1000, "display": ":0", "xauthority": None}]
+
+
+def _record(tmp_path, cycles):
+    trace_path = str(tmp_path / "trace.jsonl.gz")
+    recorder = TraceRecorder(trace_path, 60)
+    for cycle in range(cycles):
+        table = [ProcessInfo(1, "systemd", "/sbin/init"), ProcessInfo(100 + cycle, "bash", "bash")]
+        table.append(ProcessInfo(4242, "steam", "/home/val/.steam/steam.sh"))
+        recorder.record(START + datetime.timedelta(minutes=cycle), table, USERS, CONFIG, {})
+    recorder.close()
+    return trace_path
+
+
+def test_trace_round_trip(tmp_path):
+    """The replayed process tables are identical to the recorded ones."""
+    trace_path = _record(tmp_path, 3)
+
+    header, frames = read_trace(trace_path)
+    frames = list(frames)
+
+    assert header["check_interval"] == 60
+    assert len(frames) == 3
+    frame = frames[2]
+    assert frame.timestamp == (START + datetime.timedelta(minutes=2)).timestamp()
+    assert sorted(p.pid for p in frame.process_table) == [1, 102, 4242]
+    assert frame.desktop_users == USERS
+    assert frame.config == CONFIG
+    assert frame.monotonic is None
+
+
+def test_replay_accounts_and_terminates(tmp_path):
+    """Replay drives the daemon logic: usage is counted, warned about, then terminated."""
+    trace_path = _record(tmp_path, 7)
+
+    result = replay_trace(trace_path)
+
+    assert result["cycles"] == 7
+    assert result["usage_data"]["Steam"]["daily_seconds_today"] == 7 * 60
+    titles = [n["title"] for n in result["notifications"]]
+    assert "Steam: Daily Limit Reached" in titles
+    assert "Steam: Daily Limit: Terminated" in titles
+    assert {t["pid"] for t in result["terminations"]} == {4242}
+
+
+def test_replay_with_config_override(tmp_path):
+    """A different config can be compared on the identical recorded input."""
+    trace_path = _record(tmp_path, 7)
+    relaxed = {
+        "applications": [{**CONFIG["applications"][0], "daily_limits_by_day": {"weekdays": 60, "weekends": 60}}]
+    }
+
+    result = replay_trace(trace_path, config=relaxed)
+
+    assert result["terminations"] == []
+
+
+def test_replay_leaves_out_time_suspended(tmp_path):
+    """A trace recorded across a suspend credits only the time awake, like the daemon did."""
+    trace_path = str(tmp_path / "trace.jsonl.gz")
+    recorder = TraceRecorder(trace_path, 60)
+    table = [ProcessInfo(4242, "steam", "/home/val/.steam/steam.sh", START.timestamp() - 60)]
+    relaxed = {"applications": [{**CONFIG["applications"][0], "daily_limits_by_day": {"weekdays": 600, "weekends": 600}}]}
+    # (minutes since start, monotonic, boottime): suspended for an hour after the second cycle
+    for minutes, monotonic, boottime in [(0, 1000, 1000), (1, 1060, 1060), (62, 1120, 4720), (63, 1180, 4780)]:
+        recorder.record(
+            START + datetime.timedelta(minutes=minutes), table, USERS, relaxed, {}, monotonic, boottime
+        )
+    recorder.close()
+
+    result = replay_trace(trace_path)
+
+    assert result["usage_data"]["Steam"]["daily_seconds_today"] == 4 * 60
@@ -0,0 +1,164 @@
+# AppLimiter/tests/test_rolling.py
+
+import random
+
+from applimiter.clock import VirtualClock
+from applimiter.constants import GRACE_PERIOD_SECONDS, ROLLING_WINDOW_MAX_MINUTES
+from applimiter.daemon import AppLimiterDaemon
+from applimiter.modifications import modification_needs_delay
+from applimiter.process_handler import ProcessInfo
+from applimiter.rolling import RollingUsage
+
+# a minute boundary
+START = 1_700_000_040
+
+
+def _sum_from_scratch(credits, now_ts, window):
+    """The seconds credited in minutes (now - window, now], by brute force."""
+    head_minute = int(now_ts // 60)
+    total = 0
+    for end_ts, seconds in credits:
+        start_ts = end_ts - seconds
+        for second in range(int(start_ts), int(end_ts)):
+            if head_minute - window < second // 60 <= head_minute:
+                total += 1
+    return total
+
+
+def test_incremental_sums_match_a_full_recount():
+    rng = random.Random(42)
+    state = {}
+    windows = [1, 30, 120, ROLLING_WINDOW_MAX_MINUTES]
+    now_ts = START
+    credits = []
+    for _ in range(500):
+        now_ts += rng.choice([1, 5, 60, 61, 600, 3600])
+        rolling_usage = RollingUsage(state, windows)
+        rolling_usage.advance(now_ts)
+        if rng.random() < 0.7:
+            seconds = rng.randint(1, 120)
+            rolling_usage.add(now_ts, seconds)
+            credits.append((now_ts, seconds))
+        for window in windows:
+            assert rolling_usage.window_seconds(window) == _sum_from_scratch(credits, now_ts, window)
+
+
+def test_interval_is_split_across_minutes():
+    rolling_usage = RollingUsage({}, [1, 2])
+    rolling_usage.advance(START + 30)
+    rolling_usage.add(START + 30, 60)
+
+    # 30 s in the previous minute, 30 s in the current one
+    assert rolling_usage.window_seconds(1) == 30
+    assert rolling_usage.window_seconds(2) == 60
+
+
+def test_long_gap_clears_the_buffer():
+    rolling_usage = RollingUsage({}, [60])
+    rolling_usage.advance(START)
+    rolling_usage.add(START, 60)
+    rolling_usage.advance(START + ROLLING_WINDOW_MAX_MINUTES * 60 * 3)
+
+    assert rolling_usage.window_seconds(60) == 0
+    assert rolling_usage.state["minutes"] == {}
+
+
+def test_only_used_minutes_are_stored():
+    state = {}
+    rolling_usage = RollingUsage(state, [ROLLING_WINDOW_MAX_MINUTES])
+    rolling_usage.advance(START)
+    rolling_usage.add(START, 60)
+    rolling_usage.advance(START + 600)
+    rolling_usage.add(START + 600, 30)
+
+    # the seconds before a cycle belong to the minutes before it
+    first_minute = START // 60 - 1
+    assert state["minutes"] == {str(first_minute): 60, str(first_minute + 10): 30}
+    # a minute leaves the buffer once the longest window moved past it
+    rolling_usage.advance(START + (ROLLING_WINDOW_MAX_MINUTES - 1) * 60 + 30)
+    assert state["minutes"] == {str(first_minute + 10): 30}
+    assert rolling_usage.window_seconds(ROLLING_WINDOW_MAX_MINUTES) == 30
+
+
+def test_dense_buffer_of_older_versions_is_converted():
+    head_minute = START // 60
+    buckets = [0] * ROLLING_WINDOW_MAX_MINUTES
+    buckets[head_minute % ROLLING_WINDOW_MAX_MINUTES] = 20
+    buckets[(head_minute - 90) % ROLLING_WINDOW_MAX_MINUTES] = 40
+    state = {"head_minute": head_minute, "buckets": buckets, "window_sums": {"60": 20}}
+
+    rolling_usage = RollingUsage(state, [60, 120])
+
+    assert "buckets" not in state
+    assert state["minutes"] == {str(head_minute): 20, str(head_minute - 90): 40}
+    assert rolling_usage.window_seconds(60) == 20
+    assert rolling_usage.window_seconds(120) == 60
+
+
+def test_new_window_is_summed_from_the_buffer():
+    state = {}
+    rolling_usage = RollingUsage(state, [60])
+    rolling_usage.advance(START)
+    rolling_usage.add(START, 600)
+
+    assert RollingUsage(state, [60, 1440]).window_seconds(1440) == 600
+
+
+def test_daemon_enforces_and_releases_a_rolling_limit():
+    config = {
+        "applications": [
+            {
+                "name": "Steam",
+                "process_keywords": ["steam"],
+                "rolling_limits": [{"window_minutes": 120, "limit_minutes": 30}],
+            }
+        ]
+    }
+    clock = VirtualClock(START)
+    notifications = []
+    terminated = []
+    app_limiter_daemon = AppLimiterDaemon(
+        60,
+        scan_processes=lambda: [],
+        get_desktop_users=lambda: [],
+        send_notification=lambda title, *args, **kwargs: notifications.append(title),
+        terminate=lambda pid, app_name: terminated.append(pid),
+        clock=clock,
+    )
+    usage_data = {}
+    steam = [ProcessInfo(4242, "steam", "/usr/bin/steam", START - 3600, 1)]
+
+    def run(process_table):
+        clock.advance(60)
+        app_limiter_daemon.process_cycle(config, usage_data, clock.now(), process_table, [{}])
+
+    for _ in range(30):
+        run(steam)
+    assert notifications == ["Steam: Rolling Time Warning", "Steam: Rolling Limit Reached"]
+    assert usage_data["Steam"]["first_limit_breach_type"] == "rolling"
+
+    for _ in range(GRACE_PERIOD_SECONDS // 60):
+        run(steam)
+    assert terminated == [4242]
+
+    # the usage slides out of the two hour window
+    for _ in range(120):
+        run([])
+    assert usage_data["Steam"]["first_limit_breach_timestamp"] is None
+    assert usage_data["Steam"]["rolling_usage"]["window_sums"]["120"] == 0
+
+
+def test_raising_a_rolling_limit_is_delayed():
+    config = {
+        "enable_config_modification_delay": True,
+        "applications": [
+            {"name": "Steam", "rolling_limits": [{"window_minutes": 120, "limit_minutes": 30}]}
+        ],
+    }
+
+    def update(rolling_limits):
+        return {"action": "update_app", "payload": {"name": "Steam", "rolling_limits": rolling_limits}}
+
+    assert not modification_needs_delay(config, update([{"window_minutes": 120, "limit_minutes": 20}]))
+    assert modification_needs_delay(config, update([{"window_minutes": 120, "limit_minutes": 40}]))
+    assert modification_needs_delay(config, update([]))
@@ -0,0 +1,116 @@
+# AppLimiter/tests/test_schedule.py
+
+import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from applimiter.clock import VirtualClock
+from applimiter.constants import GRACE_PERIOD_SECONDS
+from applimiter.daemon import AppLimiterDaemon
+from applimiter.process_handler import ProcessInfo
+from applimiter.schedule import CompiledSchedule, parse_schedule_argument
+
+BERLIN = ZoneInfo("Europe/Berlin")
+AFTERNOONS = {
+    "timezone": "Europe/Berlin",
+    "allowed": [{"days": "weekdays", "start": "16:00", "end": "20:00"}],
+}
+
+
+def _berlin(*args):
+    return datetime.datetime(*args, tzinfo=BERLIN).timestamp()
+
+
+def test_allowed_hours_and_next_transition():
+    schedule = CompiledSchedule(AFTERNOONS)
+
+    # Wednesday
+    assert not schedule.is_allowed(_berlin(2024, 6, 26, 15, 59))
+    assert schedule.is_allowed(_berlin(2024, 6, 26, 16, 0))
+    assert schedule.next_transition(_berlin(2024, 6, 26, 17, 0)) == _berlin(2024, 6, 26, 20, 0)
+    # Friday evening, the next change is Monday afternoon
+    assert schedule.next_transition(_berlin(2024, 6, 28, 21, 0)) == _berlin(2024, 7, 1, 16, 0)
+
+
+def test_transitions_follow_dst_changes():
+    schedule = CompiledSchedule(AFTERNOONS)
+
+    # the clocks went forward on Sunday 31 March 2024, 16:00 is still 16:00 local time
+    before = schedule.next_transition(_berlin(2024, 3, 29, 12, 0))
+    after = schedule.next_transition(_berlin(2024, 4, 1, 12, 0))
+    assert after - before == 3 * 86400 - 3600
+    assert datetime.datetime.fromtimestamp(after, BERLIN).hour == 16
+
+
+def test_overnight_rules_and_merging():
+    schedule = CompiledSchedule(
+        {"allowed": [{"days": "daily", "start": "22:00", "end": "02:00"},
+                     {"days": "daily", "start": "00:00", "end": "01:00"}]}
+    )
+    midnight = datetime.datetime(2024, 6, 26).timestamp()
+
+    assert schedule.is_allowed(midnight + 3600 * 1.5)
+    assert not schedule.is_allowed(midnight + 3600 * 3)
+    assert schedule.next_transition(midnight + 3600 * 1.5) == midnight + 3600 * 2
+
+
+def test_invalid_schedules_are_rejected():
+    with pytest.raises(ValueError):
+        CompiledSchedule({"allowed": [{"days": "someday"}]})
+    with pytest.raises(ValueError):
+        CompiledSchedule({"timezone": "Mars/Olympus", "allowed": []})
+    with pytest.raises(ValueError):
+        parse_schedule_argument(["weekdays=16:00"])
+    assert parse_schedule_argument(["sat,sun=10:00-22:00"]) == [
+        {"days": ["sat", "sun"], "start": "10:00", "end": "22:00"}
+    ]
+
+
+def test_daemon_warns_closes_and_wakes_up_for_the_schedule():
+    config = {
+        "applications": [
+            {"name": "Steam", "process_keywords": ["steam"], "schedule": AFTERNOONS}
+        ]
+    }
+    start = _berlin(2024, 6, 26, 19, 50)
+    clock = VirtualClock(start)
+    notifications = []
+    terminated = []
+    app_limiter_daemon = AppLimiterDaemon(
+        600,
+        scan_processes=lambda: [ProcessInfo(4242, "steam", "/usr/bin/steam", start - 60, 1)],
+        get_desktop_users=lambda: [],
+        send_notification=lambda title, *args, **kwargs: notifications.append(title),
+        terminate=lambda pid, app_name: terminated.append(pid),
+        clock=clock,
+    )
+    usage_data = {}
+
+    def run():
+        app_limiter_daemon.process_cycle(
+            config, usage_data, clock.now(), app_limiter_daemon.scan_processes(), [{}]
+        )
+
+    run()
+    # the daemon sleeps until the warning five minutes before 20:00
+    assert app_limiter_daemon.next_schedule_wakeup == _berlin(2024, 6, 26, 19, 55)
+    app_limiter_daemon._wait_for_next_cycle()
+    assert clock.time() == _berlin(2024, 6, 26, 19, 55)
+    run()
+    assert notifications == ["Steam: Allowed Hours Ending"]
+
+    # and wakes up again when they end, before the interval is over
+    app_limiter_daemon._wait_for_next_cycle()
+    assert clock.time() == _berlin(2024, 6, 26, 20, 0)
+    run()
+    assert notifications[-1] == "Steam: Outside Allowed Hours"
+
+    clock.advance(GRACE_PERIOD_SECONDS)
+    run()
+    assert terminated == [4242]
+
+    # allowed again the next afternoon
+    clock.set_time(_berlin(2024, 6, 27, 16, 0))
+    run()
+    assert usage_data["Steam"]["first_limit_breach_timestamp"] is None
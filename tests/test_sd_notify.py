@@ -0,0 +1,88 @@
+# AppLimiter/tests/test_sd_notify.py
+
+import os
+import socket
+
+import pytest
+
+from applimiter import daemon
+from applimiter.clock import VirtualClock
+from applimiter.daemon import AppLimiterDaemon
+from applimiter.sd_notify import SystemdNotifier
+from applimiter.utils import save_json
+
+
+@pytest.fixture
+def notify_socket(tmp_path):
+    pathname = str(tmp_path / "notify")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    server.bind(pathname)
+    server.settimeout(1)
+    yield pathname, server
+    server.close()
+
+
+def _received(server):
+    messages = []
+    server.setblocking(False)
+    try:
+        while True:
+            messages.append(server.recv(4096).decode())
+    except BlockingIOError:
+        return messages
+
+
+def test_notifier_without_socket_does_nothing():
+    notifier = SystemdNotifier(environ={})
+
+    assert not notifier.enabled
+    assert not notifier.ready()
+    assert notifier.watchdog_interval is None
+
+
+def test_notifier_sends_assignments(notify_socket):
+    pathname, server = notify_socket
+    notifier = SystemdNotifier(environ={"NOTIFY_SOCKET": pathname})
+
+    assert notifier.ready("Started")
+    assert server.recv(4096).decode() == "READY=1\nSTATUS=Started"
+    notifier.close()
+
+
+def test_watchdog_interval_is_only_for_the_watched_pid():
+    environ = {"WATCHDOG_USEC": "120000000", "WATCHDOG_PID": str(os.getpid())}
+    assert SystemdNotifier(environ=environ).watchdog_interval == 120
+
+    environ["WATCHDOG_PID"] = "1"
+    assert SystemdNotifier(environ=environ).watchdog_interval is None
+
+
+def test_daemon_is_ready_after_first_cycle_and_pets_watchdog(
+    notify_socket, tmp_path, monkeypatch
+):
+    pathname, server = notify_socket
+    config_path = str(tmp_path / "config.json")
+    monkeypatch.setattr(daemon, "CONFIG_FILE_PATH", config_path)
+    monkeypatch.setattr(daemon, "USAGE_DATA_PATH", str(tmp_path / "usage_data.json"))
+    save_json(config_path, {"applications": [{"name": "Steam"}]})
+    notifier = SystemdNotifier(
+        environ={"NOTIFY_SOCKET": pathname, "WATCHDOG_USEC": "40000000"}
+    )
+    app_limiter_daemon = AppLimiterDaemon(
+        60,
+        scan_processes=lambda: [],
+        get_desktop_users=lambda: [],
+        clock=VirtualClock(1_700_000_000),
+        notifier=notifier,
+    )
+
+    app_limiter_daemon.run_cycle()
+    app_limiter_daemon._wait_for_next_cycle()
+    app_limiter_daemon.run_cycle()
+    messages = _received(server)
+
+    assert messages[0].startswith("READY=1\nWATCHDOG=1\nSTATUS=Last cycle ")
+    assert messages[0].endswith("tracking 1 apps")
+    # pet every 20 s while waiting 60 s, then once more after the second cycle
+    assert [message.split("\n")[0] for message in messages[1:]] == ["WATCHDOG=1"] * 3
+    notifier.close()
@@ -0,0 +1,76 @@
+# AppLimiter/tests/test_simulation.py
+
+import datetime
+
+import pytest
+
+from applimiter.clock import VirtualClock
+from applimiter.simulation import ScriptedProcessTimeline, run_simulation
+
+# 2024-06-24 is a Monday
+SCENARIO = {
+    "start": "2024-06-24T00:00:00",
+    "days": 14,
+    "check_interval": 60,
+    "config": {
+        "applications": [
+            {
+                "name": "Steam",
+                "process_keywords": ["steam.sh"],
+                "daily_limits_by_day": {"weekdays": 60, "weekends": 120},
+                "weekly_limit_minutes": 240,
+            }
+        ]
+    },
+    "processes": [
+        {
+            "name": "steam",
+            "cmdline": "/usr/bin/steam.sh",
+            "start": "2024-06-24T18:00:00",
+            "end": "2024-06-24T20:00:00",
+            "repeat_days": 1,
+        }
+    ],
+}
+
+
+def test_virtual_clock_sleep_advances_instantly():
+    clock = VirtualClock(1000.0)
+
+    clock.sleep(3600)
+
+    assert clock.time() == 4600.0
+    assert clock.monotonic() == 3600.0
+    with pytest.raises(ValueError):
+        clock.advance(-1)
+
+
+def test_timeline_repeats_and_terminated_process_stays_dead():
+    timeline = ScriptedProcessTimeline(SCENARIO["processes"])
+    first_evening = datetime.datetime(2024, 6, 24, 18, 30).timestamp()
+    second_evening = datetime.datetime(2024, 6, 25, 18, 30).timestamp()
+
+    (steam,) = timeline.process_table(first_evening)
+    timeline.terminate(steam.pid)
+
+    assert timeline.process_table(first_evening + 60) == []
+    (relaunched,) = timeline.process_table(second_evening)
+    assert relaunched.pid != steam.pid
+    assert timeline.process_table(second_evening + 2 * 3600) == []
+
+
+def test_two_weeks_of_limits_and_resets():
+    """Every day Steam is cut at its daily limit, until the weekly limit is exhausted."""
+    result = run_simulation(SCENARIO)
+
+    assert result["cycles"] == 14 * 24 * 60
+    terminations = result["terminations"]
+    # the daily limit (plus grace) ends Monday to Wednesday, the weekly limit ends Thursday
+    # and every later launch that week is closed right away, one termination per evening
+    assert len(terminations) == 14
+    steam_usage = result["usage_data"]["Steam"]
+    assert steam_usage["last_weekly_reset_date"] == "2024-07-01"
+    assert steam_usage["weekly_seconds_this_week"] <= 240 * 60 + 10 * 60
+    titles = {n["title"] for n in result["notifications"]}
+    assert "Steam: Daily Limit Reached" in titles
+    assert "Steam: Weekly Limit Reached" in titles
@@ -0,0 +1,57 @@
+# AppLimiter/tests/test_startup.py
+
+"""
+Startup-time regression tests: the CLI must only import what each subcommand needs.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# modules that only the daemon or the status command may pull in
+HEAVY_MODULES = [
+    "psutil",
+    "subprocess",
+    "copy",
+    "applimiter.daemon",
+    "applimiter.process_handler",
+    "applimiter.notification_manager",
+]
+
+# generous budget for the cumulative import time of applimiter.main, in microseconds;
+# it is around 20-50 ms on a desktop, importing psutil and the daemon eagerly doubled it
+IMPORT_TIME_BUDGET_US = 150_000
+
+
+def _run_python(*python_args):
+    env = {**os.environ, "PYTHONPATH": SRC_DIR}
+    return subprocess.run(
+        [sys.executable, *python_args], capture_output=True, text=True, env=env, check=True
+    )
+
+
+def test_cli_startup_does_not_import_heavy_modules():
+    code = (
+        "import sys, json, applimiter.main;"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+
+    result = _run_python("-c", code)
+
+    assert json.loads(result.stdout) == []
+
+
+def test_cli_import_time_budget():
+    result = _run_python("-X", "importtime", "-c", "import applimiter.main")
+
+    cumulative_us = None
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == "applimiter.main":
+            cumulative_us = int(fields[1])
+
+    assert cumulative_us is not None
+    assert cumulative_us < IMPORT_TIME_BUDGET_US